@@ -1,10 +1,109 @@
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.db.models import Q
+from . import reference
+from .forms import ReferenceChoiceField
+from .pagination import LargeTablePaginator, encode_cursor, keyset_filter
 from .models import (
     SubscriptionPlan, UserProfile, Tip, Follower,
     ChatMessage, Subscription, Sport, Team,
-    Fixture, Result, LiveScore, SportsOdds, TipsterStats
+    Fixture, Result, LiveScore, SportsOdds, TipsterStats,
+    PointsLedgerEntry, TipSubmission, DailyOdds, TeamRecord
 )
 
+
+class ReferenceChoicesMixin:
+    """
+    Serves Sport and Team dropdowns from the reference cache.
+    """
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.related_model in (Sport, Team):
+            kwargs.setdefault('form_class', ReferenceChoiceField)
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+
+class SportListFilter(admin.SimpleListFilter):
+    # Sport filter choices from the reference cache instead of a query
+    title = 'sport'
+    parameter_name = 'sport'
+
+    def lookups(self, request, model_admin):
+        return [(sport.pk, sport.name) for sport in reference.sports()]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(sport_id=self.value())
+        return queryset
+
+
+class KeysetChangeList(ChangeList):
+    """
+    ChangeList that also pages by cursor: ?cursor= (see pagination.py)
+    shows the rows older than a (keyset_field, id) position, which is an
+    index range read however deep it goes.
+    """
+    CURSOR_VAR = 'cursor'
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(self.CURSOR_VAR, None)
+        return lookup_params
+
+    def _newest_first(self, queryset):
+        field = self.model_admin.keyset_field
+        return tuple(queryset.query.order_by[:2]) in ((f'-{field}', '-id'), (f'-{field}', '-pk'))
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        cursor = self.params.get(self.CURSOR_VAR)
+        if cursor and self._newest_first(queryset):
+            try:
+                queryset = keyset_filter(queryset, cursor, self.model_admin.keyset_field)
+            except ValueError as error:
+                raise IncorrectLookupParameters(error)
+        return queryset
+
+    @property
+    def older_query_string(self):
+        """
+        The query string of the rows after this page, or None.
+        """
+        if not self.multi_page or not self._newest_first(self.queryset):
+            return None
+        rows = list(self.result_list)
+        if not rows:
+            return None
+        last = rows[-1]
+        cursor = encode_cursor(getattr(last, self.model_admin.keyset_field), last.pk)
+        return self.get_query_string({self.CURSOR_VAR: cursor}, [PAGE_VAR])
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Changelist settings for tables with millions of rows.
+
+    Counts are capped or estimated (LargeTablePaginator) and never run a
+    second, unfiltered COUNT(*). Subclasses set keyset_field to a
+    timestamp that, with id, is indexed newest first; the list is ordered
+    by it, sortable only by it, and gets an "Older" cursor link next to
+    the page numbers.
+    """
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+    keyset_field = None
+
+    def get_ordering(self, request):
+        return self.ordering or (f'-{self.keyset_field}', '-id')
+
+    def get_sortable_by(self, request):
+        return (self.keyset_field,)
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
 # USERS
 
 
@@ -16,28 +115,64 @@ class SubscriptionPlanAdmin(admin.ModelAdmin):
 @admin.register(UserProfile)
 class UserProfileAdmin(admin.ModelAdmin):
     list_display = ('name', 'username', 'email', 'subscription_status', 'subscription_type', 'subscription_plan')
-    search_fields = ('user__username', 'user__email', 'name')
+    list_select_related = ('subscription_plan',)
+    ordering = ('username',)
+    # Prefix and exact matches, which the unique indexes answer
+    search_fields = ('^username', '=email')
+    search_help_text = 'Username prefix or exact email.'
 
 
 @admin.register(Tip)
-class TipAdmin(admin.ModelAdmin):
+class TipAdmin(ReferenceChoicesMixin, LargeTableAdmin):
     list_display = ('user', 'sport', 'bet_type', 'odds', 'points_bet', 'is_win', 'created_at')
-    search_fields = ('user__username', 'sport', 'bet_type')  # Adjust as per your fields
+    list_select_related = ('user', 'sport')
+    list_filter = (SportListFilter, 'is_win')
+    search_fields = ('=user__username',)
+    search_help_text = 'Exact username.'
+    autocomplete_fields = ('user', 'fixture')
+    keyset_field = 'created_at'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Resolve the username first so tip_user_created_idx serves the search
+        username = search_term.strip()
+        if not username:
+            return queryset, False
+        return queryset.filter(user__in=UserProfile.objects.filter(username=username).values('pk')), False
+
+
+@admin.register(TipSubmission)
+class TipSubmissionAdmin(admin.ModelAdmin):
+    # The write-behind queue, filled by submit_tips and drained by process_tip_queue
+    list_display = ('pk', 'user', 'points_bet', 'status', 'error', 'tip', 'created_at', 'processed_at')
+    list_select_related = ('user', 'tip__user', 'tip__sport')
+    list_filter = ('status',)
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+    readonly_fields = ('tip',)
 
 
 @admin.register(Follower)
 class FollowerAdmin(admin.ModelAdmin):
     list_display = ('user', 'follower')
+    list_select_related = ('user', 'follower')
+    autocomplete_fields = ('user', 'follower')
 
 
 @admin.register(ChatMessage)
-class ChatMessageAdmin(admin.ModelAdmin):
+class ChatMessageAdmin(LargeTableAdmin):
     list_display = ('user', 'content', 'created_at')
+    list_select_related = ('user',)
+    search_fields = ('=user__username',)
+    search_help_text = 'Exact username.'
+    autocomplete_fields = ('user',)
+    keyset_field = 'created_at'
 
 
 @admin.register(Subscription)
 class SubscriptionAdmin(admin.ModelAdmin):
     list_display = ('user', 'start_date', 'end_date', 'status', 'subscription_type')
+    list_select_related = ('user',)
+    autocomplete_fields = ('user',)
 
 # SPORTS
 
@@ -48,33 +183,97 @@ class SportAdmin(admin.ModelAdmin):
 
 
 @admin.register(Team)
-class TeamAdmin(admin.ModelAdmin):
+class TeamAdmin(ReferenceChoicesMixin, admin.ModelAdmin):
     list_display = ('name', 'sport')
 
 
 @admin.register(Fixture)
-class FixtureAdmin(admin.ModelAdmin):
+class FixtureAdmin(ReferenceChoicesMixin, admin.ModelAdmin):
     list_display = ('sport', 'team_home', 'team_away', 'date_time')
+    ordering = ('-date_time',)
+    search_fields = ('team_home__name', 'team_away__name')
+    search_help_text = 'Part of a team name.'
+
+    def get_queryset(self, request):
+        # The teams name each fixture in lists and autocomplete results
+        return super().get_queryset(request).select_related('team_home', 'team_away')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Match team names in the reference cache, then filter by team id
+        term = search_term.strip().lower()
+        if not term:
+            return queryset, False
+        teams = [team.pk for team in reference.teams() if term in team.name.lower()]
+        return queryset.filter(Q(team_home__in=teams) | Q(team_away__in=teams)), False
 
 
 @admin.register(Result)
 class ResultAdmin(admin.ModelAdmin):
     list_display = ('fixture', 'team_home_score', 'team_away_score')
+    list_select_related = ('fixture__team_home', 'fixture__team_away')
+    autocomplete_fields = ('fixture',)
+
+
+@admin.register(TeamRecord)
+class TeamRecordAdmin(ReferenceChoicesMixin, admin.ModelAdmin):
+    # Form and head-to-head records, kept by arena_app.teamform
+    list_display = ('team', 'opponent', 'played', 'wins', 'draws', 'losses', 'goals_for', 'goals_against', 'form',
+                    'last_played')
+    list_select_related = ('team', 'opponent')
+    readonly_fields = ('recent',)
 
 
 @admin.register(LiveScore)
-class LiveScoreAdmin(admin.ModelAdmin):
-    list_display = ('league', 'home_team', 'home_score', 'away_team', 'away_score', 'match_status', 'match_time')
-    # You can add more admin configurations as needed
+class LiveScoreAdmin(LargeTableAdmin):
+    list_display = ('league', 'home_team', 'home_score', 'away_team', 'away_score', 'match_status', 'match_time',
+                    'timestamp')
+    keyset_field = 'timestamp'
 
 
 
 @admin.register(SportsOdds)
 class SportsOddsAdmin(admin.ModelAdmin):
     list_display = ('fixture', 'team_home_odds', 'team_away_odds', 'draw_odds')
+    list_select_related = ('fixture__team_home', 'fixture__team_away')
+    autocomplete_fields = ('fixture',)
     
 
+@admin.register(DailyOdds)
+class DailyOddsAdmin(admin.ModelAdmin):
+    # First and last prices per fixture and day, kept by arena_app.odds
+    list_display = ('fixture', 'day', 'open_home', 'open_away', 'open_draw', 'last_home', 'last_away', 'last_draw',
+                    'last_at')
+    list_select_related = ('fixture__team_home', 'fixture__team_away')
+    autocomplete_fields = ('fixture',)
+    date_hierarchy = 'day'
+    ordering = ('-day',)
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+
+
 @admin.register(TipsterStats)
 class TipsterStatsAdmin(admin.ModelAdmin):
     # Customize the display of TipsterStats in the admin panel if needed
     list_display = ('user', 'total_bets_placed', 'total_wins', 'points_balance', 'last_points_reset')
+    list_select_related = ('user',)
+    search_fields = ('=user__username',)
+    autocomplete_fields = ('user',)
+
+
+@admin.register(PointsLedgerEntry)
+class PointsLedgerEntryAdmin(admin.ModelAdmin):
+    # The ledger is append-only, entries are written by arena_app.ledger
+    list_display = ('user', 'kind', 'amount', 'tip', 'created_at')
+    list_select_related = ('user', 'tip__user', 'tip__sport')
+    list_filter = ('kind',)
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,201 @@
+# analytics.py
+"""
+Vectorized tipster analytics.
+
+Settled tips are read once as columns (user, sport, odds, stake, outcome)
+ordered by tipster and settlement time, and every metric is computed for
+every tipster at once with NumPy segment operations instead of a loop per
+tipster: sums with bincount, streaks from run lengths, drawdowns from a
+running maximum that restarts at each tipster.
+
+The results are written as TipsterAnalytics snapshot rows (overall and per
+sport) that the league table and tipster profile read directly.
+"""
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching
+from .models import Tip, TipsterAnalytics
+
+# Lower edges of the odds bands, the last band is open-ended
+ODDS_BANDS = (1.0, 1.5, 2.0, 3.0, 5.0)
+CHUNK_SIZE = 50000
+
+
+def _band_labels():
+    edges = list(ODDS_BANDS)
+    labels = [f'{low:g}-{high:g}' for low, high in zip(edges, edges[1:])]
+    return labels + [f'{edges[-1]:g}+']
+
+
+def load_settled_tips(chunk_size=CHUNK_SIZE):
+    """
+    Reads every settled tip with odds into columnar arrays.
+
+    Returns:
+        dict: Arrays "user", "sport" (-1 for no sport), "odds", "stake"
+        and "win", ordered by tipster, settlement time and id.
+    """
+    rows = (Tip.objects.filter(is_win__isnull=False, odds__isnull=False)
+            .order_by('user_id', 'settled_at', 'id')
+            .values_list('user_id', 'sport_id', 'odds', 'points_bet', 'is_win'))
+    columns = {name: [] for name in ('user', 'sport', 'odds', 'stake', 'win')}
+    for user_id, sport_id, odds, stake, is_win in rows.iterator(chunk_size=chunk_size):
+        columns['user'].append(user_id)
+        columns['sport'].append(-1 if sport_id is None else sport_id)
+        columns['odds'].append(float(odds))
+        columns['stake'].append(stake)
+        columns['win'].append(is_win)
+    return {
+        'user': np.asarray(columns['user'], dtype=np.int64),
+        'sport': np.asarray(columns['sport'], dtype=np.int64),
+        'odds': np.asarray(columns['odds'], dtype=np.float64),
+        'stake': np.asarray(columns['stake'], dtype=np.int64),
+        'win': np.asarray(columns['win'], dtype=bool),
+    }
+
+
+def compute(group, odds, stake, win):
+    """
+    Computes the metrics of every group of tips.
+
+    The tips of a group must be contiguous and in chronological order.
+
+    Args:
+        group (ndarray): The group key of each tip.
+        odds (ndarray): The odds of each tip.
+        stake (ndarray): The points staked on each tip.
+        win (ndarray): Whether each tip won.
+
+    Returns:
+        dict: "key" holds the key of each group, every other entry an array
+        with one value per group.
+    """
+    count = len(group)
+    if not count:
+        return {'key': np.empty(0, dtype=np.int64)}
+
+    # Segment starts and a dense 0..n-1 index per group
+    starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+    index = np.cumsum(np.r_[False, group[1:] != group[:-1]])
+    groups = len(starts)
+
+    tips = np.bincount(index, minlength=groups)
+    wins = np.bincount(index, weights=win, minlength=groups).astype(np.int64)
+    staked = np.bincount(index, weights=stake, minlength=groups).astype(np.int64)
+    # Stakes are debited at submission and winners are paid floor(stake * odds).
+    # Odds have two decimals, so the floor is taken in integer hundredths to
+    # match settlement's Decimal Floor(); the float product of 10 * 1.15 is
+    # 11.4999... and would round a point short.
+    payout = stake * np.rint(odds * 100).astype(np.int64) // 100
+    profit_per_tip = np.where(win, payout - stake, -stake).astype(np.int64)
+    profit = np.bincount(index, weights=profit_per_tip, minlength=groups).astype(np.int64)
+    level_return = np.bincount(index, weights=np.where(win, odds - 1, -1.0), minlength=groups)
+    odds_total = np.bincount(index, weights=odds, minlength=groups)
+
+    # Streaks: runs of equal outcomes, cut at group boundaries
+    run_starts = np.flatnonzero(np.r_[True, (win[1:] != win[:-1]) | (index[1:] != index[:-1])])
+    run_lengths = np.diff(np.r_[run_starts, count])
+    run_groups = index[run_starts]
+    run_wins = win[run_starts]
+    longest_win = np.zeros(groups, dtype=np.int64)
+    longest_loss = np.zeros(groups, dtype=np.int64)
+    np.maximum.at(longest_win, run_groups[run_wins], run_lengths[run_wins])
+    np.maximum.at(longest_loss, run_groups[~run_wins], run_lengths[~run_wins])
+
+    # Drawdown: running peak of the profit curve (starting at 0) within each
+    # group. Shifting each group above the previous one keeps one running
+    # maximum from leaking across groups.
+    cumulative = np.cumsum(profit_per_tip)
+    before = np.r_[0, cumulative][starts]
+    curve = cumulative - before[index]
+    shift = (np.abs(curve).max() * 2 + 1) * index
+    peak = np.maximum(np.maximum.accumulate(curve + shift) - shift, 0)
+    max_drawdown = np.maximum.reduceat(peak - curve, starts)
+
+    bands = np.digitize(odds, ODDS_BANDS[1:])
+    band_tips = np.bincount(index * len(ODDS_BANDS) + bands,
+                            minlength=groups * len(ODDS_BANDS)).reshape(groups, -1)
+    band_wins = np.bincount(index * len(ODDS_BANDS) + bands, weights=win,
+                            minlength=groups * len(ODDS_BANDS)).reshape(groups, -1).astype(np.int64)
+
+    return {
+        'key': group[starts],
+        'tips': tips,
+        'wins': wins,
+        'staked': staked,
+        'profit': profit,
+        'yield_pct': np.divide(profit * 100.0, staked, out=np.zeros(groups), where=staked > 0),
+        'roi_pct': level_return * 100.0 / tips,
+        'average_odds': odds_total / tips,
+        'longest_win_streak': longest_win,
+        'longest_loss_streak': longest_loss,
+        'max_drawdown': max_drawdown.astype(np.int64),
+        'band_tips': band_tips,
+        'band_wins': band_wins,
+    }
+
+
+def _snapshot_rows(metrics, user_ids, sport_ids, computed_at):
+    labels = _band_labels()
+    for position in range(len(metrics['key'])):
+        band_tips = metrics['band_tips'][position]
+        band_wins = metrics['band_wins'][position]
+        yield TipsterAnalytics(
+            user_id=int(user_ids[position]),
+            sport_id=None if sport_ids is None else int(sport_ids[position]),
+            tips=int(metrics['tips'][position]),
+            wins=int(metrics['wins'][position]),
+            staked=int(metrics['staked'][position]),
+            profit=int(metrics['profit'][position]),
+            yield_pct=round(float(metrics['yield_pct'][position]), 2),
+            roi_pct=round(float(metrics['roi_pct'][position]), 2),
+            average_odds=round(float(metrics['average_odds'][position]), 2),
+            longest_win_streak=int(metrics['longest_win_streak'][position]),
+            longest_loss_streak=int(metrics['longest_loss_streak'][position]),
+            max_drawdown=int(metrics['max_drawdown'][position]),
+            odds_bands={
+                label: {'tips': int(tips), 'wins': int(wins),
+                        'strike_rate': round(100.0 * wins / tips, 2) if tips else 0}
+                for label, tips, wins in zip(labels, band_tips, band_wins) if tips
+            },
+            computed_at=computed_at,
+        )
+
+
+def refresh(batch_size=1000):
+    """
+    Recomputes the analytics snapshot of every tipster.
+
+    Returns:
+        int: The number of snapshot rows written.
+    """
+    columns = load_settled_tips()
+    overall = compute(columns['user'], columns['odds'], columns['stake'], columns['win'])
+
+    # Per sport: regroup by (tipster, sport), the stable sort keeps each
+    # group in chronological order
+    with_sport = np.flatnonzero(columns['sport'] >= 0)
+    order = with_sport[np.lexsort((columns['sport'][with_sport], columns['user'][with_sport]))]
+    users = columns['user'][order]
+    sports = columns['sport'][order]
+    sport_key = users * (int(sports.max()) + 1 if len(sports) else 1) + sports
+    by_sport = compute(sport_key, columns['odds'][order], columns['stake'][order], columns['win'][order])
+    if len(sports):
+        firsts = np.flatnonzero(np.r_[True, sport_key[1:] != sport_key[:-1]])
+        sport_users, sport_ids = users[firsts], sports[firsts]
+    else:
+        sport_users = sport_ids = np.empty(0, dtype=np.int64)
+
+    computed_at = timezone.now()
+    with transaction.atomic():
+        TipsterAnalytics.objects.all().delete()
+        written = 0
+        for rows in (_snapshot_rows(overall, overall['key'], None, computed_at),
+                     _snapshot_rows(by_sport, sport_users, sport_ids, computed_at)):
+            rows = list(rows)
+            TipsterAnalytics.objects.bulk_create(rows, batch_size=batch_size)
+            written += len(rows)
+        caching.invalidate('leaderboard')
+    return written
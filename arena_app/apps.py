@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ArenaAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'arena_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,56 @@
+# authentication.py
+"""
+Authentication backend that keeps the signed-in user in the cache.
+
+AuthenticationMiddleware loads request.user from the database on every
+request. CachedModelBackend keeps each UserProfile row in the cache for
+USER_CACHE_TIMEOUT seconds instead, so with a cache-backed or signed-cookie
+session (SESSION_CHOICE in settings) a signed-in visitor's page only
+queries the database for the data it shows.
+
+signals.py forgets a user when their profile is saved or deleted, which
+covers password changes and logins, and when their follower counts move.
+The session auth hash is still checked against the cached password, so a
+password change logs the other sessions out as before.
+
+QuerySet.update() sends no signals, so it does not forget the users it
+changes: timeline.rebuild_counts() and bulk edits such as deactivating
+users from the shell are only seen once the cached rows expire, up to
+USER_CACHE_TIMEOUT seconds later. Call forget_user() after such an update
+when it must take effect at once.
+"""
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import transaction
+
+from . import caching
+
+USER_CACHE_TIMEOUT = 60
+
+
+def _key(user_id):
+    return f'{caching.KEY_PREFIX}:user:{user_id}'
+
+
+def forget_user(*user_ids):
+    """
+    Drops the cached users once the current transaction commits.
+    """
+    keys = [_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: caches[caching.CACHE_ALIAS].delete_many(keys))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that serves get_user() from the cache.
+    """
+
+    def get_user(self, user_id):
+        cache = caches[caching.CACHE_ALIAS]
+        user = cache.get(_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(_key(user_id), user, USER_CACHE_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,8 @@
+"""
+Benchmarks for the arena_app views.
+
+data.generate() builds a seeded synthetic data set and scenarios.run()
+times the hot views against it. Run them with ``manage.py benchmark``.
+sessions.run() counts the queries of signed-in browsing per session mode
+(``manage.py benchmark_sessions``).
+"""
@@ -0,0 +1,163 @@
+# data.py
+"""
+Seeded synthetic data for the benchmarks.
+
+generate() fills an empty database with tipsters, their TipsterStats,
+fixtures and results across the four sports, tips, live scores, blog posts
+and chat messages. The same seed and sizes always produce the same rows,
+so runs on different machines or commits measure the same data.
+
+Rows are written with bulk_create, so model signals do not fire; the
+materialized leaderboard and the daily rollups are rebuilt once at the end
+instead.
+"""
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.db import connection
+from django.utils import timezone
+
+from arena_app import leaderboard, reference, rollups
+from arena_app.models import (BlogPost, ChatMessage, Fixture, LiveScore, Result, Sport, Team, Tip,
+                              TipsterStats, UserProfile)
+from arena_app.settlement import MARKETS
+
+SPORTS = ('Football', 'Horse Racing', 'Tennis', 'Golf')
+PASSWORD = 'benchmark-password'
+BATCH_SIZE = 5000
+
+
+@contextmanager
+def _explicit_timestamps(*fields):
+    # Lets bulk_create keep the generated created_at values
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field, _ in saved:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now_add in saved:
+            field.auto_now_add = auto_now_add
+
+
+def _bulk(model, rows, batch_size=BATCH_SIZE):
+    batch = []
+    written = 0
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_size:
+            model.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        model.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def generate(seed=1, users=1000, tips=200000, fixtures=5000, live_scores=500, blog_posts=2000,
+             chat_messages=20000, days=365, log=None):
+    """
+    Generates the benchmark data set.
+
+    Args:
+        seed (int, optional): Seed of the random generator.
+        users (int, optional): Number of tipsters.
+        tips (int, optional): Number of tips, spread over ``days``.
+        fixtures (int, optional): Number of fixtures; those in the past
+        get a result and their tips are settled.
+        live_scores (int, optional): Number of live score rows.
+        blog_posts (int, optional): Number of blog posts.
+        chat_messages (int, optional): Number of chat messages.
+        days (int, optional): How far back the data goes.
+        log (callable, optional): Called with a progress message per table.
+
+    Returns:
+        dict: The number of rows written per model.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    log = log or (lambda message: None)
+    counts = {}
+
+    def step(name, write):
+        started = time.perf_counter()
+        counts[name] = write()
+        log(f'{name}: {counts[name]} rows in {time.perf_counter() - started:.1f}s')
+
+    sports = [Sport.objects.get_or_create(name=name)[0] for name in SPORTS]
+    teams = Team.objects.bulk_create([Team(name=f'{sport.name} Team {n}', sport=sport)
+                                      for sport in sports for n in range(50)])
+    reference.invalidate()
+    teams_by_sport = {sport.pk: [team for team in teams if team.sport_id == sport.pk] for sport in sports}
+
+    def new_fixtures():
+        for n in range(fixtures):
+            sport = sports[n % len(sports)]
+            home, away = rng.sample(teams_by_sport[sport.pk], 2)
+            yield Fixture(sport=sport, team_home=home, team_away=away,
+                          date_time=now - timedelta(days=days) + timedelta(days=days * 1.1 * n / fixtures))
+    step('fixtures', lambda: _bulk(Fixture, new_fixtures()))
+    fixture_rows = list(Fixture.objects.filter(sport__in=sports).values_list('pk', 'sport_id', 'date_time'))
+
+    scores = {pk: (rng.randint(0, 4), rng.randint(0, 4)) for pk, _, date_time in fixture_rows if date_time < now}
+    step('results', lambda: _bulk(Result, (Result(fixture_id=pk, team_home_score=home, team_away_score=away)
+                                           for pk, (home, away) in scores.items())))
+
+    profile = UserProfile()
+    profile.set_password(PASSWORD)
+    password = profile.password
+    step('users', lambda: _bulk(UserProfile, (
+        UserProfile(name=f'Tipster {n}', username=f'tipster{n}', email=f'tipster{n}@example.com',
+                    password=password)
+        for n in range(users)
+    )))
+    user_ids = list(UserProfile.objects.filter(username__startswith='tipster').values_list('pk', flat=True))
+    step('tipster_stats', lambda: _bulk(TipsterStats, (
+        TipsterStats(user_id=user_id, points_balance=rng.randint(0, 5000))
+        for user_id in user_ids
+    )))
+
+    markets = list(MARKETS)
+
+    def tip_rows():
+        for n in range(tips):
+            pk, sport_id, date_time = fixture_rows[rng.randrange(len(fixture_rows))]
+            market = rng.choice(markets)
+            settled = pk in scores
+            created_at = date_time - timedelta(hours=rng.randint(1, 72))
+            yield Tip(user_id=rng.choice(user_ids), sport_id=sport_id, fixture_id=pk, market=market,
+                      bet_type='Match Odds', odds=round(rng.uniform(1.2, 8.0), 2),
+                      points_bet=rng.randint(1, 100),
+                      is_win=MARKETS[market](*scores[pk]) if settled else None,
+                      settled_at=date_time if settled else None, created_at=created_at)
+    with _explicit_timestamps(Tip._meta.get_field('created_at')):
+        step('tips', lambda: _bulk(Tip, tip_rows()))
+
+    step('live_scores', lambda: _bulk(LiveScore, (
+        LiveScore(league=f'League {n % 20}', home_team=f'Home {n}', away_team=f'Away {n}',
+                  home_score=rng.randint(0, 4), away_score=rng.randint(0, 4), match_status='Live',
+                  match_time=f"{rng.randint(1, 90)}'", timestamp=now - timedelta(seconds=rng.randint(0, 3600)))
+        for n in range(live_scores)
+    )))
+
+    with _explicit_timestamps(BlogPost._meta.get_field('created_at'), ChatMessage._meta.get_field('created_at')):
+        step('blog_posts', lambda: _bulk(BlogPost, (
+            BlogPost(author_id=rng.choice(user_ids), title=f'Blog post {n}', content='Lorem ipsum ' * 50,
+                     created_at=now - timedelta(minutes=rng.randint(0, days * 1440)))
+            for n in range(blog_posts)
+        )))
+        step('chat_messages', lambda: _bulk(ChatMessage, (
+            ChatMessage(user_id=rng.choice(user_ids), content=f'Message {n}',
+                        created_at=now - timedelta(seconds=rng.randint(0, days * 86400)))
+            for n in range(chat_messages)
+        )))
+
+    step('leaderboard', leaderboard.rebuild)
+    step('daily_rollups', rollups.rebuild)
+    if connection.vendor in ('sqlite', 'postgresql'):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    return counts
@@ -0,0 +1,208 @@
+# scenarios.py
+"""
+Timed request scenarios for the arena_app views.
+
+Each scenario issues one request through the Django test client (the full
+middleware stack, no network) and run() reports its latency percentiles
+and query count. compare() checks a run against a baseline file.
+"""
+import json
+import random
+import re
+import statistics
+import time
+from collections import namedtuple
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from arena_app.forms import FIXTURE_WINDOW_DAYS
+from arena_app.models import Fixture, Sport, TipsterStats, UserProfile
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+DEFAULT_THRESHOLD = 0.2
+# "Next 100" links the league table scenario follows before starting over
+LEAGUE_TABLE_DEPTH = 2
+
+Scenario = namedtuple('Scenario', ['name', 'request'])
+
+
+def _league_table(clients, rng):
+    # Pages through the overall board by its keyset cursor links, like
+    # loadtest's league table journey
+    query = clients.league_next if clients.league_depth < LEAGUE_TABLE_DEPTH else None
+    response = clients.anonymous.get(f"{reverse('tipster_league_table')}?{query or ''}")
+    match = re.search(rb'href="\?(overall=[^"]*)"', response.content)
+    if query and match:
+        clients.league_depth += 1
+    else:
+        clients.league_depth = 0
+    clients.league_next = match.group(1).decode().replace('&amp;', '&') if match else None
+    return response
+
+
+def _latest_tips(clients, rng):
+    return clients.anonymous.get(reverse('latest_tips'), {'sport': rng.choice(clients.sports)})
+
+
+def _submit_tips(clients, rng):
+    sport, fixture_id = rng.choice(clients.fixtures)
+    return clients.tipster.post(reverse('submit_tips'), {
+        'sport': sport,
+        'fixture': fixture_id,
+        'market': 'home',
+        'bet_description': 'Benchmark tip',
+        'odds_given': '2.50',
+        'points_bet': 1,
+    })
+
+
+def _football_fixtures(clients, rng):
+    return clients.anonymous.get(reverse('football_fixtures'))
+
+
+def _blog_posts(clients, rng):
+    return clients.anonymous.get(reverse('blog_posts'))
+
+
+SCENARIOS = [
+    Scenario('tipster_league_table', _league_table),
+    Scenario('latest_tips', _latest_tips),
+    Scenario('submit_tips', _submit_tips),
+    Scenario('football_fixtures', _football_fixtures),
+    Scenario('blog_posts', _blog_posts),
+]
+
+
+class Clients:
+    """
+    The clients and reference data the scenarios share.
+    """
+
+    def __init__(self):
+        self.anonymous = Client()
+        self.tipster = Client()
+        user = UserProfile.objects.filter(tipster_stats__isnull=False).order_by('pk').first()
+        TipsterStats.objects.filter(user=user).update(points_balance=10 ** 9)
+        self.tipster.force_login(user)
+        self.sports = list(Sport.objects.values_list('name', flat=True))
+        # The fixtures the tip form offers
+        now = timezone.now()
+        self.fixtures = list(Fixture.objects.filter(date_time__gt=now,
+                                                    date_time__lt=now + timedelta(days=FIXTURE_WINDOW_DAYS))
+                             .order_by('date_time').values_list('sport__name', 'pk')[:100])
+        self.league_next = None
+        self.league_depth = 0
+
+
+def _percentile(sorted_values, fraction):
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def run(scenarios=None, iterations=50, warmup=5, seed=1, warm_cache=False, log=None):
+    """
+    Runs each scenario and measures it.
+
+    Args:
+        scenarios (list, optional): The scenarios to run. Defaults to
+        SCENARIOS.
+        iterations (int, optional): Measured requests per scenario.
+        warmup (int, optional): Unmeasured requests run first.
+        seed (int, optional): Seed for the scenarios' random choices.
+        warm_cache (bool, optional): Keep the cache between requests. By
+        default it is cleared so the uncached path is measured.
+        log (callable, optional): Called with a line per scenario.
+
+    Returns:
+        dict: Maps scenario names to their p50_ms, p95_ms, p99_ms, mean_ms
+        and queries (median per request).
+
+    Raises:
+        RuntimeError: If a scenario answers with a server error.
+    """
+    log = log or (lambda message: None)
+    rng = random.Random(seed)
+    results = {}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        clients = Clients()
+        for scenario in scenarios or SCENARIOS:
+            timings = []
+            queries = []
+            for iteration in range(warmup + iterations):
+                if not warm_cache:
+                    cache.clear()
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    response = scenario.request(clients, rng)
+                    elapsed = time.perf_counter() - started
+                if response.status_code >= 500:
+                    raise RuntimeError(f'{scenario.name} answered {response.status_code}')
+                if iteration >= warmup:
+                    timings.append(elapsed * 1000)
+                    queries.append(len(captured))
+
+            timings.sort()
+            results[scenario.name] = {
+                'p50_ms': round(_percentile(timings, 0.50), 2),
+                'p95_ms': round(_percentile(timings, 0.95), 2),
+                'p99_ms': round(_percentile(timings, 0.99), 2),
+                'mean_ms': round(statistics.fmean(timings), 2),
+                'queries': int(statistics.median(queries)),
+            }
+            log(f'{scenario.name}: ' + ', '.join(f'{key}={value}' for key, value in results[scenario.name].items()))
+    return results
+
+
+def load_baseline(path=BASELINE_PATH):
+    """
+    Returns the scenario results stored in a baseline file.
+    """
+    with open(path) as baseline_file:
+        return json.load(baseline_file)['scenarios']
+
+
+def save_baseline(results, path=BASELINE_PATH, **meta):
+    """
+    Writes scenario results to a baseline file, with optional metadata
+    (data set size, iterations, ...).
+    """
+    with open(path, 'w') as baseline_file:
+        json.dump({'meta': meta, 'scenarios': results}, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write('\n')
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Lists the scenarios that regressed against a baseline.
+
+    A scenario regresses when its p95 latency exceeds the baseline's by
+    more than ``threshold`` (0.2 is 20%) or when it runs more queries.
+
+    Args:
+        results (dict): The results of run().
+        baseline (dict): The baseline results.
+        threshold (float, optional): The tolerated relative slowdown.
+
+    Returns:
+        list: A message per regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        limit = expected['p95_ms'] * (1 + threshold)
+        if result['p95_ms'] > limit:
+            regressions.append(f"{name}: p95 {result['p95_ms']}ms > {limit:.2f}ms "
+                               f"(baseline {expected['p95_ms']}ms + {threshold:.0%})")
+        if result['queries'] > expected['queries']:
+            regressions.append(f"{name}: {result['queries']} queries > baseline {expected['queries']}")
+    return regressions
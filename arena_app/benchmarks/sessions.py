@@ -0,0 +1,92 @@
+# sessions.py
+"""
+Queries per request of signed-in browsing under each session mode.
+
+Every mode browses the same read-only pages as one signed-in tipster with
+the page cache kept warm, so the queries left are the session and
+authentication overhead plus whatever data a page really needs. "before"
+is Django's default, database sessions and ModelBackend; the other modes
+use CachedModelBackend with each session engine.
+"""
+import statistics
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from arena_app.models import UserProfile
+
+MODEL_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+CACHED_BACKEND = 'arena_app.authentication.CachedModelBackend'
+
+MODES = {
+    'before': (settings.SESSION_ENGINES['db'], MODEL_BACKEND),
+    'db': (settings.SESSION_ENGINES['db'], CACHED_BACKEND),
+    'cached_db': (settings.SESSION_ENGINES['cached_db'], CACHED_BACKEND),
+    'cache': (settings.SESSION_ENGINES['cache'], CACHED_BACKEND),
+    'signed_cookies': (settings.SESSION_ENGINES['signed_cookies'], CACHED_BACKEND),
+}
+
+PAGES = ('about', 'football', 'home', 'tipster_league_table', 'latest_tips')
+
+
+def _browse(client, pages, iterations, warmup):
+    results = {}
+    for page in pages:
+        url = reverse(page)
+        timings = []
+        queries = []
+        for iteration in range(warmup + iterations):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(url)
+                elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                raise RuntimeError(f'{page} answered {response.status_code}')
+            if iteration >= warmup:
+                timings.append(elapsed * 1000)
+                queries.append(len(captured))
+        results[page] = {
+            'queries': int(statistics.median(queries)),
+            'p50_ms': round(statistics.median(timings), 2),
+        }
+    return results
+
+
+def run(modes=None, pages=PAGES, iterations=50, warmup=2, log=None):
+    """
+    Browses the pages signed in under each mode.
+
+    Args:
+        modes (list, optional): Names from MODES. Defaults to all of them.
+        pages (iterable, optional): URL names of the pages.
+        iterations (int, optional): Measured requests per page.
+        warmup (int, optional): Unmeasured requests per page, which fill
+        the page, session and user caches.
+        log (callable, optional): Called with a line per mode and page.
+
+    Returns:
+        dict: Maps each mode to {page: {"queries", "p50_ms"}}, queries being
+        the median per request.
+
+    Raises:
+        RuntimeError: If a page does not answer 200.
+    """
+    log = log or (lambda message: None)
+    user = UserProfile.objects.order_by('pk').first()
+    if user is None:
+        raise RuntimeError('No user to sign in with.')
+    results = {}
+    for mode in modes or MODES:
+        engine, backend = MODES[mode]
+        with override_settings(SESSION_ENGINE=engine, AUTHENTICATION_BACKENDS=[backend],
+                               ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            client = Client()
+            client.force_login(user)
+            results[mode] = _browse(client, pages, iterations, warmup)
+        for page, result in results[mode].items():
+            log(f"{mode} {page}: queries={result['queries']}, p50_ms={result['p50_ms']}")
+    return results
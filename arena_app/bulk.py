@@ -0,0 +1,37 @@
+# bulk.py
+"""
+Helpers for set-based writes shared by the bulk jobs of the app.
+"""
+from django.db.models import Case, F, Value, When
+
+
+def increment_by_key(queryset, key, deltas, chunk_size=500):
+    """
+    Adds per-row deltas to numeric columns with one UPDATE per chunk.
+
+    Each UPDATE uses F() expressions and a CASE on ``key``, so concurrent
+    writers never lose increments and no row is read into Python.
+
+    Args:
+        queryset (QuerySet): The rows that may be updated.
+        key (str): The column identifying a row, e.g. 'user_id'.
+        deltas (dict): Maps a key value to a dict of {field: delta}.
+        chunk_size (int, optional): Number of keys per UPDATE.
+
+    Returns:
+        int: The number of rows updated.
+    """
+    items = list(deltas.items())
+    updated = 0
+    for start in range(0, len(items), chunk_size):
+        chunk = items[start:start + chunk_size]
+        fields = {field for _, changes in chunk for field in changes}
+        updated += queryset.filter(**{f'{key}__in': [value for value, _ in chunk]}).update(**{
+            field: F(field) + Case(
+                *[When(**{key: value}, then=Value(changes.get(field, 0))) for value, changes in chunk],
+                default=Value(0),
+                output_field=queryset.model._meta.get_field(field),
+            )
+            for field in fields
+        })
+    return updated
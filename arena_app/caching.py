@@ -0,0 +1,147 @@
+# caching.py
+"""
+Versioned page and fragment caching.
+
+Cached values depend on one or more namespaces ("tips", "leaderboard",
+"blog", "livescores", "odds"). Each namespace has a version stored in the
+cache, and invalidate() replaces it when the underlying rows change (see
+signals.py and the bulk writers in settlement, ledger, leaderboard,
+livescores and odds). Every entry remembers the versions it was built
+from, so after an invalidation or once its timeout passes the entry is
+stale but still readable.
+
+Stale entries are served while exactly one worker rebuilds them: the
+first reader to win a short lock (cache.add) rebuilds, everyone else gets
+the stale value. Only a missing entry is built in the request itself.
+
+Works with any Django cache backend. With the local-memory backend each
+process has its own cache and versions, so use the file backend when
+running several workers.
+"""
+import time
+from functools import wraps
+from hashlib import md5
+
+from django.core.cache import caches
+from django.db import transaction
+
+CACHE_ALIAS = 'default'
+KEY_PREFIX = 'arena'
+DEFAULT_TIMEOUT = 60
+STALE_TIMEOUT = 600
+LOCK_TIMEOUT = 30
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(namespace):
+    return f'{KEY_PREFIX}:version:{namespace}'
+
+
+def versions(namespaces):
+    """
+    Returns the current version of each namespace, creating missing ones.
+
+    Args:
+        namespaces (iterable): The namespace names.
+
+    Returns:
+        tuple: The versions, in the order of ``namespaces``.
+    """
+    namespaces = list(namespaces)
+    cache = _cache()
+    found = cache.get_many([_version_key(namespace) for namespace in namespaces])
+    current = []
+    for namespace in namespaces:
+        key = _version_key(namespace)
+        if key not in found:
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+        current.append(found[key])
+    return tuple(current)
+
+
+def invalidate(*namespaces):
+    """
+    Marks every entry built from any of the namespaces as stale, once the
+    current transaction commits.
+    """
+    def bump():
+        _cache().set_many({_version_key(namespace): time.time_ns() for namespace in namespaces}, None)
+    transaction.on_commit(bump)
+
+
+def get_or_build(key, namespaces, build, timeout=DEFAULT_TIMEOUT, stale_timeout=STALE_TIMEOUT,
+                 cacheable=None):
+    """
+    Returns a cached value, building or revalidating it as needed.
+
+    Args:
+        key (str): The cache key of the value.
+        namespaces (iterable): The namespaces the value depends on.
+        build (callable): Builds the value.
+        timeout (int, optional): Seconds the value stays fresh.
+        stale_timeout (int, optional): Seconds a stale value may still be
+        served while it is rebuilt.
+        cacheable (callable, optional): Called with a built value; a false
+        result stores nothing.
+
+    Returns:
+        The cached or freshly built value.
+    """
+    cache = _cache()
+    key = f'{KEY_PREFIX}:{key}'
+    current = versions(namespaces)
+    entry = cache.get(key)
+    if entry is not None:
+        built_from, fresh_until, value = entry
+        if built_from == current and fresh_until > time.time():
+            return value
+        if not cache.add(f'{key}:lock', 1, LOCK_TIMEOUT):
+            return value
+
+    try:
+        value = build()
+        if cacheable is None or cacheable(value):
+            cache.set(key, (current, time.time() + timeout, value), timeout + stale_timeout)
+    finally:
+        if entry is not None:
+            cache.delete(f'{key}:lock')
+    return value
+
+
+def _cacheable_response(request):
+    def cacheable(response):
+        return (response.status_code == 200 and not response.cookies and not response.streaming
+                and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE'))
+    return cacheable
+
+
+def cached_page(namespaces=(), timeout=DEFAULT_TIMEOUT, stale_timeout=STALE_TIMEOUT):
+    """
+    Caches the responses of a view for GET and HEAD requests.
+
+    Pages only vary on the URL and on whether the visitor is signed in
+    (the navigation bar), so one entry serves every visitor of a kind.
+    Responses that set cookies or use a CSRF token are never stored.
+
+    Args:
+        namespaces (iterable, optional): The namespaces the page depends
+        on. Pages without data never go stale by invalidation.
+        timeout (int, optional): Seconds a response stays fresh.
+        stale_timeout (int, optional): Seconds a stale response may still
+        be served while it is rebuilt.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            path = md5(request.get_full_path().encode()).hexdigest()
+            key = f'page:{view.__module__}.{view.__name__}:{path}:{int(request.user.is_authenticated)}'
+            return get_or_build(key, namespaces, lambda: view(request, *args, **kwargs),
+                                timeout, stale_timeout, _cacheable_response(request))
+        return wrapper
+    return decorator
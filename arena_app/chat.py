@@ -0,0 +1,376 @@
+# chat.py
+"""
+Asyncio chat service for the general chat room.
+
+Connections are plain WebSockets served by the ASGI application in this
+module. Messages are fanned out in memory: each message is encoded once and
+queued for every connected socket, so a slow client never holds up the
+others. ChatMessage rows are persisted by a background flusher in batched
+inserts, off the hot path, and the last HISTORY_SIZE messages are kept in a
+ring buffer that new connections are served from instead of the database.
+
+Handshakes are only accepted from the site's own origins, since the socket
+is authenticated by the session cookie a cross-site page would also send.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from http.cookies import SimpleCookie
+from importlib import import_module
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.db import close_old_connections
+from django.http.request import split_domain_port, validate_host
+from django.utils import timezone
+from django.utils.http import is_same_domain
+
+from .models import ChatMessage, UserProfile
+
+logger = logging.getLogger(__name__)
+
+HISTORY_SIZE = 50
+MAX_MESSAGE_LENGTH = 1000
+FLUSH_INTERVAL = 0.5
+FLUSH_RETRY_INTERVAL = 5.0
+FLUSH_BATCH_SIZE = 500
+# Messages waiting to be written; posts are refused beyond this while the
+# database is unavailable
+MAX_PENDING = 10000
+OUTBOX_SIZE = 200
+PRESENCE_INTERVAL = 1.0
+PRESENCE_LIST_SIZE = 200
+
+
+class ChatRoom:
+    """
+    In-memory fan-out of one chat room with batched persistence.
+    """
+
+    def __init__(self, history_size=HISTORY_SIZE, persist=True):
+        self.history = deque(maxlen=history_size)
+        self.connections = {}
+        self.pending = []
+        self.persist = persist
+        self._history_loaded = False
+        self._flusher = None
+        self._presence = None
+        self._lock = asyncio.Lock()
+
+    def _read_history(self):
+        # Runs in a worker thread outside the request cycle, so stale or
+        # broken connections are not closed for it
+        close_old_connections()
+        try:
+            messages = (ChatMessage.objects.select_related('user')
+                        .order_by('-created_at', '-id')[:self.history.maxlen])
+            return [self.serialize(message.user.username, message.content, message.created_at)
+                    for message in reversed(messages)]
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def _write(batch):
+        close_old_connections()
+        try:
+            ChatMessage.objects.bulk_create(batch)
+        finally:
+            close_old_connections()
+
+    async def load_history(self):
+        """
+        Warms the ring buffer from the database once per process.
+        """
+        async with self._lock:
+            if not self._history_loaded:
+                if self.persist:
+                    self.history.extend(await sync_to_async(self._read_history)())
+                self._history_loaded = True
+
+    @staticmethod
+    def serialize(username, content, created_at):
+        return {'user': username, 'msg': content, 'created_at': created_at.isoformat()}
+
+    def broadcast(self, payload):
+        """
+        Queues an encoded frame for every connection. Connections whose
+        outbox is full are dropped and closed once it drains.
+        """
+        frame = json.dumps(payload)
+        for key, outbox in list(self.connections.items()):
+            try:
+                outbox.put_nowait(frame)
+            except asyncio.QueueFull:
+                del self.connections[key]
+
+    def online_users(self):
+        return sorted({username for (_, username) in self.connections if username})
+
+    def _presence_changed(self):
+        # Joins and leaves are coalesced into one broadcast per interval, so
+        # a burst of connections does not send every socket every join.
+        if self._presence is None or self._presence.done():
+            self._presence = asyncio.ensure_future(self._broadcast_presence())
+
+    async def _broadcast_presence(self):
+        await asyncio.sleep(PRESENCE_INTERVAL)
+        users = self.online_users()
+        self.broadcast({'type': 'users', 'users': users[:PRESENCE_LIST_SIZE], 'count': len(users)})
+
+    def join(self, connection_id, username):
+        outbox = asyncio.Queue(maxsize=OUTBOX_SIZE)
+        outbox.put_nowait(json.dumps({'type': 'history', 'messages': list(self.history)}))
+        self.connections[connection_id, username] = outbox
+        self._presence_changed()
+        return outbox
+
+    def leave(self, connection_id, username):
+        self.connections.pop((connection_id, username), None)
+        self._presence_changed()
+
+    def post(self, user_id, username, content):
+        """
+        Publishes a message to the room and schedules it for persistence.
+
+        Returns:
+            bool: False if the message was refused because too many
+            messages are waiting to be written.
+        """
+        if self.persist and len(self.pending) >= MAX_PENDING:
+            return False
+        created_at = timezone.now()
+        message = self.serialize(username, content, created_at)
+        self.history.append(message)
+        self.broadcast({'type': 'message', **message})
+        if self.persist:
+            self.pending.append(ChatMessage(user_id=user_id, content=content, created_at=created_at))
+            if self._flusher is None or self._flusher.done():
+                self._flusher = asyncio.ensure_future(self._flush_soon())
+        return True
+
+    async def _flush_soon(self):
+        await asyncio.sleep(FLUSH_INTERVAL)
+        await self.flush()
+        while self.pending:
+            # A write failed or messages arrived meanwhile
+            await asyncio.sleep(FLUSH_RETRY_INTERVAL)
+            await self.flush()
+
+    async def flush(self):
+        """
+        Writes the pending messages in batched inserts. A batch that fails
+        is put back in front of the pending messages for the next flush.
+
+        Returns:
+            int: The number of messages written.
+        """
+        written = 0
+        while self.pending:
+            batch, self.pending = self.pending[:FLUSH_BATCH_SIZE], self.pending[FLUSH_BATCH_SIZE:]
+            try:
+                await sync_to_async(self._write)(batch)
+            except Exception:
+                self.pending = batch + self.pending
+                logger.exception('Could not save %s chat messages, keeping them for the next flush',
+                                 len(self.pending))
+                break
+            written += len(batch)
+        return written
+
+
+room = ChatRoom()
+
+
+def _session_user(headers):
+    """
+    Resolves the authenticated user of a connection from its session
+    cookie, the same way AuthenticationMiddleware does.
+    """
+    cookies = SimpleCookie()
+    cookies.load(headers.get(b'cookie', b'').decode())
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    close_old_connections()
+    try:
+        session = import_module(settings.SESSION_ENGINE).SessionStore(morsel.value)
+        user = get_user(SimpleNamespace(session=session))
+        return (user.pk, user.username) if user.is_authenticated else None
+    finally:
+        close_old_connections()
+
+
+def origin_allowed(origin):
+    """
+    Whether a handshake's Origin is the site itself or a trusted origin,
+    matched as CsrfViewMiddleware matches unsafe requests.
+
+    Args:
+        origin (str): The Origin header, or None when it is missing.
+
+    Returns:
+        bool: True if the origin's host is in ALLOWED_HOSTS or the origin
+        is in CSRF_TRUSTED_ORIGINS.
+    """
+    if not origin:
+        return False
+    if origin in settings.CSRF_TRUSTED_ORIGINS:
+        return True
+    parsed = urlsplit(origin)
+    if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+        return False
+    for trusted in settings.CSRF_TRUSTED_ORIGINS:
+        if '*' in trusted:
+            trusted = urlsplit(trusted)
+            if trusted.scheme == parsed.scheme and is_same_domain(parsed.netloc, trusted.netloc.lstrip('*')):
+                return True
+    allowed_hosts = settings.ALLOWED_HOSTS
+    if settings.DEBUG and not allowed_hosts:
+        allowed_hosts = ['.localhost', '127.0.0.1', '[::1]']
+    domain, _ = split_domain_port(parsed.netloc)
+    return bool(domain) and validate_host(domain, allowed_hosts)
+
+
+async def _writer(send, outbox, is_connected):
+    while True:
+        frame = await outbox.get()
+        await send({'type': 'websocket.send', 'text': frame})
+        if outbox.empty() and not is_connected():
+            await send({'type': 'websocket.close', 'code': 1008})
+            return
+
+
+async def chat_socket(scope, receive, send, chat_room=None):
+    """
+    ASGI application serving the general chat room over a WebSocket.
+
+    Anonymous visitors can read the room; only signed-in users can post.
+    Handshakes from other origins are refused. In-process callers that put
+    the user in the scope themselves skip the session and origin checks.
+    """
+    chat_room = chat_room or room
+    if scope['type'] != 'websocket':
+        await send({'type': 'http.response.start', 'status': 426,
+                    'headers': [(b'content-type', b'text/plain')]})
+        await send({'type': 'http.response.body', 'body': b'WebSocket connection required'})
+        return
+
+    message = await receive()
+    if message['type'] != 'websocket.connect':
+        return
+    if 'user' in scope:
+        user = scope['user']
+    else:
+        headers = dict(scope.get('headers') or [])
+        if not origin_allowed(headers.get(b'origin', b'').decode('latin-1') or None):
+            # Closing before accepting rejects the handshake with a 403
+            await send({'type': 'websocket.close', 'code': 1008})
+            return
+        user = await sync_to_async(_session_user)(headers)
+    user_id, username = user if user else (None, None)
+
+    await chat_room.load_history()
+    await send({'type': 'websocket.accept'})
+    connection_id = object()
+    outbox = chat_room.join(connection_id, username)
+    key = (connection_id, username)
+    writer = asyncio.ensure_future(_writer(send, outbox, lambda: key in chat_room.connections))
+    try:
+        while True:
+            message = await receive()
+            if message['type'] == 'websocket.disconnect':
+                break
+            if key not in chat_room.connections:
+                continue  # dropped for being too slow, closed by the writer
+            try:
+                data = json.loads(message.get('text') or '{}')
+            except ValueError:
+                continue
+            content = str(data.get('msg', '')).strip()
+            if user_id is None:
+                error = 'You must be signed in to chat.'
+            elif not content:
+                error = 'Message cannot be empty'
+            elif len(content) > MAX_MESSAGE_LENGTH:
+                error = f'Messages are limited to {MAX_MESSAGE_LENGTH} characters.'
+            elif chat_room.post(user_id, username, content):
+                continue
+            else:
+                error = 'Chat is busy, please try again in a moment.'
+            if not outbox.full():
+                outbox.put_nowait(json.dumps({'type': 'error', 'error': error}))
+    finally:
+        writer.cancel()
+        chat_room.leave(connection_id, username)
+        if not chat_room.connections and chat_room.pending:
+            await chat_room.flush()
+
+
+async def run_load_test(clients=1000, messages=200, senders=50, persist=False):
+    """
+    Drives the chat application in-process with simulated sockets.
+
+    Args:
+        clients (int): Number of connected sockets.
+        messages (int): Number of messages posted in total.
+        senders (int): Number of sockets posting messages.
+        persist (bool): Whether messages are written to the database.
+
+    Returns:
+        dict: Connections held, frames delivered, messages and frames per
+        second and the time taken in seconds.
+    """
+    chat_room = ChatRoom(persist=persist)
+    users = [(index + 1, f'load{index}') for index in range(clients)]
+    if persist:
+        # Persisted messages need real authors, the senders reuse existing users
+        existing = await sync_to_async(list)(UserProfile.objects.values_list('pk', 'username')[:senders])
+        if not existing:
+            raise ValueError('Persisting the load test needs at least one user.')
+        for index in range(senders):
+            users[index] = existing[index % len(existing)]
+    delivered = 0
+    done = asyncio.Event()
+    expected = clients * messages
+    inboxes = []
+
+    async def connect(index):
+        inbox = asyncio.Queue()
+        inboxes.append(inbox)
+        await inbox.put({'type': 'websocket.connect'})
+
+        async def send(event):
+            nonlocal delivered
+            if event['type'] == 'websocket.send' and '"type": "message"' in event['text']:
+                delivered += 1
+                if delivered >= expected:
+                    done.set()
+
+        scope = {'type': 'websocket', 'user': users[index]}
+        await chat_socket(scope, inbox.get, send, chat_room=chat_room)
+
+    sockets = [asyncio.ensure_future(connect(index)) for index in range(clients)]
+    while len(chat_room.connections) < clients:
+        await asyncio.sleep(0.01)
+
+    started = time.perf_counter()
+    for number in range(messages):
+        await inboxes[number % senders].put({'type': 'websocket.receive',
+                                             'text': json.dumps({'msg': f'message {number}'})})
+        if number % senders == senders - 1:
+            await asyncio.sleep(0)
+    await asyncio.wait_for(done.wait(), timeout=max(60, messages))
+    elapsed = time.perf_counter() - started
+
+    for inbox in inboxes:
+        await inbox.put({'type': 'websocket.disconnect'})
+    await asyncio.gather(*sockets)
+    await chat_room.flush()
+    return {'connections': clients, 'delivered': delivered,
+            'messages_per_second': messages / elapsed if elapsed else 0,
+            'frames_per_second': delivered / elapsed if elapsed else 0, 'seconds': elapsed}
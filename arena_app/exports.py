@@ -0,0 +1,191 @@
+# exports.py
+"""
+Streaming CSV and NDJSON exports.
+
+Each export reads its rows in primary key ranges of CHUNK_SIZE (keyset
+batches, not OFFSET and not a driver cursor, which MySQL's client would
+buffer whole) and turns each row into a line as it goes, so memory stays
+the same however many rows are exported. The lines feed a
+StreamingHttpResponse (views.export_data) or a file (the export_data
+command).
+"""
+import csv
+import json
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.db.models import DateTimeField
+
+from .models import ChatMessage, LiveScore, Tip, TipsterStats
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+# columns: {column: field path}; date_field, sport_field and user_field are
+# the lookups of the start/end, sport and user filters, None if unsupported
+Export = namedtuple('Export', ['model', 'columns', 'date_field', 'sport_field', 'user_field'])
+
+EXPORTS = {
+    'tips': Export(
+        Tip,
+        {'id': 'id', 'user': 'user__username', 'sport': 'sport__name', 'fixture_id': 'fixture_id',
+         'market': 'market', 'bet_type': 'bet_type', 'odds': 'odds', 'points_bet': 'points_bet',
+         'is_win': 'is_win', 'settled_at': 'settled_at', 'created_at': 'created_at'},
+        'created_at', 'sport__name', 'user__username',
+    ),
+    'tipster_stats': Export(
+        TipsterStats,
+        {'user': 'user__username', 'total_bets_placed': 'total_bets_placed', 'total_wins': 'total_wins',
+         'points_balance': 'points_balance', 'last_points_reset': 'last_points_reset'},
+        'last_points_reset', None, 'user__username',
+    ),
+    'live_scores': Export(
+        LiveScore,
+        {'id': 'id', 'league': 'league', 'home_team': 'home_team', 'away_team': 'away_team',
+         'home_score': 'home_score', 'away_score': 'away_score', 'match_status': 'match_status',
+         'match_time': 'match_time', 'timestamp': 'timestamp'},
+        'timestamp', None, None,
+    ),
+    'chat_messages': Export(
+        ChatMessage,
+        {'id': 'id', 'user': 'user__username', 'content': 'content', 'created_at': 'created_at'},
+        'created_at', None, 'user__username',
+    ),
+}
+
+
+def _parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except ValueError as error:
+        raise ValueError(f'{name} must be an ISO date (YYYY-MM-DD).') from error
+
+
+def queryset(name, start=None, end=None, sport=None, user=None):
+    """
+    Returns the filtered rows of an export, unordered.
+
+    Args:
+        name (str): A key of EXPORTS.
+        start (str, optional): The first day included, as an ISO date.
+        end (str, optional): The last day included, as an ISO date.
+        sport (str, optional): Only rows of this sport name.
+        user (str, optional): Only rows of this username.
+
+    Returns:
+        QuerySet: The matching rows.
+
+    Raises:
+        ValueError: If a filter is malformed or the export does not
+        support it.
+    """
+    export = EXPORTS[name]
+    rows = export.model.objects.all()
+    filters = {'start': (start, export.date_field), 'end': (end, export.date_field),
+               'sport': (sport, export.sport_field), 'user': (user, export.user_field)}
+    for filter_name, (value, field) in filters.items():
+        if not value:
+            continue
+        if field is None:
+            raise ValueError(f'The {name} export cannot be filtered by {filter_name}.')
+        if filter_name in ('start', 'end'):
+            # Timestamps are compared by their day
+            day = '__date' if isinstance(export.model._meta.get_field(field), DateTimeField) else ''
+            lookup = 'gte' if filter_name == 'start' else 'lte'
+            rows = rows.filter(**{f'{field}{day}__{lookup}': _parse_date(value, filter_name)})
+        else:
+            rows = rows.filter(**{field: value})
+    return rows
+
+
+def rows(name, chunk_size=CHUNK_SIZE, **filters):
+    """
+    Yields the rows of an export as tuples in primary key order, one
+    chunk in memory at a time.
+
+    Args:
+        name (str): A key of EXPORTS.
+        chunk_size (int, optional): Rows fetched per query.
+        **filters: The filters of queryset().
+
+    Raises:
+        ValueError: As queryset(), before the first row is read.
+    """
+    columns = list(EXPORTS[name].columns.values())
+    matching = queryset(name, **filters).order_by('pk')
+
+    def generate():
+        last_pk = None
+        while True:
+            chunk = matching if last_pk is None else matching.filter(pk__gt=last_pk)
+            chunk = list(chunk.values_list('pk', *columns)[:chunk_size])
+            for row in chunk:
+                yield row[1:]
+            if len(chunk) < chunk_size:
+                return
+            last_pk = chunk[-1][0]
+
+    return generate()
+
+
+def _value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class _Echo:
+    # csv.writer target that hands each formatted line back
+    def write(self, value):
+        return value
+
+
+def _csv_lines(header, data):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in data:
+        yield writer.writerow([_value(value) for value in row])
+
+
+def _ndjson_lines(header, data):
+    for row in data:
+        yield json.dumps(dict(zip(header, map(_value, row)))) + '\n'
+
+
+def lines(name, file_format='csv', chunk_size=CHUNK_SIZE, **filters):
+    """
+    Yields an export as CSV (with a header) or NDJSON text, one block of
+    up to ``chunk_size`` lines at a time so the response is not written
+    row by row.
+
+    Args:
+        name (str): A key of EXPORTS.
+        file_format (str, optional): "csv" or "ndjson".
+        chunk_size (int, optional): Rows fetched per query and per block.
+        **filters: The filters of queryset().
+
+    Raises:
+        ValueError: If the format or a filter is invalid, before the first
+        block is produced.
+    """
+    if file_format not in FORMATS:
+        raise ValueError(f'Unknown format {file_format!r}, expected one of {", ".join(FORMATS)}.')
+    header = list(EXPORTS[name].columns)
+    data = rows(name, chunk_size=chunk_size, **filters)
+    source = (_csv_lines if file_format == 'csv' else _ndjson_lines)(header, data)
+
+    def generate():
+        block = []
+        for line in source:
+            block.append(line)
+            if len(block) >= chunk_size:
+                yield ''.join(block)
+                block = []
+        if block:
+            yield ''.join(block)
+
+    return generate()
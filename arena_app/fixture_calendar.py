@@ -0,0 +1,151 @@
+# fixture_calendar.py
+"""
+Fixture calendar.
+
+window() returns the fixtures of a sport (or of every sport) over a day
+or a week with their results and latest odds, read with one query; the
+sports and teams come from the reference cache.
+
+Each (sport, day) has a cache namespace whose version moves when one of
+the day's fixtures, its result or its odds change (signals.py, and
+odds.ingest for the bulk feed). watermark() turns the versions of a
+window into an ETag and a Last-Modified time without touching the
+database, so views.fixture_calendar_api answers clients that already
+have the window with a 304, and builds each version of a window once.
+
+Days before yesterday are over and their results in, so windows that
+end before then are cached for a day. They are not immutable, since a
+corrected result still changes them, and clients revalidate them with
+the ETag.
+"""
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+from hashlib import md5
+
+from django.utils import timezone
+
+from . import caching, reference
+from .models import Fixture
+
+WINDOWS = {'day': 1, 'week': 7}
+SETTLED_AFTER_DAYS = 2
+
+Watermark = namedtuple('Watermark', ['etag', 'last_modified'])
+
+
+def _days(start, end):
+    return [start + timedelta(days=n) for n in range((end - start).days + 1)]
+
+
+def _namespace(sport_id, day):
+    return f'calendar:{sport_id}:{day.isoformat()}'
+
+
+def touch(fixtures):
+    """
+    Marks the calendar days of fixtures as changed once the current
+    transaction commits.
+
+    Args:
+        fixtures (iterable): (sport_id, date_time) pairs.
+    """
+    namespaces = {_namespace(sport_id, timezone.localdate(date_time)) for sport_id, date_time in fixtures}
+    if namespaces:
+        caching.invalidate(*namespaces)
+
+
+def bounds(start=None, window='day'):
+    """
+    Returns the first and last day of a calendar window.
+
+    Args:
+        start (date, optional): The first day. Defaults to today.
+        window (str, optional): "day" or "week" (seven days).
+
+    Returns:
+        tuple: The first and last day, both included.
+
+    Raises:
+        ValueError: If the window is unknown.
+    """
+    if window not in WINDOWS:
+        raise ValueError(f'Unknown window {window!r}, expected one of {", ".join(WINDOWS)}.')
+    start = start or timezone.localdate()
+    return start, start + timedelta(days=WINDOWS[window] - 1)
+
+
+def is_settled(end):
+    """
+    Tells whether a window ending on ``end`` can no longer change.
+    """
+    return end <= timezone.localdate() - timedelta(days=SETTLED_AFTER_DAYS)
+
+
+def watermark(sport_ids, start, end):
+    """
+    Returns the validators of a window, read from the cache only.
+
+    Args:
+        sport_ids (list): The sports of the window.
+        start (date): The first day.
+        end (date): The last day.
+
+    Returns:
+        Watermark: A strong ETag (unquoted) that changes whenever the
+        window does, and when it last changed, as a POSIX timestamp.
+    """
+    namespaces = [reference.NAMESPACE] + [_namespace(sport_id, day) for sport_id in sport_ids
+                                          for day in _days(start, end)]
+    versions = caching.versions(namespaces)
+    etag = md5(repr((sorted(sport_ids), start, end, versions)).encode()).hexdigest()
+    # Versions are the time_ns of the change, or of the first request
+    # after the cache forgot them
+    return Watermark(etag, max(versions) // 10 ** 9)
+
+
+def queryset(sport_ids, start, end):
+    """
+    Returns the fixtures of a window with their result and odds joined.
+    """
+    first = timezone.make_aware(datetime.combine(start, time.min))
+    after = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+    return (Fixture.objects.filter(sport_id__in=sport_ids, date_time__gte=first, date_time__lt=after)
+            .select_related('result', 'sportsodds').order_by('date_time', 'pk'))
+
+
+def _fixture_json(fixture):
+    result = getattr(fixture, 'result', None)
+    odds = getattr(fixture, 'sportsodds', None)
+    return {
+        'id': fixture.pk,
+        'sport': fixture.sport.name,
+        'date_time': fixture.date_time.isoformat(),
+        'home': fixture.team_home.name,
+        'away': fixture.team_away.name,
+        'result': {'home': result.team_home_score, 'away': result.team_away_score} if result else None,
+        'odds': {'home': odds.team_home_odds, 'away': odds.team_away_odds, 'draw': odds.draw_odds} if odds else None,
+    }
+
+
+def window(sport_ids, start, end):
+    """
+    Returns a calendar window, ready to be serialized.
+
+    Args:
+        sport_ids (list): The sports of the window.
+        start (date): The first day.
+        end (date): The last day.
+
+    Returns:
+        dict: "start", "end" and "days", one entry per day with its
+        "fixtures" in kick-off order.
+    """
+    fixtures = reference.attach(queryset(sport_ids, start, end), 'sport', 'team_home', 'team_away')
+    days = {day: [] for day in _days(start, end)}
+    for fixture in fixtures:
+        days[timezone.localdate(fixture.date_time)].append(_fixture_json(fixture))
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'days': [{'day': day.isoformat(), 'fixtures': day_fixtures} for day, day_fixtures in days.items()],
+    }
@@ -1,8 +1,75 @@
 # forms.py
+from datetime import timedelta
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
+from django.utils import timezone
 from .models import UserProfile, BlogPost
-from .models import Tip, Sport
+from .models import Tip, Sport, Fixture
+from . import reference
+
+# How far ahead the tip form lists fixtures
+FIXTURE_WINDOW_DAYS = 14
+
+
+class ReferenceChoiceIterator(forms.models.ModelChoiceIterator):
+    """
+    Yields the choices of a ReferenceChoiceField from the reference cache.
+    """
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.field.cached_objects():
+            yield self.choice(obj)
+
+    def __len__(self):
+        return len(self.field.cached_objects()) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.cached_objects())
+
+
+class ReferenceChoiceField(forms.ModelChoiceField):
+    """
+    A choice of Sport or Team served from arena_app.reference, so rendering
+    and validating it runs no query.
+
+    The choices are every row of the model, in name order. Values the cache
+    does not know yet fall back to the queryset.
+    """
+
+    iterator = ReferenceChoiceIterator
+
+    def cached_objects(self):
+        tables = reference.tables()
+        return list((tables.sports if self.queryset.model is Sport else tables.teams).values())
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        tables = reference.tables()
+        by_id, by_name = ((tables.sports, tables.sports_by_name) if self.queryset.model is Sport
+                          else (tables.teams, tables.teams_by_name))
+        key = self.to_field_name or 'pk'
+        if key == 'name':
+            obj = by_name.get(str(value))
+        elif key in ('pk', 'id') and str(value).isdigit():
+            obj = by_id.get(int(value))
+        else:
+            obj = None
+        return obj if obj is not None else super().to_python(value)
+
+
+class FixtureChoiceField(forms.ModelChoiceField):
+    """
+    A choice of fixture labelled with team names from the reference cache,
+    so the fixtures are listed without joining their teams.
+    """
+
+    def label_from_instance(self, obj):
+        reference.attach([obj], 'team_home', 'team_away')
+        return str(obj)
 
 
 class UserRegistrationForm(UserCreationForm):
@@ -63,7 +130,7 @@ class BettingTipForm(forms.ModelForm):
     to bet.
 
     Attributes:
-        sport (ChoiceField): A dropdown field for selecting the sport.
+        sport (ReferenceChoiceField): A dropdown field for selecting the sport.
         bet_description (CharField): A textarea field for entering the
         bet description.
         reasoning (CharField): An optional textarea field for providing
@@ -71,10 +138,12 @@ class BettingTipForm(forms.ModelForm):
         odds_given (DecimalField): An input field for entering the odds.
         points_bet (IntegerField): An input field for entering the number of
         points to bet.
+        fixture (FixtureChoiceField): An optional fixture starting within
+        FIXTURE_WINDOW_DAYS that the tip is settled against.
+        market (ChoiceField): The market of the tip on that fixture.
 
-    Methods:
-        clean_points_bet: Validates the number of points to bet against the
-        user's points balance.
+    The stake is checked against the user's balance when it is debited by
+    arena_app.ledger, not by the form.
 
     """
     # Dropdown for sport selection
@@ -84,7 +153,12 @@ class BettingTipForm(forms.ModelForm):
         ('Horse Racing', 'Horse Racing'),
         ('Tennis', 'Tennis'),
     ]
-    sport = forms.ModelChoiceField(queryset=Sport.objects.all(), empty_label="Choose a Sport")
+    sport = ReferenceChoiceField(queryset=Sport.objects.all(), to_field_name='name',
+                                 empty_label="Choose a Sport")
+
+    # The upcoming fixtures are set per request in __init__
+    fixture = FixtureChoiceField(queryset=Fixture.objects.none(), required=False,
+                                 label="Fixture")
 
     # Textarea for bet description
     bet_description = forms.CharField(
@@ -117,36 +191,40 @@ class BettingTipForm(forms.ModelForm):
         """
         The Meta class provides additional information about the TipForm class.
         It specifies the model to be used and the fields to be included
-        in the form.
+        in the form. The sport and fixture are set on the tip by clean(),
+        since their choice fields have already loaded them and the model
+        validation would only query them again.
         """
         model = Tip
-        fields = ['sport',
+        fields = ['market',
                   'bet_description',
                   'reasoning',
                   'odds_given',
                   'points_bet']
 
-    def clean_points_bet(self):
-        """
-        Validates the number of points to bet against the user's
-        points balance.
+    field_order = ['sport', 'fixture', 'market']
 
-        Returns:
-            int: The validated number of points to bet.
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Only fixtures starting in the next FIXTURE_WINDOW_DAYS can be tipped on
+        now = timezone.now()
+        self.fields['fixture'].queryset = Fixture.objects.filter(
+            date_time__gte=now,
+            date_time__lt=now + timedelta(days=FIXTURE_WINDOW_DAYS),
+        ).order_by('date_time')
 
-        Raises:
-            forms.ValidationError: If the number of points to bet is greater
-            than the user's points balance.
+    def clean(self):
         """
-        points_bet = self.cleaned_data['points_bet']
-        user_points_balance = self.initial.get('user_points_balance', 1000)
-        # Default to 1000 if not provided
-
-        if points_bet > user_points_balance:
-            raise forms.ValidationError("You cannot bet more points than your current balance.")
-
-        return points_bet
-
+        Requires a market whenever a fixture is chosen, so the tip can be
+        settled against the fixture's result, and sets the chosen sport
+        and fixture on the tip.
+        """
+        cleaned_data = super().clean()
+        if cleaned_data.get('fixture') and not cleaned_data.get('market'):
+            self.add_error('market', 'Choose a market for the selected fixture.')
+        self.instance.sport = cleaned_data.get('sport')
+        self.instance.fixture = cleaned_data.get('fixture')
+        return cleaned_data
 
 
 class BlogPostForm(forms.ModelForm):
@@ -0,0 +1,194 @@
+# instrumentation.py
+"""
+Per-request SQL instrumentation.
+
+SQLInstrumentationMiddleware wraps every statement a request runs (via
+connection.execute_wrapper) and records the query count, the time spent
+in the database and a fingerprint of each statement: its SQL with
+literals and IN lists collapsed. A fingerprint seen N_PLUS_ONE_THRESHOLD
+times in one request is reported as an N+1 pattern, with the first
+arena_app frame that issued it.
+
+Each request gets a Server-Timing header (db;dur=...;desc="n queries"),
+one structured log line on the "arena_app.sql" logger (INFO when a
+request is slow or has an N+1, DEBUG otherwise) and an entry in a rolling
+in-process summary per view, readable with summary().
+
+The middleware is opt-in (SQL_INSTRUMENTATION=True in the environment
+adds it to MIDDLEWARE) and never logs statement parameters.
+"""
+import json
+import logging
+import re
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from hashlib import md5
+from pathlib import Path
+
+from django.db import connections
+
+logger = logging.getLogger('arena_app.sql')
+
+N_PLUS_ONE_THRESHOLD = 5
+SLOW_REQUEST_MS = 500
+SUMMARY_SIZE = 1000
+
+APP_DIR = str(Path(__file__).resolve().parent)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\bIN \((?:[^()]*)\)', re.IGNORECASE)
+_SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """
+    Returns the normalized form of a statement and a short hash of it.
+
+    Statements that only differ by their parameters, literals or the
+    length of an IN list share a fingerprint.
+    """
+    normalized = _SPACES.sub(' ', _IN_LISTS.sub('IN (...)', _LITERALS.sub('?', sql))).strip()
+    return md5(normalized.encode()).hexdigest()[:12], normalized
+
+
+def _call_site():
+    for frame in reversed(traceback.extract_stack()[:-3]):
+        if frame.filename.startswith(APP_DIR) and not frame.filename.endswith('instrumentation.py'):
+            return f'{Path(frame.filename).name}:{frame.lineno} in {frame.name}'
+    return None
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper collecting the statements of one request.
+    """
+
+    def __init__(self, threshold=N_PLUS_ONE_THRESHOLD):
+        self.threshold = threshold
+        self.count = 0
+        self.seconds = 0.0
+        self.fingerprints = Counter()
+        self.statements = {}
+        self.call_sites = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            key, normalized = fingerprint(sql)
+            self.fingerprints[key] += 1
+            self.statements.setdefault(key, normalized)
+            # The stack is only walked once a statement starts repeating
+            if self.fingerprints[key] == self.threshold:
+                self.call_sites[key] = _call_site()
+
+    def repeated(self):
+        """
+        Returns the statements run at least ``threshold`` times.
+
+        Returns:
+            list: Dicts with the fingerprint, count, SQL and call site.
+        """
+        return [
+            {'fingerprint': key, 'count': count, 'sql': self.statements[key],
+             'call_site': self.call_sites.get(key)}
+            for key, count in self.fingerprints.most_common() if count >= self.threshold
+        ]
+
+
+class RequestSummary:
+    """
+    Rolling per-view totals over the last SUMMARY_SIZE requests.
+    """
+
+    def __init__(self, size=SUMMARY_SIZE):
+        self.requests = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def add(self, record):
+        with self.lock:
+            self.requests.append(record)
+
+    def by_view(self):
+        """
+        Returns the request count, average and maximum queries and DB time,
+        and the number of N+1 requests of each view, busiest view first.
+        """
+        with self.lock:
+            records = list(self.requests)
+        views = {}
+        for record in records:
+            view = views.setdefault(record['view'], {'requests': 0, 'queries': 0, 'max_queries': 0,
+                                                     'db_ms': 0.0, 'max_db_ms': 0.0, 'n_plus_one': 0})
+            view['requests'] += 1
+            view['queries'] += record['queries']
+            view['max_queries'] = max(view['max_queries'], record['queries'])
+            view['db_ms'] += record['db_ms']
+            view['max_db_ms'] = max(view['max_db_ms'], record['db_ms'])
+            view['n_plus_one'] += bool(record['repeated'])
+        for view in views.values():
+            view['avg_queries'] = round(view.pop('queries') / view['requests'], 1)
+            view['avg_db_ms'] = round(view.pop('db_ms') / view['requests'], 2)
+            view['max_db_ms'] = round(view['max_db_ms'], 2)
+        return dict(sorted(views.items(), key=lambda item: -item[1]['requests']))
+
+
+_summary = RequestSummary()
+
+
+def summary():
+    """
+    Returns the rolling per-view summary of this process.
+    """
+    return _summary.by_view()
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return request.path
+    return match.view_name or match._func_path
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Records the SQL of each request and reports it in a Server-Timing
+    header, a log line and the rolling summary.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connections['default'].execute_wrapper(recorder):
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.seconds * 1000
+
+        timing = f'db;dur={db_ms:.1f};desc="{recorder.count} queries", app;dur={total_ms:.1f}'
+        if response.has_header('Server-Timing'):
+            timing = f"{response['Server-Timing']}, {timing}"
+        response['Server-Timing'] = timing
+
+        record = {
+            'view': _view_name(request),
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'db_ms': round(db_ms, 2),
+            'total_ms': round(total_ms, 2),
+            'repeated': recorder.repeated(),
+        }
+        _summary.add(record)
+        level = logging.INFO if record['repeated'] or total_ms >= SLOW_REQUEST_MS else logging.DEBUG
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps(record))
+        return response
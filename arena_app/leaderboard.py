@@ -0,0 +1,349 @@
+# leaderboard.py
+"""
+Materialized tipster leaderboard.
+
+Every tipster has one LeaderboardEntry on the overall board (sport is NULL)
+and one per sport they have tipped on. Entries are kept up to date as tips
+are created, settled or deleted and as balances change. Boards are ordered
+by points balance (ties broken by user id) and read a page at a time from
+the (sport, -points_balance, user) index with a keyset cursor, so a balance
+change writes only the tipster's own entries and no stored rank can go
+stale or collide when several balances move at once.
+Writes made here outside model saves invalidate the cached league table.
+"""
+import base64
+from copy import copy
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from . import caching
+from .bulk import increment_by_key
+from .pagination import MAX_ID
+from .models import LeaderboardEntry, TipsterAnalytics, TipsterStats, Tip, UserProfile
+
+PAGE_SIZE = 100
+
+
+def encode_cursor(entry):
+    """
+    Encodes the board position of an entry into an opaque, URL-safe cursor.
+    """
+    raw = f"{entry.points_balance}|{entry.user_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decodes a cursor produced by encode_cursor.
+
+    Returns:
+        tuple: The (points_balance, user_id) position.
+
+    Raises:
+        ValueError: If the cursor is malformed, or carries a value no
+        entry can have.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+        balance, user_id = raw.split('|')
+        balance, user_id = int(balance), int(user_id)
+    except (ValueError, UnicodeDecodeError) as error:
+        raise ValueError('Invalid cursor') from error
+    if not (-MAX_ID <= balance <= MAX_ID and 0 < user_id <= MAX_ID):
+        raise ValueError('Invalid cursor')
+    return balance, user_id
+
+
+def board_queryset(sport=None):
+    """
+    Returns the entries of a leaderboard in board order.
+
+    Args:
+        sport (Sport or str, optional): The sport (or sport name) of the
+        board. Defaults to the overall board.
+
+    Returns:
+        QuerySet: The LeaderboardEntry rows, best balance first, with their
+        users and the yield_pct and roi_pct of their analytics snapshot.
+    """
+    entries = LeaderboardEntry.objects.select_related('user')
+    analytics = TipsterAnalytics.objects.filter(user_id=OuterRef('user_id'))
+    if sport is None:
+        entries = entries.filter(sport__isnull=True)
+        analytics = analytics.filter(sport__isnull=True)
+    else:
+        if isinstance(sport, str):
+            entries = entries.filter(sport__name=sport)
+        else:
+            entries = entries.filter(sport=sport)
+        analytics = analytics.filter(sport_id=OuterRef('sport_id'))
+    entries = entries.annotate(yield_pct=Subquery(analytics.values('yield_pct')[:1]),
+                               roi_pct=Subquery(analytics.values('roi_pct')[:1]))
+    return entries.order_by('-points_balance', 'user_id')
+
+
+def board_page(sport=None, cursor=None, page_size=PAGE_SIZE):
+    """
+    Returns one page of a leaderboard, in board order.
+
+    Args:
+        sport (Sport or str, optional): The sport (or sport name) of the
+        board. Defaults to the overall board.
+        cursor (str, optional): The cursor of the previous page's last
+        entry. Defaults to the top of the board.
+        page_size (int, optional): Number of entries per page.
+
+    Returns:
+        tuple: The entries of the page, each with its ``rank`` set, and the
+        cursor of the next page, or None on the last page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    entries = board_queryset(sport)
+    first_rank = 1
+    if cursor:
+        balance, user_id = decode_cursor(cursor)
+        ahead = Q(points_balance__gt=balance) | Q(points_balance=balance, user_id__lte=user_id)
+        # An index range count, so ranks stay exact however balances moved
+        first_rank = entries.filter(ahead).order_by().count() + 1
+        entries = entries.exclude(ahead)
+    rows = list(entries[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1])
+    for rank, entry in enumerate(rows, start=first_rank):
+        entry.rank = rank
+    return rows, next_cursor
+
+
+def _board(sport_id):
+    return LeaderboardEntry.objects.filter(sport_id=sport_id)
+
+
+def _default_balance():
+    return TipsterStats._meta.get_field('points_balance').default
+
+
+def _current_balance(user_id):
+    stats = TipsterStats.objects.filter(user_id=user_id).values_list('points_balance', flat=True).first()
+    return _default_balance() if stats is None else stats
+
+
+def _ensure_entries(user_id, sport_ids):
+    """
+    Returns the entries of a user on the given boards, creating the missing
+    ones.
+    """
+    entries = {entry.sport_id: entry
+               for entry in LeaderboardEntry.objects.filter(user_id=user_id)}
+    missing = [sport_id for sport_id in sport_ids if sport_id not in entries]
+    if missing:
+        balance = entries[None].points_balance if None in entries else _current_balance(user_id)
+        for sport_id in missing:
+            entries[sport_id] = LeaderboardEntry.objects.create(user_id=user_id, sport_id=sport_id,
+                                                                points_balance=balance)
+    return [entries[sport_id] for sport_id in sport_ids]
+
+
+def _boards_for(sport_id):
+    return [None] if sport_id is None else [None, sport_id]
+
+
+def record_tip(tip):
+    """
+    Adds a newly created tip to the overall board and the board of its sport.
+
+    Args:
+        tip (Tip): The tip that was created.
+    """
+    with transaction.atomic():
+        entries = _ensure_entries(tip.user_id, _boards_for(tip.sport_id))
+        LeaderboardEntry.objects.filter(pk__in=[entry.pk for entry in entries]).update(
+            bets=F('bets') + 1,
+            wins=F('wins') + (1 if tip.is_win else 0),
+            odds_total=F('odds_total') + (tip.odds or 0),
+            odds_count=F('odds_count') + (0 if tip.odds is None else 1),
+        )
+
+
+def record_tip_on_commit(tip):
+    """
+    Adds a newly created tip to its boards once the current transaction
+    commits, keeping the UPDATEs out of the transaction that saved it.
+
+    The tipster's entries are created now, so settling or deleting the tip
+    before the commit still moves rows that exist. The tip is counted as it
+    was created, and the updates add up in any order.
+
+    Args:
+        tip (Tip): The tip that was created.
+    """
+    _ensure_entries(tip.user_id, _boards_for(tip.sport_id))
+    created = copy(tip)
+    transaction.on_commit(lambda: record_tip(created), robust=True)
+
+
+def record_tips(tips):
+    """
+    Adds a batch of newly created tips to their boards, with one UPDATE
+    per chunk of entries instead of one per tip.
+
+    Args:
+        tips (list): The tips that were created.
+
+    Returns:
+        int: The number of entries updated.
+    """
+    deltas = {}
+    for tip in tips:
+        for sport_id in _boards_for(tip.sport_id):
+            changes = deltas.setdefault((tip.user_id, sport_id),
+                                        {'bets': 0, 'wins': 0, 'odds_total': 0, 'odds_count': 0})
+            changes['bets'] += 1
+            changes['wins'] += 1 if tip.is_win else 0
+            changes['odds_total'] += tip.odds or 0
+            changes['odds_count'] += 0 if tip.odds is None else 1
+    boards = {}
+    for user_id, sport_id in deltas:
+        boards.setdefault(user_id, []).append(sport_id)
+    with transaction.atomic():
+        pks = {}
+        for user_id, sport_ids in boards.items():
+            for entry in _ensure_entries(user_id, sport_ids):
+                pks[(user_id, entry.sport_id)] = entry.pk
+        return increment_by_key(LeaderboardEntry.objects.all(), 'pk',
+                                {pks[key]: changes for key, changes in deltas.items()})
+
+
+def remove_tip(tip):
+    """
+    Removes a deleted tip from the boards it was counted on.
+
+    Args:
+        tip (Tip): The tip that was deleted.
+    """
+    entries = LeaderboardEntry.objects.filter(user_id=tip.user_id).filter(
+        Q(sport__isnull=True) | Q(sport_id=tip.sport_id))
+    entries.update(
+        bets=F('bets') - 1,
+        wins=F('wins') - (1 if tip.is_win else 0),
+        odds_total=F('odds_total') - (tip.odds or 0),
+        odds_count=F('odds_count') - (0 if tip.odds is None else 1),
+    )
+
+
+def record_outcome(user_id, sport_id, was_win, is_win):
+    """
+    Applies a change of a tip's outcome (for example on settlement).
+
+    Args:
+        user_id (int): The tipster of the tip.
+        sport_id (int or None): The sport of the tip.
+        was_win (bool or None): The previous outcome.
+        is_win (bool or None): The new outcome.
+    """
+    delta = (1 if is_win else 0) - (1 if was_win else 0)
+    if delta:
+        LeaderboardEntry.objects.filter(user_id=user_id).filter(
+            Q(sport__isnull=True) | Q(sport_id=sport_id)
+        ).update(wins=F('wins') + delta)
+
+
+def update_balance(user_id, balance):
+    """
+    Moves a user to their new points balance on every board.
+
+    Args:
+        user_id (int): The tipster whose balance changed.
+        balance (int): The new points balance.
+    """
+    with transaction.atomic():
+        if not LeaderboardEntry.objects.filter(user_id=user_id).update(points_balance=balance):
+            _ensure_entries(user_id, [None])
+        caching.invalidate('leaderboard')
+
+
+def update_balances(balances):
+    """
+    Moves several users to their new points balances in one transaction.
+
+    Args:
+        balances (dict): Maps user ids to their new points balance.
+    """
+    with transaction.atomic():
+        for user_id, balance in balances.items():
+            update_balance(user_id, balance)
+
+
+def apply_settlement(wins):
+    """
+    Applies the outcome of a settlement batch in a few set-based UPDATEs.
+
+    Adds the new wins to the overall and sport boards and copies the
+    settled tipsters' balances from TipsterStats.
+
+    Args:
+        wins (dict): Maps (user_id, sport_id) to the number of tips won in
+        the batch, negative for wins taken back by a regrade. Tipsters who
+        only lost are included with 0.
+    """
+    overall = {}
+    by_sport = {}
+    for (user_id, sport_id), won in wins.items():
+        overall[user_id] = overall.get(user_id, 0) + won
+        if sport_id is not None:
+            by_sport.setdefault(sport_id, {})[user_id] = won
+
+    increment_by_key(_board(None), 'user_id',
+                     {user_id: {'wins': won} for user_id, won in overall.items() if won})
+    for sport_id, users in by_sport.items():
+        increment_by_key(_board(sport_id), 'user_id',
+                         {user_id: {'wins': won} for user_id, won in users.items() if won})
+
+    LeaderboardEntry.objects.filter(user_id__in=list(overall)).update(
+        points_balance=Coalesce(Subquery(TipsterStats.objects.filter(
+            user_id=OuterRef('user_id')).values('points_balance')[:1]), F('points_balance'))
+    )
+    caching.invalidate('leaderboard')
+
+
+def rebuild():
+    """
+    Rebuilds every board from the Tip table and the tipsters' balances.
+
+    Returns:
+        int: The number of entries written.
+    """
+    balances = dict(
+        UserProfile.objects.annotate(
+            balance=Coalesce('tipster_stats__points_balance', Value(_default_balance()))
+        ).values_list('pk', 'balance')
+    )
+    totals = dict(bets=Count('id'), wins=Count('id', filter=Q(is_win=True)),
+                  odds_total=Sum('odds'), odds_count=Count('odds'))
+
+    boards = {None: {user_id: {} for user_id in balances}}
+    for row in Tip.objects.values('user_id').annotate(**totals).order_by():
+        boards[None][row['user_id']] = row
+    for row in Tip.objects.filter(sport__isnull=False).values('user_id', 'sport_id').annotate(**totals).order_by():
+        boards.setdefault(row['sport_id'], {})[row['user_id']] = row
+
+    entries = []
+    for sport_id, rows in boards.items():
+        for user_id, row in rows.items():
+            entries.append(LeaderboardEntry(
+                user_id=user_id, sport_id=sport_id,
+                bets=row.get('bets', 0), wins=row.get('wins', 0),
+                odds_total=row.get('odds_total') or 0, odds_count=row.get('odds_count', 0),
+                points_balance=balances[user_id],
+            ))
+
+    with transaction.atomic():
+        LeaderboardEntry.objects.all().delete()
+        LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+        caching.invalidate('leaderboard')
+    return len(entries)
@@ -0,0 +1,227 @@
+# ledger.py
+"""
+Points ledger.
+
+Every change to a tipster's points is appended to PointsLedgerEntry, and the
+running total in TipsterStats.points_balance is moved by a single UPDATE
+using F() expressions in the same transaction. Stakes use a conditional
+UPDATE (balance >= stake), so the balance check and the debit are one
+atomic statement and concurrent submissions can neither overdraw nor lose
+updates.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import leaderboard
+from .models import PointsLedgerEntry, TipsterStats
+
+DEFAULT_BALANCE = 1000
+
+
+class InsufficientPoints(Exception):
+    """
+    Raised when a stake is larger than the tipster's current balance.
+    """
+
+
+def _current_balance(user_id):
+    return TipsterStats.objects.filter(user_id=user_id).values_list('points_balance', flat=True).first()
+
+
+def _sync_leaderboard(user_id):
+    balance = _current_balance(user_id)
+    if balance is not None:
+        leaderboard.update_balance(user_id, balance)
+
+
+def _sync_leaderboards(user_ids):
+    leaderboard.update_balances(dict(
+        TipsterStats.objects.filter(user_id__in=user_ids).values_list('user_id', 'points_balance')))
+
+
+def _ensure_stats(user_id):
+    # Users made before stats were created with the profile have no row yet
+    return TipsterStats.objects.get_or_create(user_id=user_id)[1]
+
+
+def stake(user_id, amount, tip=None):
+    """
+    Debits a stake and counts the bet in one conditional UPDATE.
+
+    Args:
+        user_id (int): The tipster placing the bet.
+        amount (int): The points wagered.
+        tip (Tip, optional): The tip the stake is placed on.
+
+    Returns:
+        PointsLedgerEntry: The stake entry.
+
+    Raises:
+        InsufficientPoints: If the balance is lower than the stake.
+    """
+    with transaction.atomic():
+        debit = dict(points_balance=F('points_balance') - amount, total_bets_placed=F('total_bets_placed') + 1)
+        debited = TipsterStats.objects.filter(user_id=user_id, points_balance__gte=amount).update(**debit)
+        if not debited and _ensure_stats(user_id):
+            debited = TipsterStats.objects.filter(user_id=user_id, points_balance__gte=amount).update(**debit)
+        if not debited:
+            raise InsufficientPoints('You cannot bet more points than your current balance.')
+        entry = PointsLedgerEntry.objects.create(user_id=user_id, tip=tip,
+                                                 kind=PointsLedgerEntry.STAKE, amount=-amount)
+        transaction.on_commit(lambda: _sync_leaderboard(user_id))
+    return entry
+
+
+def credit(user_id, amount, tip=None):
+    """
+    Credits a single payout to a tipster.
+
+    Args:
+        user_id (int): The tipster being paid.
+        amount (int): The points paid out.
+        tip (Tip, optional): The tip being paid out.
+
+    Returns:
+        PointsLedgerEntry: The payout entry.
+    """
+    with transaction.atomic():
+        TipsterStats.objects.filter(user_id=user_id).update(points_balance=F('points_balance') + amount)
+        entry = PointsLedgerEntry.objects.create(user_id=user_id, tip=tip,
+                                                 kind=PointsLedgerEntry.PAYOUT, amount=amount)
+        transaction.on_commit(lambda: _sync_leaderboard(user_id))
+    return entry
+
+
+def debit_batch(stakes):
+    """
+    Debits a batch of stakes with one conditional UPDATE per tipster.
+
+    Each tipster's stakes are taken in order and accepted while their
+    balance covers them, as if they had been submitted one by one. The
+    caller appends the accepted stakes with record_stakes() in the same
+    transaction.
+
+    Args:
+        stakes (list): (user_id, amount) pairs in submission order.
+
+    Returns:
+        list: Whether each stake was accepted, in the order of ``stakes``.
+    """
+    by_user = {}
+    for index, (user_id, amount) in enumerate(stakes):
+        by_user.setdefault(user_id, []).append((index, amount))
+    accepted = [False] * len(stakes)
+    debited = []
+    with transaction.atomic():
+        balances = dict(TipsterStats.objects.filter(user_id__in=by_user).values_list('user_id', 'points_balance'))
+        for user_id in by_user.keys() - balances.keys():
+            _ensure_stats(user_id)
+            balances[user_id] = DEFAULT_BALANCE
+        for user_id, items in by_user.items():
+            # A stake placed since the balances were read fails the
+            # conditional UPDATE; the second pass reads the balance again
+            for _ in range(2):
+                remaining, chosen = balances[user_id], []
+                for index, amount in items:
+                    if amount <= remaining:
+                        remaining -= amount
+                        chosen.append(index)
+                total = balances[user_id] - remaining
+                if not chosen or TipsterStats.objects.filter(user_id=user_id, points_balance__gte=total).update(
+                        points_balance=F('points_balance') - total,
+                        total_bets_placed=F('total_bets_placed') + len(chosen)):
+                    break
+                balances[user_id] = _current_balance(user_id) or 0
+                chosen = []
+            for index in chosen:
+                accepted[index] = True
+            if chosen:
+                debited.append(user_id)
+        if debited:
+            transaction.on_commit(lambda: _sync_leaderboards(debited))
+    return accepted
+
+
+def _append(kind, rows, batch_size):
+    written = 0
+    batch = []
+    for user_id, tip_id, amount in rows:
+        batch.append(PointsLedgerEntry(user_id=user_id, tip_id=tip_id, kind=kind, amount=amount))
+        if len(batch) >= batch_size:
+            PointsLedgerEntry.objects.bulk_create(batch)
+            written += len(batch)
+            batch = []
+    if batch:
+        PointsLedgerEntry.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def record_stakes(stakes, batch_size=1000):
+    """
+    Appends stake entries in bulk, for stakes debited by debit_batch().
+
+    Args:
+        stakes (iterable): (user_id, tip_id, amount) tuples, the amount
+        being the positive stake.
+        batch_size (int, optional): Number of rows per INSERT.
+
+    Returns:
+        int: The number of entries written.
+    """
+    return _append(PointsLedgerEntry.STAKE, ((user_id, tip_id, -amount) for user_id, tip_id, amount in stakes),
+                   batch_size)
+
+
+def record_payouts(payouts, batch_size=1000):
+    """
+    Appends payout entries in bulk. The caller moves the balances.
+
+    Args:
+        payouts (iterable): (user_id, tip_id, amount) tuples.
+        batch_size (int, optional): Number of rows per INSERT.
+
+    Returns:
+        int: The number of entries written.
+    """
+    return _append(PointsLedgerEntry.PAYOUT, payouts, batch_size)
+
+
+def record_reversals(payouts, batch_size=1000):
+    """
+    Appends entries taking back earlier payouts in bulk, for regraded tips.
+    The caller moves the balances.
+
+    Args:
+        payouts (iterable): (user_id, tip_id, amount) tuples, the amount
+        being the positive payout taken back.
+        batch_size (int, optional): Number of rows per INSERT.
+
+    Returns:
+        int: The number of entries written.
+    """
+    return _append(PointsLedgerEntry.REVERSAL,
+                   ((user_id, tip_id, -amount) for user_id, tip_id, amount in payouts), batch_size)
+
+
+def reset_balance(user_id, balance=DEFAULT_BALANCE):
+    """
+    Resets a tipster's balance and records the reset in the ledger.
+    arena_app.resets resets everyone.
+
+    Args:
+        user_id (int): The tipster to reset.
+        balance (int, optional): The new balance. Defaults to 1000.
+
+    Returns:
+        PointsLedgerEntry: The reset entry.
+    """
+    values = {'points_balance': balance, 'last_points_reset': timezone.now().date()}
+    with transaction.atomic():
+        if not TipsterStats.objects.filter(user_id=user_id).update(**values):
+            TipsterStats.objects.create(user_id=user_id, **values)
+        entry = PointsLedgerEntry.objects.create(user_id=user_id, kind=PointsLedgerEntry.RESET,
+                                                 amount=balance)
+        transaction.on_commit(lambda: leaderboard.update_balance(user_id, balance))
+    return entry
@@ -0,0 +1,133 @@
+# livescores.py
+"""
+LiveScore feed ingestion.
+
+A feed snapshot is diffed against the stored scores and only the rows that
+are new or changed are written, with a single batched upsert keyed on
+(league, home_team, away_team). Changed rows are stamped with the ingest
+time, not the feed's own clock, so readers can ask for everything that
+moved since a given time. Malformed records are skipped and counted.
+"""
+import json
+import time
+from collections import namedtuple
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import caching
+from .models import LiveScore
+
+KEY_FIELDS = ('league', 'home_team', 'away_team')
+SCORE_FIELDS = ('home_score', 'away_score', 'match_status', 'match_time')
+
+IngestReport = namedtuple('IngestReport', ['inserted', 'updated', 'unchanged', 'skipped', 'seconds'])
+
+
+def read_feed(stream):
+    """
+    Reads a feed snapshot from a file-like object.
+
+    Accepts a JSON array, a JSON object with a "scores" array, or NDJSON
+    (one JSON object per line).
+
+    Args:
+        stream (file): The feed to read.
+
+    Returns:
+        list: The score records as dicts.
+    """
+    text = stream.read()
+    if isinstance(text, bytes):
+        text = text.decode()
+    stripped = text.lstrip()
+    if stripped.startswith('['):
+        return json.loads(stripped)
+    if stripped.startswith('{'):
+        try:
+            data = json.loads(stripped)
+        except json.JSONDecodeError:
+            pass  # NDJSON, several objects
+        else:
+            return data['scores'] if 'scores' in data else [data]
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _normalize(record):
+    fields = {field.name: field for field in LiveScore._meta.fields if field.name in KEY_FIELDS + SCORE_FIELDS}
+    row = {name: record.get(name, field.get_default()) for name, field in fields.items()}
+    for name in ('home_score', 'away_score'):
+        # int() would truncate 1.9 to 1 and read True as 1
+        if isinstance(row[name], (bool, float)):
+            raise ValueError(f'Invalid {name} {row[name]!r}')
+        row[name] = int(row[name])
+        if row[name] < 0:
+            raise ValueError(f'Invalid {name} {row[name]}')
+    for name in KEY_FIELDS + ('match_status', 'match_time'):
+        if row[name] is None or isinstance(row[name], (dict, list)):
+            raise ValueError(f'Invalid {name} {row[name]!r}')
+        row[name] = str(row[name])
+        if len(row[name]) > fields[name].max_length:
+            raise ValueError(f'{name} is longer than {fields[name].max_length} characters')
+    return row
+
+
+def ingest(records):
+    """
+    Upserts a feed snapshot, writing only new and changed rows.
+
+    Args:
+        records (iterable): Score records as dicts with the LiveScore field
+        names. Later records win when a match appears twice. Records that
+        are not objects or have invalid scores or names are skipped.
+
+    Returns:
+        IngestReport: Rows inserted, updated and unchanged, records
+        skipped, and the time taken in seconds.
+    """
+    started = time.perf_counter()
+
+    snapshot = {}
+    skipped = 0
+    for record in records:
+        try:
+            row = _normalize(record)
+        except (AttributeError, TypeError, ValueError):
+            skipped += 1
+            continue
+        snapshot[tuple(row[name] for name in KEY_FIELDS)] = row
+
+    current = {
+        values[:len(KEY_FIELDS)]: values[len(KEY_FIELDS):]
+        for values in LiveScore.objects.filter(
+            league__in={key[0] for key in snapshot}
+        ).values_list(*KEY_FIELDS, *SCORE_FIELDS)
+    }
+
+    inserted = updated = 0
+    changed = []
+    for key, row in snapshot.items():
+        stored = current.get(key)
+        if stored is None:
+            inserted += 1
+        elif stored != tuple(row[name] for name in SCORE_FIELDS):
+            updated += 1
+        else:
+            continue
+        changed.append(LiveScore(**row))
+
+    if changed:
+        with transaction.atomic():
+            now = timezone.now()
+            for score in changed:
+                score.timestamp = now
+            LiveScore.objects.bulk_create(
+                changed,
+                update_conflicts=True,
+                unique_fields=list(KEY_FIELDS),
+                update_fields=list(SCORE_FIELDS) + ['timestamp'],
+            )
+            caching.invalidate('livescores')
+
+    return IngestReport(inserted, updated, len(snapshot) - inserted - updated, skipped,
+                        time.perf_counter() - started)
@@ -0,0 +1,318 @@
+# loadtest.py
+"""
+End-to-end load testing against a locally started server.
+
+start_server() runs the project under gunicorn (WSGI, or ASGI with uvicorn
+workers) or Django's development server on a free localhost port. run()
+then drives it with virtual users, each with its own cookie jar, replaying
+weighted journeys (sign in, browse the league table, read latest tips,
+submit tips, poll fixtures). A shared schedule paces every request to a
+target request rate. The report gives throughput, p50/p95/p99 latency and
+error rate per endpoint.
+
+Everything stays on localhost and uses only the standard library on the
+client side. The server uses the configured database, so sign-ins expect
+the tipster accounts made by arena_app.benchmarks.data.generate().
+"""
+import http.cookiejar
+import importlib.util
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+
+from django.conf import settings
+
+from .benchmarks.data import PASSWORD, SPORTS
+
+SERVERS = ('wsgi', 'asgi', 'dev')
+REQUEST_TIMEOUT = 30
+STARTUP_TIMEOUT = 60
+
+Journey = namedtuple('Journey', ['name', 'weight', 'run'])
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Each hop is measured as its own request
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class VirtualUser:
+    """
+    A simulated visitor with its own session cookies.
+    """
+
+    def __init__(self, base_url, number, users, rng, pace, stats):
+        self.base_url = base_url
+        self.username = f'tipster{number % users}'
+        self.rng = rng
+        self.pace = pace
+        self.stats = stats
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect)
+        self.signed_in = False
+
+    def _cookie(self, name):
+        for cookie in self.cookies:
+            if cookie.name == name:
+                return cookie.value
+        return None
+
+    def request(self, endpoint, path, data=None, expect=None):
+        """
+        Sends one paced request and records it under ``endpoint``. Statuses
+        of 400 and above, or other than ``expect`` when given, are errors.
+
+        Returns:
+            tuple: The status code and the response body.
+        """
+        if data is not None:
+            data = dict(data, csrfmiddlewaretoken=self._cookie('csrftoken') or '')
+            data = urllib.parse.urlencode(data).encode()
+        request = urllib.request.Request(self.base_url + path, data=data,
+                                         headers={'Referer': self.base_url + path})
+        self.pace()
+        started = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=REQUEST_TIMEOUT) as response:
+                status, body = response.status, response.read()
+        except urllib.error.HTTPError as error:
+            status, body = error.code, error.read()
+        except (urllib.error.URLError, OSError):
+            status, body = None, b''
+        self.stats.record(endpoint, time.perf_counter() - started,
+                          status if expect is None or status == expect else None)
+        return status, body
+
+    def sign_in(self):
+        self.request('GET /signin/', '/signin/')
+        status, _ = self.request('POST /signin/', '/signin/',
+                                 {'username': self.username, 'password': PASSWORD}, expect=302)
+        self.signed_in = status == 302
+
+
+def _browse_league_table(user):
+    _, body = user.request('GET /tipster_league_table/', '/tipster_league_table/')
+    for _ in range(user.rng.randint(0, 2)):
+        match = re.search(rb'href="\?(overall=[^"]*)"', body)
+        if not match:
+            break
+        query = match.group(1).decode().replace('&amp;', '&')
+        _, body = user.request('GET /tipster_league_table/?cursor', f'/tipster_league_table/?{query}')
+
+
+def _read_latest_tips(user):
+    _, body = user.request('GET /latest_tips/', '/latest_tips/')
+    for _ in range(user.rng.randint(0, 2)):
+        match = re.search(rb'href="\?([^"]*cursor=[^"]*)"', body)
+        if not match:
+            break
+        query = match.group(1).decode().replace('&amp;', '&')
+        _, body = user.request('GET /latest_tips/?cursor', f'/latest_tips/?{query}')
+
+
+def _submit_tip(user):
+    if not user.signed_in:
+        user.sign_in()
+    user.request('GET /submit-tips/', '/submit-tips/')
+    user.request('POST /submit-tips/', '/submit-tips/', {
+        'sport': user.rng.choice(SPORTS),
+        'bet_description': 'Load test tip',
+        'odds_given': '2.00',
+        'points_bet': 1,
+    }, expect=302)
+
+
+def _poll_fixtures(user):
+    for _ in range(user.rng.randint(1, 5)):
+        user.request('GET /football-fixtures/', '/football-fixtures/')
+
+
+def _sign_in(user):
+    user.sign_in()
+    user.request('GET /home/', '/home/')
+
+
+JOURNEYS = [
+    Journey('sign_in', 1, _sign_in),
+    Journey('browse_league_table', 4, _browse_league_table),
+    Journey('read_latest_tips', 4, _read_latest_tips),
+    Journey('submit_tip', 2, _submit_tip),
+    Journey('poll_fixtures', 3, _poll_fixtures),
+]
+
+
+class Stats:
+    """
+    Thread-safe latencies and statuses per endpoint.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint, seconds, status):
+        with self.lock:
+            latencies, errors = self.endpoints.setdefault(endpoint, ([], [0]))
+            latencies.append(seconds * 1000)
+            if status is None or status >= 400:
+                errors[0] += 1
+
+    def report(self, duration):
+        """
+        Returns requests, throughput, error rate and latency percentiles per
+        endpoint, plus a "total" row.
+        """
+        def summarize(latencies, errors):
+            latencies = sorted(latencies)
+
+            def percentile(fraction):
+                return round(latencies[min(int(fraction * len(latencies)), len(latencies) - 1)], 2)
+            return {
+                'requests': len(latencies),
+                'rps': round(len(latencies) / duration, 2),
+                'error_rate': round(errors / len(latencies), 4),
+                'p50_ms': percentile(0.50),
+                'p95_ms': percentile(0.95),
+                'p99_ms': percentile(0.99),
+            }
+
+        with self.lock:
+            endpoints = {name: (list(latencies), errors[0]) for name, (latencies, errors) in self.endpoints.items()}
+        report = {name: summarize(*values) for name, values in sorted(endpoints.items())}
+        if endpoints:
+            report['total'] = summarize([value for latencies, _ in endpoints.values() for value in latencies],
+                                        sum(errors for _, errors in endpoints.values()))
+        return report
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(kind, address, workers):
+    """
+    Returns the command line that serves the project.
+
+    Raises:
+        ValueError: If the server kind is unknown or its package is missing.
+    """
+    if kind == 'dev':
+        return [sys.executable, str(settings.BASE_DIR / 'manage.py'), 'runserver', address, '--noreload']
+    if kind not in SERVERS:
+        raise ValueError(f'Unknown server {kind!r}, expected one of {", ".join(SERVERS)}.')
+    if importlib.util.find_spec('gunicorn') is None:
+        raise ValueError('gunicorn is not installed, install requirements.txt.')
+    command = [sys.executable, '-m', 'gunicorn', '--bind', address, '--workers', str(workers),
+               '--chdir', str(settings.BASE_DIR)]
+    if kind == 'asgi':
+        if importlib.util.find_spec('uvicorn') is None:
+            raise ValueError('Serving ASGI workers needs uvicorn, install requirements.txt.')
+        return command + ['--worker-class', 'uvicorn.workers.UvicornWorker', 'tipsterarena.asgi:application']
+    return command + ['tipsterarena.wsgi:application']
+
+
+def start_server(kind='wsgi', workers=4, port=None, log_file=None):
+    """
+    Starts the project on localhost and waits until it answers.
+
+    Args:
+        kind (str, optional): "wsgi", "asgi" or "dev" (runserver, one process).
+        workers (int, optional): Number of worker processes.
+        port (int, optional): The port. Defaults to a free one.
+        log_file (file, optional): Receives the server's output, which is
+        discarded by default.
+
+    Returns:
+        tuple: The server process and its base URL.
+
+    Raises:
+        ValueError: If the server cannot be started.
+        RuntimeError: If it does not answer in time.
+    """
+    address = f'127.0.0.1:{port or _free_port()}'
+    process = subprocess.Popen(server_command(kind, address, workers),
+                               stdout=log_file or subprocess.DEVNULL, stderr=log_file or subprocess.DEVNULL)
+    base_url = f'http://{address}'
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'The {kind} server exited with status {process.returncode}.')
+        try:
+            urllib.request.urlopen(base_url + '/about/', timeout=REQUEST_TIMEOUT).close()
+            return process, base_url
+        except urllib.error.HTTPError:
+            return process, base_url
+        except (urllib.error.URLError, OSError):
+            time.sleep(0.2)
+    stop_server(process)
+    raise RuntimeError(f'The {kind} server did not answer within {STARTUP_TIMEOUT}s.')
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def run(base_url, rate=50, duration=30, concurrency=20, users=1000, seed=1, journeys=None):
+    """
+    Replays weighted journeys against a running server.
+
+    Args:
+        base_url (str): The server, e.g. http://127.0.0.1:8000.
+        rate (float, optional): Target requests per second over all
+        virtual users.
+        duration (float, optional): Seconds to run for.
+        concurrency (int, optional): Number of virtual users.
+        users (int, optional): Number of tipster accounts to sign in as.
+        seed (int, optional): Seed of the journey choices.
+        journeys (list, optional): The journeys. Defaults to JOURNEYS.
+
+    Returns:
+        dict: The run's "duration_s" and the Stats.report() of its
+        "endpoints".
+    """
+    journeys = journeys or JOURNEYS
+    stats = Stats()
+    lock = threading.Lock()
+    started = time.monotonic()
+    stop_at = started + duration
+    schedule = {'next': started}
+
+    def pace():
+        # Hands out evenly spaced start times over all virtual users
+        with lock:
+            slot = schedule['next']
+            schedule['next'] = max(slot, time.monotonic() - 1) + 1 / rate
+        delay = slot - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def virtual_user(number):
+        rng = random.Random(seed * 100003 + number)
+        user = VirtualUser(base_url, number, users, rng, pace, stats)
+        weights = [journey.weight for journey in journeys]
+        while time.monotonic() < stop_at:
+            rng.choices(journeys, weights)[0].run(user)
+
+    threads = [threading.Thread(target=virtual_user, args=(number,), daemon=True) for number in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - started
+    return {'duration_s': round(elapsed, 2), 'endpoints': stats.report(elapsed)}
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from arena_app.benchmarks import data, scenarios
+
+
+class Command(BaseCommand):
+    help = ('Generates a seeded data set in a throwaway database, times the hot views against it '
+            'and fails if a scenario regressed against the baseline.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1, help='Seed of the data generator and scenarios.')
+        parser.add_argument('--users', type=int, default=1000, help='Number of tipsters.')
+        parser.add_argument('--tips', type=int, default=200000, help='Number of tips.')
+        parser.add_argument('--fixtures', type=int, default=5000, help='Number of fixtures.')
+        parser.add_argument('--iterations', type=int, default=50, help='Measured requests per scenario.')
+        parser.add_argument('--warmup', type=int, default=5, help='Unmeasured requests per scenario.')
+        parser.add_argument('--scenario', action='append', dest='scenarios',
+                            choices=[scenario.name for scenario in scenarios.SCENARIOS],
+                            help='Only run this scenario. Can be repeated.')
+        parser.add_argument('--warm-cache', action='store_true',
+                            help='Keep the page cache between requests instead of clearing it.')
+        parser.add_argument('--current-db', action='store_true',
+                            help='Run against the configured database without generating data.')
+        parser.add_argument('--baseline', default=str(scenarios.BASELINE_PATH), help='Baseline file.')
+        parser.add_argument('--threshold', type=float, default=scenarios.DEFAULT_THRESHOLD,
+                            help='Tolerated p95 slowdown against the baseline, 0.2 is 20%%.')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Write the results to the baseline file instead of comparing.')
+
+    def handle(self, *args, **options):
+        selected = [scenario for scenario in scenarios.SCENARIOS
+                    if not options['scenarios'] or scenario.name in options['scenarios']]
+        if options['current_db']:
+            results = self.measure(selected, options)
+        else:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                data.generate(seed=options['seed'], users=options['users'], tips=options['tips'],
+                              fixtures=options['fixtures'], log=self.stdout.write)
+                results = self.measure(selected, options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['update_baseline']:
+            scenarios.save_baseline(results, options['baseline'], seed=options['seed'], users=options['users'],
+                                    tips=options['tips'], fixtures=options['fixtures'],
+                                    iterations=options['iterations'], vendor=connection.vendor)
+            self.stdout.write(self.style.SUCCESS(f"Wrote baseline to {options['baseline']}."))
+            return
+
+        regressions = scenarios.compare(results, scenarios.load_baseline(options['baseline']),
+                                        options['threshold'])
+        for regression in regressions:
+            self.stdout.write(self.style.ERROR(regression))
+        if regressions:
+            raise CommandError(f'{len(regressions)} benchmark regressions.')
+        self.stdout.write(self.style.SUCCESS('No benchmark regressions.'))
+
+    def measure(self, selected, options):
+        return scenarios.run(selected, iterations=options['iterations'], warmup=options['warmup'],
+                             seed=options['seed'], warm_cache=options['warm_cache'], log=self.stdout.write)
@@ -0,0 +1,45 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from arena_app.benchmarks import data, sessions
+
+
+class Command(BaseCommand):
+    help = ('Counts the queries per request of signed-in browsing under each session and '
+            'authentication mode, before and after the cached fast path.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1, help='Seed of the data generator.')
+        parser.add_argument('--users', type=int, default=200, help='Number of tipsters.')
+        parser.add_argument('--tips', type=int, default=20000, help='Number of tips.')
+        parser.add_argument('--fixtures', type=int, default=500, help='Number of fixtures.')
+        parser.add_argument('--iterations', type=int, default=50, help='Measured requests per page.')
+        parser.add_argument('--mode', action='append', dest='modes', choices=list(sessions.MODES),
+                            help='Only run this mode. Can be repeated.')
+        parser.add_argument('--current-db', action='store_true',
+                            help='Run against the configured database without generating data.')
+
+    def handle(self, *args, **options):
+        if options['current_db']:
+            results = self.measure(options)
+        else:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                data.generate(seed=options['seed'], users=options['users'], tips=options['tips'],
+                              fixtures=options['fixtures'], log=self.stdout.write)
+                results = self.measure(options)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        pages = list(sessions.PAGES)
+        width = max(len(page) for page in pages)
+        self.stdout.write('mode'.ljust(16) + ''.join(page.rjust(width + 2) for page in pages))
+        for mode, result in results.items():
+            self.stdout.write(mode.ljust(16) + ''.join(str(result[page]['queries']).rjust(width + 2)
+                                                       for page in pages))
+        self.stdout.write(self.style.SUCCESS('Queries per signed-in request by mode.'))
+
+    def measure(self, options):
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        return sessions.run(options['modes'], iterations=options['iterations'], log=log)
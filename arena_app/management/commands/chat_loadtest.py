@@ -0,0 +1,27 @@
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from arena_app import chat
+
+
+class Command(BaseCommand):
+    help = 'Load-tests the chat fan-out in-process with simulated WebSocket connections.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=5000)
+        parser.add_argument('--messages', type=int, default=200)
+        parser.add_argument('--senders', type=int, default=50)
+        parser.add_argument('--persist', action='store_true',
+                            help='Also write the messages to the database.')
+
+    def handle(self, *args, **options):
+        result = asyncio.run(chat.run_load_test(
+            clients=options['clients'], messages=options['messages'],
+            senders=min(options['senders'], options['clients']), persist=options['persist'],
+        ))
+        self.stdout.write(self.style.SUCCESS(
+            f"{result['connections']} connections, {result['delivered']} frames delivered, "
+            f"{result['messages_per_second']:.0f} messages/s, {result['frames_per_second']:.0f} frames/s "
+            f"in {result['seconds']:.2f}s."
+        ))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from arena_app import query_plans
+
+
+class Command(BaseCommand):
+    help = 'Explains the hot arena_app queries on seeded data and fails if any plan reads a whole table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--current-db', action='store_true',
+                            help='Explain against the configured database instead of a seeded throwaway one.')
+        parser.add_argument('--users', type=int, default=200, help='Number of seeded tipsters.')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only failures.')
+
+    def handle(self, *args, **options):
+        if options['current_db']:
+            reports = query_plans.check()
+        else:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                query_plans.seed(users=options['users'])
+                reports = query_plans.check()
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        failures = [report for report in reports if report.full_scans]
+        for report in reports:
+            if report.full_scans:
+                self.stdout.write(self.style.ERROR(
+                    f'{report.name}: full scan of {", ".join(report.full_scans)}'))
+            else:
+                self.stdout.write(f'{report.name}: ok')
+            if report.full_scans or options['verbose_plans']:
+                self.stdout.write(f'    {report.sql}')
+                for line in report.plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if failures:
+            raise CommandError(f'{len(failures)} of {len(reports)} hot queries read a whole table.')
+        self.stdout.write(self.style.SUCCESS(f'All {len(reports)} hot queries use an index.'))
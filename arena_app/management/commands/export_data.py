@@ -0,0 +1,43 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from arena_app import exports
+
+
+class Command(BaseCommand):
+    help = 'Streams tips, tipster stats, live scores or chat messages to a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=list(exports.EXPORTS), help='The export.')
+        parser.add_argument('--format', dest='file_format', choices=exports.FORMATS, default='csv',
+                            help='Output format.')
+        parser.add_argument('--start', help='First day included, as YYYY-MM-DD.')
+        parser.add_argument('--end', help='Last day included, as YYYY-MM-DD.')
+        parser.add_argument('--sport', help='Only rows of this sport.')
+        parser.add_argument('--user', help='Only rows of this username.')
+        parser.add_argument('--output', default='-', help='Output file, "-" for standard output.')
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE,
+                            help='Rows fetched per query.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            lines = exports.lines(options['name'], options['file_format'], chunk_size=options['chunk_size'],
+                                  start=options['start'], end=options['end'], sport=options['sport'],
+                                  user=options['user'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        to_stdout = options['output'] == '-'
+        output = sys.stdout if to_stdout else open(options['output'], 'w', newline='', encoding='utf-8')
+        try:
+            for block in lines:
+                output.write(block)
+        finally:
+            if not to_stdout:
+                output.close()
+        if not to_stdout:
+            self.stdout.write(self.style.SUCCESS(
+                f"Exported {options['name']} to {options['output']} in {time.perf_counter() - started:.2f}s."))
@@ -0,0 +1,30 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from arena_app import livescores
+
+
+class Command(BaseCommand):
+    help = 'Upserts a LiveScore feed snapshot (JSON or NDJSON), writing only changed rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help='Feed file to read, or - for stdin (default).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            if path == '-':
+                records = livescores.read_feed(sys.stdin)
+            else:
+                with open(path, encoding='utf-8') as feed:
+                    records = livescores.read_feed(feed)
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Could not read feed {path}: {error}')
+
+        report = livescores.ingest(records)
+        self.stdout.write(self.style.SUCCESS(
+            f'{report.inserted} inserted, {report.updated} updated, '
+            f'{report.unchanged} unchanged, {report.skipped} skipped in {report.seconds:.3f}s.'
+        ))
@@ -0,0 +1,32 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from arena_app import odds
+
+
+class Command(BaseCommand):
+    help = 'Appends odds ticks from a recorded feed (NDJSON or a JSON array) to the odds history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-',
+                            help='Feed file to read, or - for stdin (default).')
+        parser.add_argument('--batch-size', type=int, default=odds.BATCH_SIZE,
+                            help=f'Ticks per transaction (default {odds.BATCH_SIZE}).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            if path == '-':
+                report = odds.ingest(odds.read_feed(sys.stdin), batch_size=options['batch_size'])
+            else:
+                with open(path, encoding='utf-8') as feed:
+                    report = odds.ingest(odds.read_feed(feed), batch_size=options['batch_size'])
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Could not read feed {path}: {error}')
+
+        rate = report.ticks / report.seconds if report.seconds else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'{report.ticks} ticks for {report.fixtures} fixtures, {report.skipped} skipped '
+            f'in {report.seconds:.3f}s ({rate:.0f} ticks/s).'
+        ))
@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from arena_app import loadtest
+
+
+class Command(BaseCommand):
+    help = ('Starts the project on localhost with N workers and replays weighted user journeys '
+            'against it at a target request rate.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--server', choices=loadtest.SERVERS, default='wsgi',
+                            help='gunicorn WSGI workers, gunicorn with uvicorn ASGI workers, or runserver.')
+        parser.add_argument('--workers', type=int, default=4, help='Number of server worker processes.')
+        parser.add_argument('--server-log', help='File receiving the server output (errors, tracebacks).')
+        parser.add_argument('--url', help='Load an already running server instead of starting one.')
+        parser.add_argument('--rate', type=float, default=50, help='Target requests per second.')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run for.')
+        parser.add_argument('--concurrency', type=int, default=20, help='Number of virtual users.')
+        parser.add_argument('--users', type=int, default=1000,
+                            help='Number of tipster accounts (tipster0..N-1) to sign in as.')
+        parser.add_argument('--seed', type=int, default=1, help='Seed of the journey choices.')
+        parser.add_argument('--json', action='store_true', help='Print the report as JSON.')
+
+    def handle(self, *args, **options):
+        process = log_file = None
+        base_url = options['url']
+        if not base_url:
+            if options['server_log']:
+                log_file = open(options['server_log'], 'w')
+            try:
+                process, base_url = loadtest.start_server(options['server'], options['workers'], log_file=log_file)
+            except (ValueError, RuntimeError) as error:
+                raise CommandError(str(error))
+            workers = 1 if options['server'] == 'dev' else options['workers']
+            self.stdout.write(f"Started {options['server']} server with {workers} workers at {base_url}.")
+        try:
+            report = loadtest.run(base_url, rate=options['rate'], duration=options['duration'],
+                                  concurrency=options['concurrency'], users=options['users'], seed=options['seed'])
+        finally:
+            if process is not None:
+                loadtest.stop_server(process)
+            if log_file is not None:
+                log_file.close()
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self.stdout.write(f"{'endpoint':<32}{'requests':>9}{'rps':>9}{'errors':>8}"
+                          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for endpoint, row in report['endpoints'].items():
+            self.stdout.write(f"{endpoint:<32}{row['requests']:>9}{row['rps']:>9}{row['error_rate']:>8.1%}"
+                              f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+        self.stdout.write(self.style.SUCCESS(f"Ran for {report['duration_s']}s."))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from arena_app import submissions
+
+PURGE_INTERVAL = 60 * 60
+
+
+class Command(BaseCommand):
+    help = ('Places queued tip submissions in batched transactions, polling the queue until '
+            'stopped (or once with --once).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=submissions.BATCH_SIZE,
+                            help='Submissions placed per transaction.')
+        parser.add_argument('--interval', type=float, default=0.5,
+                            help='Seconds to wait when the queue is empty.')
+        parser.add_argument('--once', action='store_true', help='Drain the queue once and exit.')
+
+    def handle(self, *args, **options):
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        purged_at = 0.0
+        while True:
+            report = submissions.drain(batch_size=options['batch_size'], log=log)
+            if report['batches']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"{report['accepted']} accepted, {report['rejected']} rejected in {report['batches']} "
+                    f"batches, {report['seconds']:.3f}s."))
+            if options['once']:
+                return
+            if time.monotonic() - purged_at > PURGE_INTERVAL:
+                purged = submissions.purge()
+                purged_at = time.monotonic()
+                if purged and log:
+                    log(f'Purged {purged} processed submissions.')
+            time.sleep(options['interval'])
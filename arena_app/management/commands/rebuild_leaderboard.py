@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from arena_app import leaderboard
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the materialized tipster leaderboard from tips and balances.'
+
+    def handle(self, *args, **options):
+        written = leaderboard.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt leaderboard with {written} entries.'))
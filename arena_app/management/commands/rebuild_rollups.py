@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from arena_app import rollups
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the daily tipster rollups from every tip.'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = rollups.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} daily rollup rows in {time.perf_counter() - started:.2f}s.'))
@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from arena_app import teamform
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the team form and head-to-head records from every result.'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = teamform.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} team records in {time.perf_counter() - started:.2f}s.'))
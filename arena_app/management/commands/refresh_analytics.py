@@ -0,0 +1,15 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from arena_app import analytics
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the tipster analytics snapshot (ROI, yield, streaks, drawdown) for every tipster.'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        written = analytics.refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {written} analytics rows in {time.perf_counter() - started:.2f}s.'))
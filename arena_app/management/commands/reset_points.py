@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from arena_app import resets
+from arena_app.ledger import DEFAULT_BALANCE
+
+
+class Command(BaseCommand):
+    help = ("Resets every tipster's points balance in chunks, resuming an interrupted reset "
+            "where it stopped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--balance', type=int, default=DEFAULT_BALANCE,
+                            help='The balance every tipster is reset to.')
+        parser.add_argument('--chunk-size', type=int, default=resets.CHUNK_SIZE,
+                            help='Number of tipsters reset per transaction.')
+        parser.add_argument('--restart', action='store_true',
+                            help='Start a new reset even if an earlier one did not finish.')
+
+    def handle(self, *args, **options):
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        result = resets.run(balance=options['balance'], chunk_size=options['chunk_size'],
+                            restart=options['restart'], log=log)
+        self.stdout.write(self.style.SUCCESS(
+            f"{'Resumed and finished' if result['resumed'] else 'Finished'} the reset to "
+            f"{result['reset'].balance}: {result['tipster_stats']} tipsters in {result['seconds']:.2f}s "
+            f"({result['rows_per_second']} rows/s)."))
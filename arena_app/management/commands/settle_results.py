@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from arena_app import settlement
+
+
+class Command(BaseCommand):
+    help = 'Settles every open tip on a fixture that already has a result.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('fixture_ids', nargs='*', type=int,
+                            help='Only settle these fixtures.')
+        parser.add_argument('--chunk-size', type=int, default=settlement.CHUNK_SIZE,
+                            help='Number of fixtures settled per transaction.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        settled = settlement.settle_fixtures(options['fixture_ids'] or None,
+                                             chunk_size=options['chunk_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Settled {settled} tips in {elapsed:.2f}s.'))
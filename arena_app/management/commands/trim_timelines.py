@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from arena_app import timeline
+
+
+class Command(BaseCommand):
+    help = 'Bounds follower timelines to their newest entries and optionally recounts follows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', type=int, default=timeline.TIMELINE_SIZE,
+                            help='Number of entries kept per timeline.')
+        parser.add_argument('--rebuild-counts', action='store_true',
+                            help='Also recompute the denormalized follower and following counts.')
+
+    def handle(self, *args, **options):
+        deleted = timeline.trim(size=options['size'])
+        self.stdout.write(self.style.SUCCESS(f'Trimmed {deleted} timeline entries.'))
+        if options['rebuild_counts']:
+            updated = timeline.rebuild_counts()
+            self.stdout.write(self.style.SUCCESS(f'Recounted follows for {updated} users.'))
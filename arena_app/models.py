@@ -1,4 +1,7 @@
 # models.py
+from decimal import Decimal
+from math import floor
+
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.db.models import Avg
@@ -91,13 +94,15 @@ class UserProfile(AbstractBaseUser, PermissionsMixin):
         subscription_type (str): The type of subscription the user has.
         subscription_plan (SubscriptionPlan): The subscription plan associated with the user.
 
-        points_balance (int): The current balance of points for the user.
-        last_points_reset (date): The date when the points were last reset.
-
-        total_bets_placed (int): The total number of bets placed by the user.
-        total_wins (int): The total number of wins by the user.
+        followers_count (int): The number of users following the user.
+        following_count (int): The number of users the user follows.
 
     Properties:
+        stats (TipsterStats): The user's points and betting stats.
+        points_balance (int): The current balance of points, from stats.
+        last_points_reset (date): The date when the points were last reset, from stats.
+        total_bets_placed (int): The total number of bets placed, from stats.
+        total_wins (int): The total number of wins, from stats.
         win_rate (float): The win rate of the user, calculated as the percentage of wins out of total bets placed.
         average_odds (float): The average odds of the user's tips.
 
@@ -126,21 +131,38 @@ class UserProfile(AbstractBaseUser, PermissionsMixin):
                                           on_delete=models.SET_NULL, null=True,
                                           blank=True)
 
-    # Additional fields for the points system
-    points_balance = models.IntegerField(default=1000)
-    last_points_reset = models.DateField(auto_now_add=False,
-                                         default=timezone.now)
+    # Denormalized follow counts, maintained by arena_app.timeline
+    followers_count = models.IntegerField(default=0)
+    following_count = models.IntegerField(default=0)
 
-    # New fields for tipster stats
-    total_bets_placed = models.IntegerField(default=0)
-    total_wins = models.IntegerField(default=0)
+    # Points and stats are stored once, in TipsterStats. These read through
+    # to it so templates and code written against the profile keep working.
+    @property
+    def stats(self):
+        try:
+            return self.tipster_stats
+        except TipsterStats.DoesNotExist:
+            return TipsterStats(user=self)
+
+    @property
+    def points_balance(self):
+        return self.stats.points_balance
+
+    @property
+    def last_points_reset(self):
+        return self.stats.last_points_reset
+
+    @property
+    def total_bets_placed(self):
+        return self.stats.total_bets_placed
+
+    @property
+    def total_wins(self):
+        return self.stats.total_wins
 
-    # Properties to calculate win rate and average odds
     @property
     def win_rate(self):
-        if self.total_bets_placed > 0:
-            return (self.total_wins / self.total_bets_placed) * 100
-        return 0
+        return self.stats.win_rate
 
     @property
     def average_odds(self):
@@ -148,9 +170,10 @@ class UserProfile(AbstractBaseUser, PermissionsMixin):
     
     # Update the points balance (can be called monthly or as needed)
     def reset_points(self):
-        self.points_balance = 1000
-        self.last_points_reset = timezone.now().date()
-        self.save()
+        from .ledger import reset_balance
+
+        reset_balance(self.pk)
+        self.tipster_stats = TipsterStats.objects.get(user=self)
 
     groups = models.ManyToManyField(
         Group,
@@ -206,23 +229,73 @@ class Fixture(models.Model):
                                   related_name='away_fixtures')
     date_time = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date_time'], name='fixture_date_time_idx'),
+            models.Index(fields=['sport', 'date_time'], name='fixture_sport_date_time_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored calendar day so a rescheduled fixture also
+        # marks the day it left as changed.
+        loaded = dict(zip(field_names, values))
+        instance._loaded_calendar = (loaded.get('sport_id'), loaded.get('date_time'))
+        return instance
+
     def __str__(self):
-        return self.sport
+        return f"{self.team_home} vs {self.team_away}"
     # Add any additional fields for fixtures (e.g., venue, status, etc.)
 
 
 class Tip(models.Model):
+    MARKET_CHOICES = [
+        ('home', 'Home Win'),
+        ('draw', 'Draw'),
+        ('away', 'Away Win'),
+        ('over_2_5', 'Over 2.5 Goals'),
+        ('under_2_5', 'Under 2.5 Goals'),
+        ('btts_yes', 'Both Teams To Score'),
+        ('btts_no', 'Both Teams Not To Score'),
+    ]
+
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='tips')
     sport = models.ForeignKey(Sport, on_delete=models.SET_NULL, null=True, blank=True)  # Link to Sport
+    fixture = models.ForeignKey(Fixture, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='tips')  # Fixture the tip is settled against
+    market = models.CharField(max_length=20, choices=MARKET_CHOICES, null=True, blank=True)
     bet_type = models.CharField(max_length=100, null=True, blank=True)  # e.g., Match Odds, Correct Score
     odds = models.DecimalField(max_digits=6, decimal_places=2, null=True)
     points_bet = models.IntegerField(default=0) # Points wagered
     is_win = models.BooleanField(null=True, blank=True)  # True if win, False if loss, null if undecided
+    settled_at = models.DateTimeField(null=True, blank=True)  # Set by arena_app.settlement
     created_at = models.DateTimeField(auto_now_add=True)
     additional_info = models.JSONField(blank=True, null=True)  # For storing dynamic bet details
 
+    class Meta:
+        indexes = [
+            # Latest tips feed, overall and filtered by sport or tipster
+            models.Index(fields=['-created_at', '-id'], name='tip_created_idx'),
+            models.Index(fields=['sport', '-created_at', '-id'], name='tip_sport_created_idx'),
+            models.Index(fields=['user', '-created_at', '-id'], name='tip_user_created_idx'),
+            # Win counts per tipster
+            models.Index(fields=['user', 'is_win'], name='tip_user_is_win_idx'),
+            # Open tips waiting for settlement
+            models.Index(fields=['fixture', 'market'], condition=models.Q(is_win__isnull=True),
+                         name='tip_open_fixture_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored outcome so signal handlers can tell when a
+        # tip has just been settled.
+        instance._loaded_is_win = dict(zip(field_names, values)).get('is_win')
+        return instance
+
     def __str__(self):
-        user_username = self.user_username if self.user else 'Unknown User'
+        user_username = self.user.username if self.user else 'Unknown User'
         sport_name = self.sport.name if self.sport else 'Unknown Sport'
         return f"{user_username} - {sport_name}"
 
@@ -230,6 +303,9 @@ class Tip(models.Model):
 class TipsterStats(models.Model):
     """
     Represents the statistics and points balance of a tipster user.
+
+    This is the only store of a user's points and bet counts. It is created
+    with the user, and UserProfile reads these fields through from it.
     """
 
     user = models.OneToOneField(get_user_model(), on_delete=models.CASCADE, related_name='tipster_stats')
@@ -261,20 +337,25 @@ class TipsterStats(models.Model):
         Returns:
             float: The average odds of the tipster's bets.
         """
-        return self.user.tip_set.aggregate(Avg('odds'))['odds__avg'] or 0
+        return self.user.tips.aggregate(Avg('odds'))['odds__avg'] or 0
 
     def reset_points(self):
         """
         Resets the points balance of the tipster to the default value (1000).
-        Updates the last points reset date to the current date.
+        Updates the last points reset date to the current date and records
+        the reset in the points ledger.
         """
-        self.points_balance = 1000
-        self.last_points_reset = timezone.now().date()
-        self.save()
+        from .ledger import reset_balance
+
+        reset_balance(self.user_id)
+        self.refresh_from_db(fields=['points_balance', 'last_points_reset'])
 
     def calculate_points_won(self, bet_amount_in_points, odds):
         """
-        Calculates the points won by the tipster when a bet is successful.
+        Calculates and credits the payout of a successful bet.
+
+        Stakes are debited when a tip is submitted, so the payout is the
+        stake times the odds rounded down, as settlement pays it.
 
         Args:
             bet_amount_in_points (int): The amount of points bet on the bet.
@@ -283,22 +364,380 @@ class TipsterStats(models.Model):
         Returns:
             int: The points won by the tipster.
         """
-        points_won = int(bet_amount_in_points * (odds - 1))
-        self.points_balance += points_won
-        self.save()
+        from .ledger import credit
+
+        points_won = floor(bet_amount_in_points * Decimal(str(odds)))
+        credit(self.user_id, points_won)
+        self.refresh_from_db(fields=['points_balance'])
         return points_won
 
 
+class LeaderboardEntry(models.Model):
+    """
+    Represents one materialized row of the tipster league table.
+
+    Entries without a sport belong to the overall table, the others to the
+    table of their sport. Rows are maintained incrementally by
+    arena_app.leaderboard so the league table is a range read on
+    (sport, -points_balance, user); ranks are positions on that index.
+    """
+
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='leaderboard_entries')
+    sport = models.ForeignKey(Sport, on_delete=models.CASCADE, null=True, blank=True,
+                              related_name='leaderboard_entries')
+    bets = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    odds_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    odds_count = models.IntegerField(default=0)
+    points_balance = models.IntegerField(default=1000)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'sport'], condition=models.Q(sport__isnull=False),
+                                    name='unique_sport_leaderboard_entry'),
+            models.UniqueConstraint(fields=['user'], condition=models.Q(sport__isnull=True),
+                                    name='unique_overall_leaderboard_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['sport', '-points_balance', 'user'], name='leaderboard_balance_idx'),
+        ]
+
+    def __str__(self):
+        board = self.sport.name if self.sport else 'Overall'
+        return f"{board}: {self.points_balance} points"
+
+    @property
+    def win_rate(self):
+        """
+        Calculates the win rate of the tipster on this board as a percentage.
+
+        Returns:
+            float: The win rate of the tipster.
+        """
+        if self.bets > 0:
+            return (self.wins / self.bets) * 100
+        return 0
+
+    @property
+    def average_odds(self):
+        """
+        Calculates the average odds of the tipster's tips on this board.
+
+        Returns:
+            float: The average odds, 0 when no tip carries odds.
+        """
+        if self.odds_count > 0:
+            return self.odds_total / self.odds_count
+        return 0
+
+
+class TipsterAnalytics(models.Model):
+    """
+    Snapshot of a tipster's performance metrics on settled tips, computed
+    for every tipster at once by arena_app.analytics.
+
+    One row per tipster for all sports (sport is NULL) and one per sport
+    they have settled tips on.
+
+    Attributes:
+        user (UserProfile): The tipster.
+        sport (Sport): The sport, or None for all sports.
+        tips (int): Number of settled tips.
+        wins (int): Number of winning tips.
+        staked (int): Points staked on the settled tips.
+        profit (int): Points returned minus points staked.
+        yield_pct (float): Profit as a percentage of the points staked.
+        roi_pct (float): Return on a level one-point stake per tip, as a
+        percentage.
+        average_odds (float): Average odds of the settled tips.
+        longest_win_streak (int): Most consecutive winning tips.
+        longest_loss_streak (int): Most consecutive losing tips.
+        max_drawdown (int): Largest fall in points from a running peak.
+        odds_bands (dict): Tips, wins and strike rate per odds band.
+        computed_at (datetime): When the snapshot was taken.
+    """
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='analytics')
+    sport = models.ForeignKey(Sport, on_delete=models.CASCADE, null=True, blank=True,
+                              related_name='tipster_analytics')
+    tips = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    staked = models.IntegerField(default=0)
+    profit = models.IntegerField(default=0)
+    yield_pct = models.FloatField(default=0)
+    roi_pct = models.FloatField(default=0)
+    average_odds = models.FloatField(default=0)
+    longest_win_streak = models.IntegerField(default=0)
+    longest_loss_streak = models.IntegerField(default=0)
+    max_drawdown = models.IntegerField(default=0)
+    odds_bands = models.JSONField(default=dict)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'sport'], condition=models.Q(sport__isnull=False),
+                                    name='unique_sport_tipster_analytics'),
+            models.UniqueConstraint(fields=['user'], condition=models.Q(sport__isnull=True),
+                                    name='unique_overall_tipster_analytics'),
+        ]
+
+    def __str__(self):
+        board = self.sport.name if self.sport else 'Overall'
+        return f"{self.user} ({board})"
+
+    @property
+    def strike_rate(self):
+        """
+        Calculates the percentage of settled tips that won.
+
+        Returns:
+            float: The strike rate.
+        """
+        if self.tips > 0:
+            return (self.wins / self.tips) * 100
+        return 0
+
+
+class DailyTipStats(models.Model):
+    """
+    Daily rollup of a tipster's tips on one sport, maintained by
+    arena_app.rollups.
+
+    A tip counts in the bucket of the day it was created, both when it is
+    placed and when it is settled, so summing the buckets of a date range
+    describes the tips placed in that range.
+
+    Attributes:
+        user (UserProfile): The tipster.
+        sport (Sport): The sport of the tips, or None for tips without one.
+        day (date): The day the tips were created.
+        bets (int): Number of tips placed.
+        staked (int): Points staked on them.
+        odds_total (Decimal): Sum of their odds.
+        odds_count (int): Number of them that carry odds.
+        settled (int): Number of them that are settled.
+        wins (int): Number of them that won.
+        settled_staked (int): Points staked on the settled ones.
+        returned (int): Points paid out on the winners.
+    """
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='daily_stats')
+    sport = models.ForeignKey(Sport, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_stats')
+    day = models.DateField()
+    bets = models.IntegerField(default=0)
+    staked = models.IntegerField(default=0)
+    odds_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    odds_count = models.IntegerField(default=0)
+    settled = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    settled_staked = models.IntegerField(default=0)
+    returned = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'sport', 'day'], condition=models.Q(sport__isnull=False),
+                                    name='unique_daily_tip_stats'),
+            models.UniqueConstraint(fields=['user', 'day'], condition=models.Q(sport__isnull=True),
+                                    name='unique_daily_tip_stats_no_sport'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'sport'], name='daily_tip_stats_day_idx'),
+            models.Index(fields=['user', 'day'], name='daily_tip_stats_user_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.day}"
+
+
+class PointsLedgerEntry(models.Model):
+    """
+    Represents one append-only movement of a tipster's points.
+
+    Stakes are stored as negative amounts and payouts as positive ones. A
+    reversal takes back the payout of a tip regraded after its result was
+    corrected. A reset entry records the balance the tipster was reset to. The running
+    total lives in TipsterStats.points_balance and is only ever changed by
+    arena_app.ledger in the same transaction that appends the entry.
+    """
+
+    STAKE = 'stake'
+    PAYOUT = 'payout'
+    REVERSAL = 'reversal'
+    RESET = 'reset'
+    KIND_CHOICES = [
+        (STAKE, 'Stake'),
+        (PAYOUT, 'Payout'),
+        (REVERSAL, 'Reversal'),
+        (RESET, 'Reset'),
+    ]
+
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='points_ledger')
+    tip = models.ForeignKey(Tip, on_delete=models.SET_NULL, null=True, blank=True, related_name='ledger_entries')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    amount = models.IntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='ledger_user_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} {self.amount:+d}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError('Points ledger entries are append-only')
+        super().save(*args, **kwargs)
+
+
+class PointsReset(models.Model):
+    """
+    Represents one run of the bulk points reset in arena_app.resets.
+
+    The run records how far it got, so a crashed reset resumes after the
+    last committed chunk instead of starting over.
+
+    Attributes:
+        balance (int): The balance every tipster is reset to.
+        reset_on (date): The date stored as their last points reset.
+        last_user_id (int): The highest user id reset so far.
+        users_reset (int): Number of users reset so far.
+        started_at (datetime): When the run started.
+        finished_at (datetime): When the run finished, None while running.
+    """
+
+    balance = models.IntegerField()
+    reset_on = models.DateField()
+    last_user_id = models.IntegerField(default=0)
+    users_reset = models.IntegerField(default=0)
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Points reset to {self.balance} on {self.reset_on}"
+
+
+class PointsResetChunk(models.Model):
+    """
+    Audit entry for one committed chunk of a PointsReset.
+
+    Attributes:
+        reset (PointsReset): The run the chunk belongs to.
+        first_user_id (int): The lowest user id in the chunk.
+        last_user_id (int): The highest user id in the chunk.
+        tipster_stats (int): Number of TipsterStats rows updated.
+        seconds (float): Time the chunk took.
+        created_at (datetime): When the chunk committed.
+    """
+
+    reset = models.ForeignKey(PointsReset, on_delete=models.CASCADE, related_name='chunks')
+    first_user_id = models.IntegerField()
+    last_user_id = models.IntegerField()
+    tipster_stats = models.IntegerField()
+    seconds = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class TipSubmission(models.Model):
+    """
+    A validated tip waiting in the write-behind queue of
+    arena_app.submissions, and the outcome once a worker processed it.
+
+    Attributes:
+        user (UserProfile): The tipster who submitted the tip.
+        sport, fixture, market, bet_type, odds, points_bet: The tip.
+        status (str): Pending until processed, then accepted (the tip was
+        placed) or rejected (see error).
+        error (str): Why the tip was rejected.
+        tip (Tip): The placed tip, once accepted.
+        created_at (datetime): When the tip was submitted.
+        processed_at (datetime): When a worker processed it.
+    """
+
+    PENDING = 'pending'
+    ACCEPTED = 'accepted'
+    REJECTED = 'rejected'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (ACCEPTED, 'Accepted'),
+        (REJECTED, 'Rejected'),
+    ]
+
+    user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='tip_submissions')
+    sport = models.ForeignKey(Sport, on_delete=models.SET_NULL, null=True, blank=True)
+    fixture = models.ForeignKey(Fixture, on_delete=models.SET_NULL, null=True, blank=True)
+    market = models.CharField(max_length=20, choices=Tip.MARKET_CHOICES, null=True, blank=True)
+    bet_type = models.CharField(max_length=100, null=True, blank=True)
+    odds = models.DecimalField(max_digits=6, decimal_places=2, null=True)
+    points_bet = models.IntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    error = models.CharField(max_length=255, blank=True)
+    tip = models.ForeignKey(Tip, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # The queue itself: submissions the worker has yet to process, in arrival order
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True),
+                         name='tipsubmission_unprocessed_idx'),
+            # Purging processed submissions
+            models.Index(fields=['processed_at'], name='tipsubmission_processed_idx'),
+        ]
+
+    def __str__(self):
+        return f"Submission {self.pk} ({self.status})"
+
+
 class Follower(models.Model):
+    """
+    Represents ``follower`` following ``user``.
+    """
+
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='following')
     follower = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='followers')
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'follower'], name='unique_follower'),
+        ]
+        indexes = [
+            models.Index(fields=['follower', 'user'], name='follower_follower_user_idx'),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """
+    Represents a tip pushed into the timeline of one of its tipster's
+    followers.
+
+    Entries copy the tip's creation time so a timeline page is a single
+    range read on (owner, created_at). Inboxes are bounded and maintained
+    by arena_app.timeline.
+    """
+
+    owner = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='timeline_entries')
+    tip = models.ForeignKey(Tip, on_delete=models.CASCADE, related_name='timeline_entries')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'tip'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['owner', '-created_at', '-tip'], name='timeline_owner_created_idx'),
+        ]
+
 
 class ChatMessage(models.Model):
     user = models.ForeignKey(get_user_model(), on_delete=models.CASCADE)
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='chatmessage_created_idx'),
+        ]
+
 
 class Subscription(models.Model):
     SUBSCRIPTION_CHOICES = [
@@ -319,10 +758,58 @@ class Result(models.Model):
     team_away_score = models.PositiveIntegerField()
 
     def __str__(self):
-        return self.fixture
+        return str(self.fixture)
     # Add any additional fields for results
 
 
+class TeamRecord(models.Model):
+    """
+    A team's record from its results, maintained by arena_app.teamform.
+
+    The row without an opponent is the team's overall record and recent
+    form; the row with an opponent is its head-to-head record against
+    that team. Both directions of a head-to-head are stored, so everything
+    a fixture page shows about its two teams is three rows read through
+    the unique constraints' indexes.
+
+    Attributes:
+        team (Team): The team.
+        opponent (Team): The other team of a head-to-head record, or None
+        for the overall record.
+        played, wins, draws, losses (int): Results counted.
+        goals_for, goals_against (int): Goals over those results.
+        form (str): Outcomes of the latest results, newest first, e.g.
+        "WWDLW".
+        recent (list): The latest results, newest first, as dicts with the
+        fixture id, date, opponent id, whether the team was at home, the
+        goals for and against and the outcome.
+        last_played (datetime): When the latest result was played.
+    """
+
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='records', db_index=False)
+    opponent = models.ForeignKey(Team, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    played = models.IntegerField(default=0)
+    wins = models.IntegerField(default=0)
+    draws = models.IntegerField(default=0)
+    losses = models.IntegerField(default=0)
+    goals_for = models.IntegerField(default=0)
+    goals_against = models.IntegerField(default=0)
+    form = models.CharField(max_length=10, blank=True)
+    recent = models.JSONField(default=list)
+    last_played = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['team', 'opponent'], condition=models.Q(opponent__isnull=False),
+                                    name='unique_team_record_h2h'),
+            models.UniqueConstraint(fields=['team'], condition=models.Q(opponent__isnull=True),
+                                    name='unique_team_record'),
+        ]
+
+    def __str__(self):
+        return f"{self.team} vs {self.opponent}" if self.opponent_id else str(self.team)
+
+
 class LiveScore(models.Model):
     league = models.CharField(max_length=255, default='Unknown League')
     home_team = models.CharField(max_length=255, default='Unknown Team')
@@ -336,6 +823,9 @@ class LiveScore(models.Model):
     class Meta:
         db_table = 'arena_app_live_scores'
         unique_together = ('league', 'home_team', 'away_team')
+        indexes = [
+            models.Index(fields=['timestamp'], name='livescore_timestamp_idx'),
+        ]
 
     def __str__(self):
         return f"{self.league}: {self.home_team} vs {self.away_team}"
@@ -348,10 +838,82 @@ class SportsOdds(models.Model):
     draw_odds = models.FloatField()
 
     def __str__(self):
-        return self.fixture
+        return str(self.fixture)
     # Add any additional fields for odds
 
 
+class OddsTick(models.Model):
+    """
+    One home/away/draw price update of a fixture, appended by
+    arena_app.odds. SportsOdds keeps only the latest of them.
+
+    Prices are stored as whole hundredths (2.15 is 215) so a tick is a
+    handful of small integers, and the unique (fixture, recorded_at) index
+    both keeps a replayed feed from duplicating ticks and serves "the price
+    at a given moment" as a single index seek.
+
+    Attributes:
+        fixture (Fixture): The fixture priced.
+        recorded_at (datetime): When the feed published the prices.
+        home, away, draw (int): The decimal odds, in hundredths.
+    """
+
+    fixture = models.ForeignKey(Fixture, on_delete=models.CASCADE, related_name='odds_ticks', db_index=False)
+    recorded_at = models.DateTimeField()
+    home = models.PositiveIntegerField()
+    away = models.PositiveIntegerField()
+    draw = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fixture', 'recorded_at'], name='unique_odds_tick'),
+        ]
+
+    def __str__(self):
+        return f"{self.fixture_id} at {self.recorded_at}"
+
+
+class DailyOdds(models.Model):
+    """
+    The first and last prices of a fixture on one day, maintained by
+    arena_app.odds as ticks arrive.
+
+    The opening price of a fixture is the opening of its first day and the
+    current price the last of its latest day, and the day's movers compare
+    one row per fixture, so none of them reads OddsTick.
+
+    Attributes:
+        fixture (Fixture): The fixture priced.
+        day (date): The day of the ticks.
+        open_at (datetime): When the first tick of the day was recorded.
+        open_home, open_away, open_draw (int): Its prices, in hundredths.
+        last_at (datetime): When the last tick of the day was recorded.
+        last_home, last_away, last_draw (int): Its prices, in hundredths.
+    """
+
+    fixture = models.ForeignKey(Fixture, on_delete=models.CASCADE, related_name='daily_odds', db_index=False)
+    day = models.DateField()
+    open_at = models.DateTimeField()
+    open_home = models.PositiveIntegerField()
+    open_away = models.PositiveIntegerField()
+    open_draw = models.PositiveIntegerField()
+    last_at = models.DateTimeField()
+    last_home = models.PositiveIntegerField()
+    last_away = models.PositiveIntegerField()
+    last_draw = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['fixture', 'day'], name='unique_daily_odds'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='daily_odds_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.fixture_id} {self.day}"
+
+
 # BLOGS
 class BlogPost(models.Model):
     author = models.ForeignKey(get_user_model(), on_delete=models.CASCADE, related_name='blog_posts')
@@ -364,4 +926,7 @@ class BlogPost(models.Model):
         return self.title
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='blogpost_created_idx'),
+        ]
\ No newline at end of file
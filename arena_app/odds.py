@@ -0,0 +1,279 @@
+# odds.py
+"""
+Odds history.
+
+SportsOdds keeps one price per fixture and every update overwrites it.
+ingest() still keeps that row current, and also appends every update to
+OddsTick, a narrow table of small integers written with one bulk INSERT
+per batch, and moves the fixture's DailyOdds row (the first and last
+prices of the day) in the same transaction.
+
+The questions asked of the history then read a row or two each instead
+of scanning the ticks:
+
+- opening vs current price: the first and latest DailyOdds of a fixture;
+- the day's biggest movers: one DailyOdds row per fixture priced that day;
+- the price when a tip was placed: one seek of the (fixture, recorded_at)
+  index of OddsTick.
+
+A recorded feed may be replayed or arrive out of order: a tick is stored
+once per (fixture, recorded_at) and the daily rows compare tick times,
+not arrival order.
+"""
+import json
+import time
+from collections import namedtuple
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, fixture_calendar
+from .models import DailyOdds, Fixture, OddsTick, SportsOdds, Tip
+
+BATCH_SIZE = 5000
+MOVERS_LIMIT = 10
+OUTCOMES = ('home', 'away', 'draw')
+# Feed (and SportsOdds) field of each outcome
+ODDS_FIELDS = {'home': 'team_home_odds', 'away': 'team_away_odds', 'draw': 'draw_odds'}
+DAY_FIELDS = ['open_at', 'open_home', 'open_away', 'open_draw', 'last_at', 'last_home', 'last_away', 'last_draw']
+
+Price = namedtuple('Price', ['recorded_at', 'home', 'away', 'draw'])
+# change is relative: 0.25 when a price moves from 2.00 to 2.50
+Movement = namedtuple('Movement', ['fixture_id', 'outcome', 'opening', 'current', 'change'])
+IngestReport = namedtuple('IngestReport', ['ticks', 'skipped', 'fixtures', 'seconds'])
+
+
+def read_feed(stream):
+    """
+    Yields the tick records of a recorded feed.
+
+    NDJSON (one JSON object per line) is read line by line, so a long
+    recording is never held in memory; a JSON array is read whole.
+
+    Args:
+        stream (file): The feed to read.
+    """
+    lines = (line.decode() if isinstance(line, bytes) else line for line in stream)
+    for line in lines:
+        if not line.strip():
+            continue
+        if line.lstrip().startswith('['):
+            yield from json.loads(line + ''.join(lines))
+            return
+        yield json.loads(line)
+
+
+def _tick(record):
+    recorded_at = parse_datetime(record['timestamp']) if record.get('timestamp') else timezone.now()
+    if recorded_at is None:
+        raise ValueError(f"Invalid timestamp {record['timestamp']!r}")
+    if timezone.is_naive(recorded_at):
+        recorded_at = timezone.make_aware(recorded_at)
+    prices = {outcome: round(float(record[field]) * 100) for outcome, field in ODDS_FIELDS.items()}
+    if min(prices.values()) < 100:
+        raise ValueError('Decimal odds cannot be below 1.00')
+    return OddsTick(fixture_id=int(record['fixture']), recorded_at=recorded_at, **prices)
+
+
+def _move(row, prefix, tick):
+    setattr(row, f'{prefix}_at', tick.recorded_at)
+    for outcome in OUTCOMES:
+        setattr(row, f'{prefix}_{outcome}', getattr(tick, outcome))
+
+
+def _merge_days(ticks):
+    # Every stored day of the fixtures from the batch's first day on, so
+    # the fixture's latest price is known even when the batch is older
+    keys = [(tick.fixture_id, timezone.localdate(tick.recorded_at)) for tick in ticks]
+    days = {
+        (row.fixture_id, row.day): row
+        for row in DailyOdds.objects.filter(fixture_id__in={tick.fixture_id for tick in ticks},
+                                            day__gte=min(day for _, day in keys))
+    }
+    changed = {}
+    for tick, key in zip(ticks, keys):
+        row = days.get(key)
+        if row is None:
+            row = days[key] = DailyOdds(fixture_id=tick.fixture_id, day=key[1])
+            _move(row, 'open', tick)
+            _move(row, 'last', tick)
+        elif tick.recorded_at < row.open_at:
+            _move(row, 'open', tick)
+        elif tick.recorded_at >= row.last_at:
+            _move(row, 'last', tick)
+        else:
+            continue
+        changed[key] = row
+    return days, changed
+
+
+def _ingest_batch(records):
+    ticks = {}
+    skipped = 0
+    for record in records:
+        try:
+            tick = _tick(record)
+        except (KeyError, TypeError, ValueError):
+            skipped += 1
+            continue
+        ticks[tick.fixture_id, tick.recorded_at] = tick
+    fixtures = {
+        pk: (sport_id, date_time)
+        for pk, sport_id, date_time in Fixture.objects.filter(pk__in={fixture_id for fixture_id, _ in ticks})
+        .values_list('pk', 'sport_id', 'date_time')
+    }
+    fixture_ids = set(fixtures)
+    ticks = sorted((tick for tick in ticks.values() if tick.fixture_id in fixture_ids),
+                   key=lambda tick: tick.recorded_at)
+    skipped += len(records) - skipped - len(ticks)
+    if not ticks:
+        return 0, skipped, fixture_ids
+
+    with transaction.atomic():
+        OddsTick.objects.bulk_create(ticks, ignore_conflicts=True)
+        days, changed = _merge_days(ticks)
+        DailyOdds.objects.bulk_create(changed.values(), update_conflicts=True, unique_fields=['fixture', 'day'],
+                                      update_fields=DAY_FIELDS)
+        latest = {}
+        for row in days.values():
+            if row.fixture_id not in latest or row.last_at > latest[row.fixture_id].last_at:
+                latest[row.fixture_id] = row
+        current = [
+            SportsOdds(fixture_id=row.fixture_id,
+                       **{field: getattr(row, f'last_{outcome}') / 100 for outcome, field in ODDS_FIELDS.items()})
+            for key, row in changed.items() if latest[key[0]] is row
+        ]
+        SportsOdds.objects.bulk_create(current, update_conflicts=True, unique_fields=['fixture'],
+                                       update_fields=list(ODDS_FIELDS.values()))
+        caching.invalidate('odds')
+        fixture_calendar.touch(fixtures[row.fixture_id] for row in current)
+    return len(ticks), skipped, fixture_ids
+
+
+def ingest(records, batch_size=BATCH_SIZE):
+    """
+    Appends price ticks, one transaction per batch.
+
+    Args:
+        records (iterable): Tick records as dicts with a "fixture" id, the
+        SportsOdds odds fields and an ISO "timestamp" (now if missing).
+        Records that are malformed or name an unknown fixture are skipped.
+        batch_size (int, optional): Records per transaction.
+
+    Returns:
+        IngestReport: Ticks stored (replayed ones included), records
+        skipped, fixtures priced and the time taken in seconds.
+    """
+    started = time.perf_counter()
+    records = iter(records)
+    ticks = skipped = 0
+    fixtures = set()
+    while True:
+        batch = list(islice(records, batch_size))
+        if not batch:
+            break
+        stored, rejected, fixture_ids = _ingest_batch(batch)
+        ticks += stored
+        skipped += rejected
+        fixtures |= fixture_ids
+    return IngestReport(ticks, skipped, len(fixtures), time.perf_counter() - started)
+
+
+def _price(recorded_at, *prices):
+    return Price(recorded_at, *(price / 100 for price in prices))
+
+
+def opening_and_current(fixture):
+    """
+    Returns the first and the latest price of a fixture.
+
+    Args:
+        fixture (Fixture or int): The fixture or its id.
+
+    Returns:
+        tuple: The opening and current Price, or (None, None) if the
+        fixture was never priced.
+    """
+    days = DailyOdds.objects.filter(fixture=fixture)
+    opening = days.order_by('day').values_list('open_at', 'open_home', 'open_away', 'open_draw').first()
+    if opening is None:
+        return None, None
+    current = days.order_by('-day').values_list('last_at', 'last_home', 'last_away', 'last_draw').first()
+    return _price(*opening), _price(*current)
+
+
+def price_at(fixture, moment):
+    """
+    Returns the price of a fixture at a moment.
+
+    Args:
+        fixture (Fixture or int): The fixture or its id.
+        moment (datetime): The moment.
+
+    Returns:
+        Price: The last price recorded at or before ``moment``, None if
+        there was none yet.
+    """
+    row = (OddsTick.objects.filter(fixture=fixture, recorded_at__lte=moment).order_by('-recorded_at')
+           .values_list('recorded_at', *OUTCOMES).first())
+    return _price(*row) if row else None
+
+
+def prices_at_tips(tips):
+    """
+    Returns the price of each tip's fixture when the tip was placed, in
+    two queries whatever the number of tips.
+
+    Args:
+        tips (iterable): Tip instances.
+
+    Returns:
+        dict: Maps each tip id to a Price, or None if its fixture was not
+        priced yet (or it has no fixture).
+    """
+    tips = list(tips)
+    ticks = OddsTick.objects.filter(fixture=OuterRef('fixture'), recorded_at__lte=OuterRef('created_at'))
+    tick_ids = dict(
+        Tip.objects.filter(pk__in=[tip.pk for tip in tips], fixture__isnull=False)
+        .annotate(tick_id=Subquery(ticks.order_by('-recorded_at').values('pk')[:1]))
+        .values_list('pk', 'tick_id')
+    )
+    found = OddsTick.objects.in_bulk([pk for pk in tick_ids.values() if pk is not None])
+    prices = {}
+    for tip in tips:
+        tick = found.get(tick_ids.get(tip.pk))
+        prices[tip.pk] = _price(tick.recorded_at, tick.home, tick.away, tick.draw) if tick else None
+    return prices
+
+
+def movers(day=None, limit=MOVERS_LIMIT, steamers=False):
+    """
+    Returns the biggest price moves of a day, from its first to its last
+    tick.
+
+    Drifters are prices that lengthened (the market rates the outcome less
+    likely than in the morning), steamers prices that shortened.
+
+    Args:
+        day (date, optional): The day, today by default.
+        limit (int, optional): The number of moves.
+        steamers (bool, optional): Return the steamers instead of the
+        drifters.
+
+    Returns:
+        list: Movements, the biggest first.
+    """
+    day = day or timezone.localdate()
+    moves = []
+    rows = DailyOdds.objects.filter(day=day).values_list(
+        'fixture_id', 'open_home', 'open_away', 'open_draw', 'last_home', 'last_away', 'last_draw')
+    for fixture_id, *prices in rows:
+        for outcome, opening, current in zip(OUTCOMES, prices[:3], prices[3:]):
+            change = current / opening - 1
+            if (change < 0) if steamers else (change > 0):
+                moves.append(Movement(fixture_id, outcome, opening / 100, current / 100, round(change, 4)))
+    moves.sort(key=lambda move: abs(move.change), reverse=True)
+    return moves[:limit]
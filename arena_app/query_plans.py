@@ -0,0 +1,350 @@
+# query_plans.py
+"""
+Query plan regression checks for the hot arena_app queries.
+
+HOT_QUERIES builds the querysets the views and services actually run (the
+latest tips feed, the league table, settlement, timelines, chat history,
+...). check() asks the database to EXPLAIN each one and reports the plans
+that read a whole table instead of going through an index.
+
+SQLite, PostgreSQL and MySQL plans are understood. On PostgreSQL
+sequential scans are disabled while each query is explained, so a small
+seeded table still shows whether an index *can* serve the query.
+"""
+import json
+import re
+from collections import namedtuple
+from datetime import timedelta
+
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from . import fixture_calendar, leaderboard, reference, rollups, submissions, teamform, timeline
+from .models import (BlogPost, ChatMessage, DailyOdds, DailyTipStats, Fixture, Follower, LeaderboardEntry,
+                     LiveScore, OddsTick, PointsLedgerEntry, Sport, Team, Tip, TimelineEntry, TipsterStats,
+                     UserProfile)
+
+HotQuery = namedtuple('HotQuery', ['name', 'build', 'allowed_scans'])
+PlanReport = namedtuple('PlanReport', ['name', 'sql', 'plan', 'full_scans'])
+
+
+def _now():
+    return timezone.now()
+
+
+def _some(model, **filters):
+    return model.objects.filter(**filters).values_list('pk', flat=True).first()
+
+
+def _latest_tips():
+    return Tip.objects.select_related('user').order_by('-created_at', '-id')[:21]
+
+
+def _latest_tips_page():
+    created_at = _now() - timedelta(days=1)
+    return (Tip.objects.select_related('user')
+            .filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=1))
+            .order_by('-created_at', '-id')[:21])
+
+
+def _latest_tips_by_sport():
+    return (Tip.objects.select_related('user').filter(sport_id=_some(Sport, name='Football'))
+            .order_by('-created_at', '-id')[:21])
+
+
+def _latest_tips_by_user():
+    username = UserProfile.objects.values_list('username', flat=True).first()
+    return (Tip.objects.select_related('user').filter(user__username=username)
+            .order_by('-created_at', '-id')[:21])
+
+
+def _user_wins():
+    return Tip.objects.filter(user_id=_some(UserProfile), is_win=True)
+
+
+def _open_tips():
+    return Tip.objects.filter(fixture_id__in=[_some(Fixture)], market__in=['home', 'away'],
+                              is_win__isnull=True)
+
+
+def _league_table():
+    return leaderboard.board_queryset()[:leaderboard.PAGE_SIZE + 1]
+
+
+def _sport_league_table():
+    return leaderboard.board_queryset(sport='Football')[:leaderboard.PAGE_SIZE + 1]
+
+
+def _upcoming_fixtures():
+    return Fixture.objects.filter(date_time__gte=_now()).order_by('date_time')[:50]
+
+
+def _sport_fixtures():
+    return Fixture.objects.filter(sport_id=_some(Sport), date_time__gte=_now()).order_by('date_time')[:50]
+
+
+def _followers():
+    return Follower.objects.filter(user_id=_some(UserProfile)).values_list('follower_id', flat=True)
+
+
+def _following():
+    return Follower.objects.filter(follower_id=_some(UserProfile)).values_list('user_id', flat=True)
+
+
+def _is_following():
+    return Follower.objects.filter(user_id=_some(UserProfile), follower_id=_some(UserProfile))
+
+
+def _timeline():
+    return (TimelineEntry.objects.filter(owner_id=_some(UserProfile)).select_related('tip__user')
+            .order_by('-created_at', '-tip_id')[:21])
+
+
+def _popular_tips():
+    popular = Follower.objects.filter(follower_id=_some(UserProfile),
+                                      user__followers_count__gt=timeline.FANOUT_LIMIT).values('user_id')
+    return Tip.objects.filter(user_id__in=popular).order_by('-created_at', '-id')[:21]
+
+
+def _chat_history():
+    return ChatMessage.objects.select_related('user').order_by('-created_at', '-id')[:50]
+
+
+def _live_score_changes():
+    return LiveScore.objects.filter(timestamp__gte=_now() - timedelta(seconds=5))
+
+
+def _ledger():
+    return PointsLedgerEntry.objects.filter(user_id=_some(UserProfile)).order_by('-created_at')[:50]
+
+
+def _blog_posts():
+    return BlogPost.objects.order_by('-created_at')[:20]
+
+
+def _rollup_window():
+    start, end = rollups.window_bounds('week')
+    return (DailyTipStats.objects.filter(day__gte=start, day__lte=end, sport_id=_some(Sport))
+            .values('user_id').annotate(**rollups.aggregates()).order_by())
+
+
+def _rollup_series():
+    start, end = rollups.window_bounds('month')
+    return (DailyTipStats.objects.filter(user_id=_some(UserProfile), day__gte=start, day__lte=end)
+            .values('day').annotate(**rollups.aggregates()).order_by('day'))
+
+
+def _tip_queue():
+    return submissions.unprocessed().order_by('pk')[:500]
+
+
+def _odds_opening():
+    return DailyOdds.objects.filter(fixture_id=_some(Fixture)).order_by('day')[:1]
+
+
+def _odds_at_tip():
+    return (OddsTick.objects.filter(fixture_id=_some(Fixture), recorded_at__lte=_now())
+            .order_by('-recorded_at')[:1])
+
+
+def _odds_movers():
+    return DailyOdds.objects.filter(day=timezone.localdate())
+
+
+def _fixture_form():
+    return teamform.fixture_records(Fixture.objects.first())
+
+
+def _fixture_calendar():
+    start, end = fixture_calendar.bounds(timezone.localdate(), 'week')
+    return fixture_calendar.queryset([_some(Sport, name='Football')], start, end)
+
+
+HOT_QUERIES = [
+    HotQuery('latest_tips', _latest_tips, ()),
+    HotQuery('latest_tips_page', _latest_tips_page, ()),
+    HotQuery('latest_tips_by_sport', _latest_tips_by_sport, ()),
+    HotQuery('latest_tips_by_user', _latest_tips_by_user, ()),
+    HotQuery('user_wins', _user_wins, ()),
+    HotQuery('open_tips', _open_tips, ()),
+    HotQuery('league_table', _league_table, ()),
+    HotQuery('sport_league_table', _sport_league_table, ()),
+    HotQuery('upcoming_fixtures', _upcoming_fixtures, ()),
+    HotQuery('sport_fixtures', _sport_fixtures, ()),
+    HotQuery('followers', _followers, ()),
+    HotQuery('following', _following, ()),
+    HotQuery('is_following', _is_following, ()),
+    HotQuery('timeline', _timeline, ()),
+    HotQuery('popular_tips', _popular_tips, ()),
+    HotQuery('chat_history', _chat_history, ()),
+    HotQuery('live_score_changes', _live_score_changes, ()),
+    HotQuery('ledger', _ledger, ()),
+    HotQuery('blog_posts', _blog_posts, ()),
+    HotQuery('rollup_window', _rollup_window, ()),
+    HotQuery('rollup_series', _rollup_series, ()),
+    HotQuery('tip_queue', _tip_queue, ()),
+    HotQuery('odds_opening', _odds_opening, ()),
+    HotQuery('odds_at_tip', _odds_at_tip, ()),
+    HotQuery('odds_movers', _odds_movers, ()),
+    HotQuery('fixture_form', _fixture_form, ()),
+    HotQuery('fixture_calendar', _fixture_calendar, ()),
+]
+
+
+def explain(queryset, using=None):
+    """
+    Returns the database's plan for a queryset as text.
+
+    Args:
+        queryset (QuerySet): The query to explain.
+        using (BaseDatabaseWrapper, optional): The connection. Defaults to
+        the default connection.
+
+    Returns:
+        str: The plan, as returned by the backend.
+    """
+    using = using or connection
+    if using.vendor == 'postgresql':
+        with using.cursor() as cursor:
+            cursor.execute('SET enable_seqscan = off')
+        try:
+            return queryset.explain()
+        finally:
+            # The connection outlives the check, and its later queries
+            # must be planned normally
+            with using.cursor() as cursor:
+                cursor.execute('RESET enable_seqscan')
+    if using.vendor == 'mysql':
+        return queryset.explain(format='json')
+    return queryset.explain()
+
+
+def full_scans(plan, vendor=None):
+    """
+    Returns the tables a plan reads in full.
+
+    Args:
+        plan (str): The plan returned by explain().
+        vendor (str, optional): The database vendor. Defaults to the vendor
+        of the default connection.
+
+    Returns:
+        list: The names of the scanned tables.
+    """
+    vendor = vendor or connection.vendor
+    if vendor == 'postgresql':
+        return re.findall(r'Seq Scan on (\w+)', plan)
+    if vendor == 'mysql':
+        scans = []
+
+        def walk(node):
+            if isinstance(node, dict):
+                if node.get('access_type') == 'ALL':
+                    scans.append(node.get('table_name'))
+                for value in node.values():
+                    walk(value)
+            elif isinstance(node, list):
+                for value in node:
+                    walk(value)
+
+        walk(json.loads(plan))
+        return scans
+    # SQLite: "SCAN <table>" without "USING ... INDEX" reads every row
+    scans = []
+    for line in plan.splitlines():
+        match = re.search(r'\bSCAN (\w+)(.*)', line)
+        if match and 'USING' not in match.group(2):
+            scans.append(match.group(1))
+    return scans
+
+
+def check(queries=None, using=None):
+    """
+    Explains the hot queries and reports their full table scans.
+
+    Args:
+        queries (list, optional): The HotQuery entries to check. Defaults
+        to HOT_QUERIES.
+        using (BaseDatabaseWrapper, optional): The connection. Defaults to
+        the default connection.
+
+    Returns:
+        list: A PlanReport per query. Reports with full_scans are regressions.
+    """
+    using = using or connection
+    reports = []
+    for query in queries or HOT_QUERIES:
+        queryset = query.build()
+        plan = explain(queryset, using)
+        scans = [table for table in full_scans(plan, using.vendor) if table not in query.allowed_scans]
+        reports.append(PlanReport(query.name, str(queryset.query), plan, scans))
+    return reports
+
+
+def seed(users=200, tips_per_user=20, fixtures=300, batch_size=1000):
+    """
+    Fills an empty database with enough rows for the planner to prefer the
+    indexes it would use in production.
+
+    Args:
+        users (int, optional): Number of tipsters.
+        tips_per_user (int, optional): Number of tips per tipster.
+        fixtures (int, optional): Number of fixtures.
+        batch_size (int, optional): Number of rows per INSERT.
+    """
+    now = _now()
+    sports = [Sport.objects.get_or_create(name=name)[0] for name in ('Football', 'Tennis', 'Golf', 'Horse Racing')]
+    teams = Team.objects.bulk_create([Team(name=f'Seed Team {n}', sport=sports[0]) for n in range(40)])
+    reference.invalidate()
+    fixture_rows = Fixture.objects.bulk_create([
+        Fixture(sport=sports[n % len(sports)], team_home=teams[n % 40], team_away=teams[(n + 1) % 40],
+                date_time=now + timedelta(hours=n - fixtures // 2))
+        for n in range(fixtures)
+    ], batch_size=batch_size)
+    UserProfile.objects.bulk_create([
+        UserProfile(name=f'Seed {n}', username=f'seed{n}', email=f'seed{n}@example.com')
+        for n in range(users)
+    ], batch_size=batch_size)
+    profiles = list(UserProfile.objects.filter(username__startswith='seed').order_by('pk'))
+    TipsterStats.objects.bulk_create([TipsterStats(user=profile) for profile in profiles], batch_size=batch_size)
+
+    tips = []
+    for n in range(users * tips_per_user):
+        fixture = fixture_rows[n % fixtures]
+        tips.append(Tip(user=profiles[n % users], sport=fixture.sport, fixture=fixture, market='home',
+                        odds=2, points_bet=10, is_win=None if n % 3 else n % 2 == 0))
+    Tip.objects.bulk_create(tips, batch_size=batch_size)
+    Tip.objects.filter(user__username__startswith='seed').update(created_at=now - timedelta(days=2))
+
+    Follower.objects.bulk_create([
+        Follower(user=profiles[n], follower=profiles[(n + step) % users])
+        for n in range(users) for step in range(1, 6)
+    ], batch_size=batch_size)
+    recent = list(Tip.objects.order_by('-created_at', '-id').values_list('id', 'created_at')[:50])
+    TimelineEntry.objects.bulk_create([
+        TimelineEntry(owner=profile, tip_id=tip_id, created_at=created_at)
+        for profile in profiles for tip_id, created_at in recent
+    ], batch_size=batch_size, ignore_conflicts=True)
+    ChatMessage.objects.bulk_create([ChatMessage(user=profiles[n % users], content='seed')
+                                     for n in range(users * 10)], batch_size=batch_size)
+    LiveScore.objects.bulk_create([LiveScore(league='Seed League', home_team=f'Home {n}', away_team=f'Away {n}',
+                                             timestamp=now - timedelta(minutes=n))
+                                   for n in range(users * 5)], batch_size=batch_size)
+    PointsLedgerEntry.objects.bulk_create([PointsLedgerEntry(user=profiles[n % users], kind=PointsLedgerEntry.STAKE,
+                                                             amount=-10)
+                                           for n in range(users * tips_per_user)], batch_size=batch_size)
+    BlogPost.objects.bulk_create([BlogPost(author=profiles[n % users], title=f'Seed {n}', content='seed')
+                                  for n in range(users * 2)], batch_size=batch_size)
+    leaderboard.rebuild()
+    rollups.rebuild()
+
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+    elif connection.vendor in ('postgresql', 'mysql'):
+        with connection.cursor() as cursor:
+            for model in (Tip, Fixture, Follower, TimelineEntry, ChatMessage, LiveScore,
+                          PointsLedgerEntry, BlogPost, LeaderboardEntry, DailyTipStats):
+                cursor.execute(f'ANALYZE {"TABLE " if connection.vendor == "mysql" else ""}'
+                               f'{connection.ops.quote_name(model._meta.db_table)}')
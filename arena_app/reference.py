@@ -0,0 +1,137 @@
+# reference.py
+"""
+Process-local cache of the reference tables, Sport and Team.
+
+Sports and teams change a few times a year but are read on almost every
+request: form choices, tip validation, fixture labels, tip lists. Each
+process keeps all of their rows in memory, indexed by id and by name, and
+reloads them (two queries) when the "reference" cache namespace version
+moves. signals.py bumps that version whenever a Sport or Team is saved or
+deleted, so every worker sharing the cache reloads on its next check.
+
+A process compares versions at most every CHECK_INTERVAL seconds, and
+drops its own copy straight away when it makes the change itself. The
+cached instances are shared between requests and must not be modified.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.db import transaction
+
+from . import caching
+from .models import Sport, Team
+
+NAMESPACE = 'reference'
+CHECK_INTERVAL = 5
+
+Tables = namedtuple('Tables', ['sports', 'sports_by_name', 'teams', 'teams_by_name'])
+
+_lock = threading.Lock()
+_loaded = {'tables': None, 'version': None, 'checked_at': 0.0}
+
+
+def _load():
+    sports = {sport.pk: sport for sport in Sport.objects.order_by('name')}
+    teams = {}
+    for team in Team.objects.order_by('name'):
+        # Share the cached sport instead of loading it per team
+        team.sport = sports[team.sport_id]
+        teams[team.pk] = team
+    return Tables(
+        sports=sports,
+        sports_by_name={sport.name: sport for sport in sports.values()},
+        teams=teams,
+        teams_by_name={team.name: team for team in teams.values()},
+    )
+
+
+def tables():
+    """
+    Returns the cached reference tables, reloading them if another process
+    changed them since the last check.
+
+    Returns:
+        Tables: Sports and teams by id and by name, each in name order.
+    """
+    now = time.monotonic()
+    if _loaded['tables'] is not None and now - _loaded['checked_at'] < CHECK_INTERVAL:
+        return _loaded['tables']
+    with _lock:
+        version, = caching.versions([NAMESPACE])
+        if _loaded['tables'] is None or _loaded['version'] != version:
+            _loaded['tables'] = _load()
+            _loaded['version'] = version
+        _loaded['checked_at'] = now
+        return _loaded['tables']
+
+
+def invalidate():
+    """
+    Makes every process reload the reference tables once the current
+    transaction commits.
+    """
+    caching.invalidate(NAMESPACE)
+    transaction.on_commit(clear)
+
+
+def clear():
+    """
+    Drops this process's copy of the reference tables.
+    """
+    with _lock:
+        _loaded['tables'] = None
+
+
+def sports():
+    return list(tables().sports.values())
+
+
+def sport(pk):
+    return tables().sports.get(pk)
+
+
+def sport_by_name(name):
+    return tables().sports_by_name.get(name)
+
+
+def teams(sport_id=None):
+    teams = tables().teams.values()
+    return [team for team in teams if sport_id is None or team.sport_id == sport_id]
+
+
+def team(pk):
+    return tables().teams.get(pk)
+
+
+def team_by_name(name):
+    return tables().teams_by_name.get(name)
+
+
+_LOOKUPS = {Sport: sport, Team: team}
+
+
+def attach(objects, *fields):
+    """
+    Fills foreign keys to Sport or Team from the cache instead of joining
+    or querying them.
+
+    Args:
+        objects (iterable): Model instances.
+        *fields (str): Names of their Sport or Team foreign keys.
+
+    Returns:
+        list: The objects.
+    """
+    objects = list(objects)
+    if not objects:
+        return objects
+    model_fields = [objects[0]._meta.get_field(name) for name in fields]
+    for obj in objects:
+        for field in model_fields:
+            value = getattr(obj, field.attname)
+            related = None if value is None else _LOOKUPS[field.related_model](value)
+            # Rows newer than this process's copy are left to the ORM
+            if related is not None:
+                setattr(obj, field.name, related)
+    return objects
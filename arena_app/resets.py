@@ -0,0 +1,103 @@
+# resets.py
+"""
+Chunked, resumable bulk points reset.
+
+run() resets every tipster's balance and last_points_reset in
+TipsterStats. It walks the tipsters in user id ranges, and each range is
+one transaction of set-based UPDATEs on TipsterStats and the leaderboard
+entries, plus the ledger's reset entries in bulk. The same
+transaction records a PointsResetChunk audit row and moves the
+PointsReset cursor, so a crashed run resumes after its last committed
+chunk. The cached league table is invalidated once at the end.
+"""
+import time
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import caching
+from .ledger import DEFAULT_BALANCE
+from .models import LeaderboardEntry, PointsLedgerEntry, PointsReset, PointsResetChunk, TipsterStats
+
+CHUNK_SIZE = 5000
+
+
+def _reset_chunk(reset, user_ids):
+    """
+    Resets one range of tipsters and advances the run's cursor.
+
+    Returns:
+        PointsResetChunk: The audit entry of the chunk.
+    """
+    started = time.perf_counter()
+    first, last = user_ids[0], user_ids[-1]
+    with transaction.atomic():
+        stats = TipsterStats.objects.filter(user_id__gte=first, user_id__lte=last).update(
+            points_balance=reset.balance, last_points_reset=reset.reset_on)
+        LeaderboardEntry.objects.filter(user_id__gte=first, user_id__lte=last).update(
+            points_balance=reset.balance)
+        PointsLedgerEntry.objects.bulk_create([
+            PointsLedgerEntry(user_id=user_id, kind=PointsLedgerEntry.RESET, amount=reset.balance)
+            for user_id in user_ids
+        ])
+        PointsReset.objects.filter(pk=reset.pk).update(last_user_id=last,
+                                                       users_reset=F('users_reset') + len(user_ids))
+        chunk = PointsResetChunk.objects.create(reset=reset, first_user_id=first, last_user_id=last,
+                                                tipster_stats=stats,
+                                                seconds=time.perf_counter() - started)
+    reset.last_user_id = last
+    reset.users_reset += len(user_ids)
+    return chunk
+
+
+def pending():
+    """
+    Returns the latest unfinished reset run, or None.
+    """
+    return PointsReset.objects.filter(finished_at__isnull=True).order_by('-pk').first()
+
+
+def run(balance=DEFAULT_BALANCE, chunk_size=CHUNK_SIZE, restart=False, log=None):
+    """
+    Resets every tipster's points, resuming an unfinished run if there is
+    one.
+
+    Args:
+        balance (int, optional): The new balance. Ignored when resuming,
+        which keeps the balance of the interrupted run.
+        chunk_size (int, optional): Number of tipsters per transaction.
+        restart (bool, optional): Start a new run even if one is unfinished.
+        log (callable, optional): Called with a progress line per chunk.
+
+    Returns:
+        dict: The run, whether it "resumed", the number of "tipster_stats"
+        reset by this call, its "seconds" and "rows_per_second".
+    """
+    log = log or (lambda message: None)
+    started = time.perf_counter()
+    reset = None if restart else pending()
+    resumed = reset is not None
+    if reset is None:
+        reset = PointsReset.objects.create(balance=balance, reset_on=timezone.now().date())
+    else:
+        log(f'Resuming the reset to {reset.balance} after user {reset.last_user_id}.')
+
+    reset_stats = 0
+    while True:
+        user_ids = list(TipsterStats.objects.filter(user_id__gt=reset.last_user_id).order_by('user_id')
+                        .values_list('user_id', flat=True)[:chunk_size])
+        if not user_ids:
+            break
+        chunk = _reset_chunk(reset, user_ids)
+        reset_stats += chunk.tipster_stats
+        log(f'Reset users {chunk.first_user_id}-{chunk.last_user_id} '
+            f'({chunk.tipster_stats} tipsters) in {chunk.seconds:.2f}s.')
+
+    caching.invalidate('leaderboard')
+    reset.finished_at = timezone.now()
+    reset.save(update_fields=['finished_at'])
+
+    seconds = time.perf_counter() - started
+    return {'reset': reset, 'resumed': resumed, 'tipster_stats': reset_stats, 'seconds': round(seconds, 2),
+            'rows_per_second': round(reset_stats / seconds) if seconds else reset_stats}
@@ -0,0 +1,356 @@
+# rollups.py
+"""
+Daily tipster rollups.
+
+DailyTipStats keeps one bucket per (tipster, sport, day) with the counts
+and sums of the tips created that day. Buckets are moved incrementally
+with F() expressions when a tip is created, settled or deleted, and
+rebuild() recomputes them all from the Tip table in one pass.
+
+Windowed questions ("best tipster this week", "last 30 days on Tennis")
+and per-tipster charts then sum a few buckets per tipster and day instead
+of scanning Tip.
+"""
+from copy import copy
+from datetime import date, timedelta
+from decimal import Decimal
+from math import floor
+
+from django.db import transaction
+from django.db.models import Case, Count, DecimalField, F, FloatField, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Floor, Round, TruncDate
+from django.utils import timezone
+
+from . import reference
+from .bulk import increment_by_key
+from .models import DailyTipStats, Tip
+
+# (month, day) the season starts on, for the "season" window
+SEASON_START = (8, 1)
+WINDOWS = ('week', 'month', 'season')
+# Longest explicit date range, in days, a window or series may cover
+MAX_RANGE_DAYS = 366
+BATCH_SIZE = 1000
+
+_SETTLED = ('settled', 'wins', 'settled_staked', 'returned')
+TOTALS = ('bets', 'staked', 'odds_total', 'odds_count') + _SETTLED
+
+
+def _day(tip):
+    return timezone.localdate(tip.created_at)
+
+
+def _odds(tip):
+    return Decimal(str(tip.odds)) if tip.odds is not None else Decimal(0)
+
+
+def _payout(tip):
+    return floor(tip.points_bet * _odds(tip))
+
+
+def payout_expression():
+    """
+    Returns the SQL form of a winning tip's payout, floor(stake * odds).
+
+    The odds are scaled to whole hundredths before multiplying, so the
+    floor is exact on backends that multiply decimals as floats (SQLite
+    gives 75 * 3.28 as 245.99...).
+    """
+    scaled = F('points_bet') * Round(F('odds') * 100) / 100
+    return Coalesce(Floor(scaled), Value(0), output_field=IntegerField())
+
+
+def apply(deltas):
+    """
+    Adds deltas to the buckets, creating missing buckets first.
+
+    Args:
+        deltas (dict): Maps (user_id, sport_id, day) to {field: delta}.
+
+    Returns:
+        int: The number of buckets updated.
+    """
+    deltas = {key: changes for key, changes in deltas.items() if any(changes.values())}
+    if not deltas:
+        return 0
+    if len(deltas) == 1:
+        # A single tip usually lands in an existing bucket: one UPDATE
+        ((user_id, sport_id, day), changes), = deltas.items()
+        bucket = DailyTipStats.objects.filter(user_id=user_id, sport_id=sport_id, day=day)
+        increments = {field: F(field) + delta for field, delta in changes.items()}
+        if bucket.update(**increments):
+            return 1
+    with transaction.atomic():
+        DailyTipStats.objects.bulk_create(
+            [DailyTipStats(user_id=user_id, sport_id=sport_id, day=day) for user_id, sport_id, day in deltas],
+            batch_size=BATCH_SIZE, ignore_conflicts=True,
+        )
+        match = Q()
+        for user_id, sport_id, day in deltas:
+            match |= Q(user_id=user_id, sport_id=sport_id, day=day)
+        pks = {
+            (user_id, sport_id, day): pk
+            for pk, user_id, sport_id, day in
+            DailyTipStats.objects.filter(match).values_list('pk', 'user_id', 'sport_id', 'day')
+        }
+        return increment_by_key(DailyTipStats.objects.all(), 'pk',
+                                {pks[key]: changes for key, changes in deltas.items()})
+
+
+def _key(tip):
+    return tip.user_id, tip.sport_id, _day(tip)
+
+
+def _totals(tip):
+    settled = tip.is_win is not None
+    return {
+        'bets': 1,
+        'staked': tip.points_bet,
+        'odds_total': _odds(tip),
+        'odds_count': 0 if tip.odds is None else 1,
+        'settled': int(settled),
+        'wins': int(bool(tip.is_win)),
+        'settled_staked': tip.points_bet if settled else 0,
+        'returned': _payout(tip) if tip.is_win else 0,
+    }
+
+
+def record_tip(tip):
+    """
+    Counts a newly created tip in its bucket.
+    """
+    apply({_key(tip): _totals(tip)})
+
+
+def record_tip_on_commit(tip):
+    """
+    Counts a newly created tip in its bucket once the current transaction
+    commits, as it was created. apply() creates missing buckets, so an
+    earlier settlement or deletion of the tip still adds up.
+    """
+    created = copy(tip)
+    transaction.on_commit(lambda: record_tip(created), robust=True)
+
+
+def record_tips(tips):
+    """
+    Counts a batch of newly created tips, summed per bucket first.
+
+    Returns:
+        int: The number of buckets updated.
+    """
+    deltas = {}
+    for tip in tips:
+        bucket = deltas.setdefault(_key(tip), dict.fromkeys(TOTALS, 0))
+        for field, value in _totals(tip).items():
+            bucket[field] += value
+    return apply(deltas)
+
+
+def record_outcome(tip, was_win):
+    """
+    Moves a tip's bucket after its outcome changed from ``was_win``.
+    """
+    if was_win == tip.is_win:
+        return
+    was_settled, is_settled = was_win is not None, tip.is_win is not None
+    apply({_key(tip): {
+        'settled': int(is_settled) - int(was_settled),
+        'wins': int(bool(tip.is_win)) - int(bool(was_win)),
+        'settled_staked': tip.points_bet * (int(is_settled) - int(was_settled)),
+        'returned': _payout(tip) * (int(bool(tip.is_win)) - int(bool(was_win))),
+    }})
+
+
+def remove_tip(tip):
+    """
+    Takes a deleted tip out of its bucket.
+    """
+    apply({_key(tip): {field: -value for field, value in _totals(tip).items()}})
+
+
+def _settled_totals():
+    payout = payout_expression()
+    return {
+        'settled': Count('id', filter=Q(is_win__isnull=False)),
+        'wins': Count('id', filter=Q(is_win=True)),
+        'settled_staked': Coalesce(Sum('points_bet', filter=Q(is_win__isnull=False)), Value(0)),
+        'returned': Coalesce(Sum(Case(When(is_win=True, then=payout), default=Value(0))), Value(0)),
+    }
+
+
+def record_settlement(tips, sign=1):
+    """
+    Counts a batch of newly settled tips in their buckets with one grouped
+    query, for set-based settlement that bypasses the model signals.
+
+    Args:
+        tips (QuerySet): The tips that were just settled.
+        sign (int, optional): -1 takes the tips' settlement back out, for
+        tips about to be regraded.
+
+    Returns:
+        int: The number of buckets updated.
+    """
+    rows = (tips.annotate(day=TruncDate('created_at'))
+            .values('user_id', 'sport_id', 'day').annotate(**_settled_totals()).order_by())
+    return apply({
+        (row['user_id'], row['sport_id'], row['day']): {field: sign * int(row[field]) for field in _SETTLED}
+        for row in rows
+    })
+
+
+def rebuild():
+    """
+    Recomputes every bucket from the Tip table in one grouped query.
+
+    Returns:
+        int: The number of buckets written.
+    """
+    rows = (
+        Tip.objects.annotate(day=TruncDate('created_at'))
+        .values('user_id', 'sport_id', 'day')
+        .annotate(bets=Count('id'), staked=Coalesce(Sum('points_bet'), Value(0)),
+                  odds_total=Coalesce(Sum('odds'), Value(0), output_field=DecimalField(max_digits=14, decimal_places=2)),
+                  odds_count=Count('odds'), **_settled_totals())
+        .order_by()
+    )
+    buckets = [DailyTipStats(**row) for row in rows.iterator()]
+    with transaction.atomic():
+        DailyTipStats.objects.all().delete()
+        DailyTipStats.objects.bulk_create(buckets, batch_size=BATCH_SIZE)
+    return len(buckets)
+
+
+def window_bounds(window, today=None):
+    """
+    Returns the first and last day of a named window ending today.
+
+    Args:
+        window (str): "week" (7 days), "month" (30 days) or "season"
+        (since the last SEASON_START).
+        today (date, optional): The last day. Defaults to today.
+
+    Returns:
+        tuple: The first and last day, both included.
+
+    Raises:
+        ValueError: If the window is unknown.
+    """
+    today = today or timezone.localdate()
+    if window == 'week':
+        return today - timedelta(days=6), today
+    if window == 'month':
+        return today - timedelta(days=29), today
+    if window == 'season':
+        start = date(today.year, *SEASON_START)
+        if start > today:
+            start = date(today.year - 1, *SEASON_START)
+        return start, today
+    raise ValueError(f'Unknown window {window!r}, expected one of {", ".join(WINDOWS)}.')
+
+
+def _buckets(start, end, sport=None, user=None):
+    buckets = DailyTipStats.objects.filter(day__gte=start, day__lte=end)
+    if isinstance(sport, str):
+        sport = reference.sport_by_name(sport)
+        buckets = buckets.filter(sport=sport) if sport else buckets.none()
+    elif sport is not None:
+        buckets = buckets.filter(sport=sport)
+    if user is not None:
+        buckets = buckets.filter(user=user)
+    return buckets
+
+
+def aggregates():
+    """
+    Returns the Sum() of every total, for annotating grouped buckets.
+    """
+    return {field: Sum(field) for field in TOTALS}
+
+
+def window_totals(start, end, sport=None, order_by='-profit', limit=None):
+    """
+    Returns each tipster's totals over a date range, from the buckets,
+    ranked and limited by the database.
+
+    Args:
+        start (date): The first day, included.
+        end (date): The last day, included.
+        sport (Sport or str, optional): Only count this sport.
+        order_by (str, optional): The ranking; any total, "profit" or
+        "strike_rate", with "-" for descending.
+        limit (int, optional): The number of tipsters returned.
+
+    Returns:
+        list: Dicts with the user id and username, the TOTALS, profit and
+        strike rate, in ranking order.
+    """
+    strike_rate = Case(
+        When(settled__gt=0, then=Cast('wins', FloatField()) * Value(100.0) / F('settled')),
+        default=Value(0.0), output_field=FloatField(),
+    )
+    # Ties go to the lower user id when descending, the higher one otherwise
+    tie_break = 'user_id' if order_by.startswith('-') else '-user_id'
+    rows = (_buckets(start, end, sport).values('user_id', 'user__username')
+            .annotate(**aggregates())
+            .annotate(profit=F('returned') - F('settled_staked'), strike_rate=strike_rate)
+            .order_by(order_by, tie_break))
+    results = list(rows[:limit] if limit else rows)
+    for row in results:
+        row['strike_rate'] = round(row['strike_rate'], 2)
+    return results
+
+
+def check_range(start, end):
+    """
+    Validates an explicit date range.
+
+    Raises:
+        ValueError: If start is after end or the range is longer than
+        MAX_RANGE_DAYS.
+    """
+    if start > end:
+        raise ValueError('start must not be after end.')
+    if (end - start).days + 1 > MAX_RANGE_DAYS:
+        raise ValueError(f'Date ranges are limited to {MAX_RANGE_DAYS} days.')
+
+
+def daily_series(user, start, end, sport=None):
+    """
+    Returns a tipster's per-day totals over a date range in one query, for
+    performance charts.
+
+    Args:
+        user (UserProfile): The tipster.
+        start (date): The first day, included.
+        end (date): The last day, included.
+        sport (Sport or str, optional): Only count this sport.
+
+    Returns:
+        list: A dict per day with tips, the day's profit and the cumulative
+        profit, including days without tips.
+
+    Raises:
+        ValueError: If the range is invalid, see check_range().
+    """
+    check_range(start, end)
+    rows = {row['day']: row for row in
+            _buckets(start, end, sport, user).values('day').annotate(**aggregates()).order_by('day')}
+    series = []
+    cumulative = 0
+    day = start
+    while day <= end:
+        row = rows.get(day)
+        profit = (row['returned'] - row['settled_staked']) if row else 0
+        cumulative += profit
+        series.append({
+            'day': day.isoformat(),
+            'bets': row['bets'] if row else 0,
+            'settled': row['settled'] if row else 0,
+            'wins': row['wins'] if row else 0,
+            'profit': profit,
+            'cumulative_profit': cumulative,
+        })
+        day += timedelta(days=1)
+    return series
@@ -0,0 +1,184 @@
+# settlement.py
+"""
+Set-based tip settlement.
+
+When a Result is saved, every open tip on its fixture is graded against the
+final score. Grading runs as one UPDATE per chunk of fixtures, and the
+resulting wins and payouts are applied to TipsterStats, the points ledger,
+the leaderboard and the daily rollups with F() expressions in the same
+transaction. Tips are never loaded into Python, so a full Saturday of
+results settles in a handful of statements.
+
+When a Result is corrected, the settled tips whose grade no longer matches
+the score are reopened first: their payouts and wins are reversed the same
+set-based way, and they are then settled again with the open tips.
+"""
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Sum, Value, When
+from django.utils import timezone
+
+from . import caching, leaderboard, ledger, rollups
+from .bulk import increment_by_key
+from .models import Result, Tip, TipsterStats
+
+# Whether a market wins for a final score of (home, away)
+MARKETS = {
+    'home': lambda home, away: home > away,
+    'draw': lambda home, away: home == away,
+    'away': lambda home, away: home < away,
+    'over_2_5': lambda home, away: home + away > 2,
+    'under_2_5': lambda home, away: home + away < 3,
+    'btts_yes': lambda home, away: home > 0 and away > 0,
+    'btts_no': lambda home, away: home == 0 or away == 0,
+}
+
+CHUNK_SIZE = 200
+
+
+def _grade(scores):
+    """
+    Returns an expression that is true for the tips that won, given the
+    final scores of a chunk of fixtures.
+    """
+    whens = []
+    for market, wins in MARKETS.items():
+        won = [fixture_id for fixture_id, (home, away) in scores.items() if wins(home, away)]
+        if won:
+            whens.append(When(market=market, fixture_id__in=won, then=Value(True)))
+    return Case(*whens, default=Value(False))
+
+
+def _payout():
+    # Stakes are debited when a tip is submitted, so a winning tip pays
+    # back its stake times the odds and a losing tip pays nothing.
+    return rollups.payout_expression()
+
+
+def _reopen(scores):
+    """
+    Reopens the settled tips of a chunk of fixtures that the final scores
+    grade differently, reversing what their settlement applied. Runs in
+    the caller's transaction.
+
+    Args:
+        scores (dict): Maps fixture ids to their (home, away) final score.
+
+    Returns:
+        int: The number of tips reopened.
+    """
+    regraded = list(
+        Tip.objects.filter(fixture_id__in=list(scores), market__in=list(MARKETS), is_win__isnull=False)
+        .annotate(grade=_grade(scores)).exclude(is_win=F('grade')).values_list('id', flat=True)
+    )
+    if not regraded:
+        return 0
+    tips = Tip.objects.filter(id__in=regraded)
+    rows = (
+        tips.values('user_id', 'sport_id')
+        .annotate(wins=Count('id', filter=Q(is_win=True)),
+                  points=Sum(Case(When(is_win=True, then=_payout()), default=Value(0))))
+        .order_by()
+    )
+
+    deltas = {}
+    wins = {}
+    for row in rows:
+        user_deltas = deltas.setdefault(row['user_id'], {'total_wins': 0, 'points_balance': 0})
+        user_deltas['total_wins'] -= row['wins']
+        user_deltas['points_balance'] -= int(row['points'] or 0)
+        wins[row['user_id'], row['sport_id']] = -row['wins']
+
+    increment_by_key(TipsterStats.objects.all(), 'user_id', deltas)
+    ledger.record_reversals(
+        (user_id, tip_id, int(amount))
+        for user_id, tip_id, amount in
+        tips.filter(is_win=True).annotate(payout=_payout()).values_list('user_id', 'id', 'payout').iterator()
+    )
+    leaderboard.apply_settlement(wins)
+    rollups.record_settlement(tips, sign=-1)
+    return tips.update(is_win=None, settled_at=None)
+
+
+def _settle_chunk(scores):
+    """
+    Settles the open tips of a chunk of fixtures, after reopening the
+    settled ones the scores now grade differently.
+
+    Args:
+        scores (dict): Maps fixture ids to their (home, away) final score.
+
+    Returns:
+        int: The number of tips settled.
+    """
+    with transaction.atomic():
+        _reopen(scores)
+        settled_at = timezone.now()
+        settled = Tip.objects.filter(
+            fixture_id__in=list(scores), market__in=list(MARKETS), is_win__isnull=True
+        ).update(is_win=_grade(scores), settled_at=settled_at)
+        if not settled:
+            return 0
+
+        payout = _payout()
+        winners = Tip.objects.filter(fixture_id__in=list(scores), settled_at=settled_at, is_win=True)
+        rows = (
+            Tip.objects.filter(fixture_id__in=list(scores), settled_at=settled_at)
+            .values('user_id', 'sport_id')
+            .annotate(wins=Count('id', filter=Q(is_win=True)),
+                      points=Sum(Case(When(is_win=True, then=payout), default=Value(0))))
+            .order_by()
+        )
+
+        deltas = {}
+        wins = {}
+        for row in rows:
+            user_deltas = deltas.setdefault(row['user_id'], {'total_wins': 0, 'points_balance': 0})
+            user_deltas['total_wins'] += row['wins']
+            user_deltas['points_balance'] += int(row['points'] or 0)
+            wins[row['user_id'], row['sport_id']] = row['wins']
+
+        increment_by_key(TipsterStats.objects.all(), 'user_id', deltas)
+        ledger.record_payouts(
+            (user_id, tip_id, int(amount))
+            for user_id, tip_id, amount in
+            winners.annotate(payout=payout).values_list('user_id', 'id', 'payout').iterator()
+        )
+        leaderboard.apply_settlement(wins)
+        rollups.record_settlement(Tip.objects.filter(fixture_id__in=list(scores), settled_at=settled_at))
+        caching.invalidate('tips')
+    return settled
+
+
+def settle_fixtures(fixture_ids=None, chunk_size=CHUNK_SIZE):
+    """
+    Settles the open tips of fixtures that have a Result.
+
+    Settled tips whose grade still matches their fixture's score are left
+    alone, so running it twice is harmless, while those of a corrected
+    result are regraded. Each chunk of fixtures commits on its own to keep
+    locks short.
+
+    Args:
+        fixture_ids (iterable, optional): The fixtures to settle. Defaults
+        to every fixture with a result and at least one open tip.
+        chunk_size (int, optional): Number of fixtures per transaction.
+
+    Returns:
+        int: The number of tips settled.
+    """
+    results = Result.objects.all()
+    if fixture_ids is None:
+        results = results.filter(fixture__tips__is_win__isnull=True, fixture__tips__market__isnull=False)
+    else:
+        results = results.filter(fixture_id__in=list(fixture_ids))
+    scores = dict(
+        (fixture_id, (home, away))
+        for fixture_id, home, away in
+        results.values_list('fixture_id', 'team_home_score', 'team_away_score').distinct()
+    )
+
+    items = list(scores.items())
+    settled = 0
+    for start in range(0, len(items), chunk_size):
+        settled += _settle_chunk(dict(items[start:start + chunk_size]))
+    return settled
@@ -0,0 +1,142 @@
+# signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import (authentication, caching, fixture_calendar, leaderboard, reference, rollups, settlement, teamform,
+               timeline)
+from .models import (BlogPost, Fixture, Follower, LiveScore, Result, Sport, SportsOdds, Team, Tip, TipsterStats,
+                     UserProfile)
+
+# Cache namespaces that go stale when a model's rows change
+CACHE_NAMESPACES = {
+    Tip: ('tips', 'leaderboard'),
+    TipsterStats: ('leaderboard',),
+    BlogPost: ('blog',),
+    LiveScore: ('livescores',),
+}
+
+
+@receiver(post_save, sender=UserProfile)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    Gives every new user their TipsterStats row, the one store of their
+    points and bet counts, and drops the cached copy of changed users.
+    """
+    if created and not raw:
+        TipsterStats.objects.get_or_create(user=instance)
+    authentication.forget_user(instance.pk)
+
+
+@receiver(post_delete, sender=UserProfile)
+def user_deleted(sender, instance, **kwargs):
+    authentication.forget_user(instance.pk)
+
+
+@receiver(post_save, sender=Tip)
+def tip_saved(sender, instance, created, **kwargs):
+    """
+    Keeps the leaderboard and daily rollups in step with new and newly
+    settled tips. New tips are counted and fanned out to followers once
+    committed, so the transaction that saves them stays short.
+    """
+    if created:
+        leaderboard.record_tip_on_commit(instance)
+        rollups.record_tip_on_commit(instance)
+        timeline.fan_out_on_commit(instance)
+    else:
+        was_win = getattr(instance, '_loaded_is_win', None)
+        leaderboard.record_outcome(instance.user_id, instance.sport_id, was_win, instance.is_win)
+        rollups.record_outcome(instance, was_win)
+    instance._loaded_is_win = instance.is_win
+
+
+@receiver(post_delete, sender=Tip)
+def tip_deleted(sender, instance, **kwargs):
+    leaderboard.remove_tip(instance)
+    rollups.remove_tip(instance)
+
+
+@receiver(post_save, sender=TipsterStats)
+def tipster_stats_saved(sender, instance, **kwargs):
+    """
+    Moves the tipster on every board when their balance changes.
+    """
+    leaderboard.update_balance(instance.user_id, instance.points_balance)
+
+
+@receiver(post_save, sender=Result)
+def result_saved(sender, instance, **kwargs):
+    """
+    Settles the open tips on the fixture of a new result and updates the
+    form of its teams.
+    """
+    settlement.settle_fixtures([instance.fixture_id])
+    fixture = instance.fixture
+    teamform.update_teams(fixture.team_home_id, fixture.team_away_id)
+    fixture_calendar.touch([(fixture.sport_id, fixture.date_time)])
+
+
+@receiver(post_delete, sender=Result)
+def result_deleted(sender, instance, **kwargs):
+    # Results go before their fixture when a fixture is deleted
+    fixture = (Fixture.objects.filter(pk=instance.fixture_id)
+               .values_list('team_home_id', 'team_away_id', 'sport_id', 'date_time').first())
+    if fixture:
+        teamform.update_teams(*fixture[:2])
+        fixture_calendar.touch([fixture[2:]])
+
+
+@receiver(post_save, sender=Fixture)
+@receiver(post_delete, sender=Fixture)
+def fixture_changed(sender, instance, **kwargs):
+    """
+    Marks the calendar day of a fixture as changed, and the day it was
+    moved from.
+    """
+    days = {(instance.sport_id, instance.date_time)}
+    loaded = getattr(instance, '_loaded_calendar', None)
+    if loaded and None not in loaded:
+        days.add(loaded)
+    fixture_calendar.touch(days)
+    instance._loaded_calendar = (instance.sport_id, instance.date_time)
+
+
+@receiver(post_save, sender=SportsOdds)
+@receiver(post_delete, sender=SportsOdds)
+def sports_odds_changed(sender, instance, **kwargs):
+    fixture = Fixture.objects.filter(pk=instance.fixture_id).values_list('sport_id', 'date_time').first()
+    if fixture:
+        fixture_calendar.touch([fixture])
+
+
+@receiver(post_save, sender=Tip)
+@receiver(post_delete, sender=Tip)
+@receiver(post_save, sender=TipsterStats)
+@receiver(post_delete, sender=TipsterStats)
+@receiver(post_save, sender=BlogPost)
+@receiver(post_delete, sender=BlogPost)
+@receiver(post_save, sender=LiveScore)
+@receiver(post_delete, sender=LiveScore)
+def invalidate_cached_pages(sender, **kwargs):
+    caching.invalidate(*CACHE_NAMESPACES[sender])
+
+
+@receiver(post_save, sender=Sport)
+@receiver(post_delete, sender=Sport)
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def reference_changed(sender, **kwargs):
+    reference.invalidate()
+
+
+@receiver(post_save, sender=Follower)
+def follower_saved(sender, instance, created, **kwargs):
+    if created:
+        timeline.followed(instance.follower_id, instance.user_id)
+        authentication.forget_user(instance.follower_id, instance.user_id)
+
+
+@receiver(post_delete, sender=Follower)
+def follower_deleted(sender, instance, **kwargs):
+    timeline.unfollowed(instance.follower_id, instance.user_id)
+    authentication.forget_user(instance.follower_id, instance.user_id)
@@ -0,0 +1,278 @@
+# streams.py
+"""
+Server-sent events for live scores.
+
+One LiveScoreBroadcaster per process polls the LiveScore table for rows
+whose timestamp moved, keeps the latest state of every match in memory and
+pushes only the changed rows to every subscribed client. However many tabs
+are open, the database sees one small indexed read per poll interval, plus
+a read of the table's ids to notice deleted rows, which are sent as a
+"removed" event.
+
+The timestamp is the server's ingest time (see arena_app.livescores), never
+the feed's clock. Each poll re-reads a short window before the watermark, so
+a row stamped just before an ingest committed is still picked up; rows that
+did not change are not sent again.
+
+Event ids are the broadcaster's timestamp watermark, or the time of the
+latest removal when that is later, so a client that reconnects with
+Last-Event-ID receives the rows that changed since then, served from
+memory, instead of reloading the page. A client that missed a removal is
+sent a fresh snapshot instead.
+"""
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.utils import timezone
+
+from .models import LiveScore
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 2.0
+# How far before the watermark each poll reads again, for late commits
+COMMIT_LAG = timedelta(seconds=10)
+HEARTBEAT_INTERVAL = 15.0
+SUBSCRIBER_QUEUE_SIZE = 100
+
+FIELDS = ('id', 'league', 'home_team', 'away_team', 'home_score', 'away_score',
+          'match_status', 'match_time', 'timestamp')
+
+
+def _event_id(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def _parse_event_id(value):
+    try:
+        return datetime.fromtimestamp(int(value) / 1_000_000, tz=dt_timezone.utc)
+    except (TypeError, ValueError, OverflowError, OSError):
+        return None
+
+
+def _serialize(row):
+    return {**row, 'timestamp': row['timestamp'].isoformat()}
+
+
+def format_event(event, data, event_id=None):
+    """
+    Formats one server-sent event.
+
+    Args:
+        event (str): The event name.
+        data: The JSON-serializable payload.
+        event_id (str, optional): The id the client resumes from.
+
+    Returns:
+        bytes: The encoded event.
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append(f'event: {event}')
+    lines.append(f'data: {json.dumps(data)}')
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+class LiveScoreBroadcaster:
+    """
+    Shared in-process fan-out of LiveScore changes.
+
+    The poller only runs while at least one client is subscribed.
+    """
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.rows = {}
+        self.watermark = None
+        self.removed_at = None
+        self.subscribers = set()
+        self._task = None
+        self._lock = asyncio.Lock()
+
+    def _read(self):
+        # Runs in a worker thread outside the request cycle, so stale or
+        # broken connections are not closed for it
+        close_old_connections()
+        try:
+            scores = LiveScore.objects.order_by()
+            if self.watermark is not None:
+                scores = scores.filter(timestamp__gte=self.watermark - COMMIT_LAG)
+            rows = list(scores.values(*FIELDS))
+            # Read after the rows, so a row inserted in between is never
+            # taken for a deleted one
+            ids = set(LiveScore.objects.order_by().values_list('id', flat=True)) if self.rows else set()
+            return rows, ids
+        finally:
+            close_old_connections()
+
+    async def refresh(self):
+        """
+        Reads the rows that moved since the last poll and returns the ones
+        that actually changed and the ids of the rows deleted since.
+        """
+        rows, ids = await sync_to_async(self._read)()
+        changed = []
+        for row in rows:
+            ids.add(row['id'])
+            if self.rows.get(row['id']) != row:
+                self.rows[row['id']] = row
+                changed.append(row)
+            if self.watermark is None or row['timestamp'] > self.watermark:
+                self.watermark = row['timestamp']
+        removed = [pk for pk in self.rows if pk not in ids]
+        for pk in removed:
+            del self.rows[pk]
+        if removed:
+            self.removed_at = timezone.now()
+        return changed, removed
+
+    def _position(self):
+        # The latest moment clients have been told about, for event ids
+        moments = [moment for moment in (self.watermark, self.removed_at) if moment is not None]
+        return max(moments) if moments else None
+
+    def publish(self, changed, removed=()):
+        """
+        Queues a batch of changed rows and removed ids for every
+        subscriber. Subscribers that fall too far behind are sent a fresh
+        snapshot instead.
+        """
+        event_id = _event_id(self._position())
+        payloads = []
+        if changed:
+            payloads.append(format_event('scores', [_serialize(row) for row in changed], event_id))
+        if removed:
+            payloads.append(format_event('removed', list(removed), event_id))
+        for queue in list(self.subscribers):
+            try:
+                for payload in payloads:
+                    queue.put_nowait(payload)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self.snapshot())
+
+    def snapshot(self):
+        position = self._position()
+        event_id = _event_id(position) if position else None
+        return format_event('snapshot', [_serialize(row) for row in self.rows.values()], event_id)
+
+    def backlog(self, last_event_id):
+        """
+        Returns the event that brings a client up to date: the rows changed
+        since its last event when it can resume, otherwise a full snapshot.
+        """
+        since = _parse_event_id(last_event_id) if last_event_id else None
+        if since is None or self.watermark is None:
+            return self.snapshot()
+        if self.removed_at is not None and since < self.removed_at:
+            return self.snapshot()
+        changed = [_serialize(row) for row in self.rows.values() if row['timestamp'] > since]
+        return format_event('scores', changed, _event_id(self._position()))
+
+    async def _run(self):
+        while self.subscribers:
+            await asyncio.sleep(self.interval)
+            try:
+                changed, removed = await self.refresh()
+            except Exception:
+                # A failed poll (database restart, lost connection) must not
+                # end the stream for every client; the next poll retries
+                logger.exception('Live score poll failed, retrying in %ss', self.interval)
+                continue
+            if changed or removed:
+                self.publish(changed, removed)
+
+    def _restart(self, task):
+        # Anything that escapes the loop ends the task: log it and start a
+        # new poller while clients are still subscribed
+        if task.cancelled() or task.exception() is None:
+            return
+        logger.error('Live score poller stopped, restarting', exc_info=task.exception())
+        if self.subscribers:
+            self._start()
+
+    def _start(self):
+        self._task = asyncio.ensure_future(self._run())
+        self._task.add_done_callback(self._restart)
+
+    async def subscribe(self, last_event_id=None):
+        """
+        Registers a client and returns its queue, primed with the events it
+        has missed.
+        """
+        async with self._lock:
+            if self._task is None or self._task.done():
+                await self.refresh()
+            queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+            queue.put_nowait(self.backlog(last_event_id))
+            self.subscribers.add(queue)
+            if self._task is None or self._task.done():
+                self._start()
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+
+
+broadcaster = LiveScoreBroadcaster()
+
+
+async def wait_for_disconnect(receive):
+    """
+    Consumes ASGI messages until the client disconnects.
+    """
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return message
+
+
+async def live_scores_stream(scope, receive, send):
+    """
+    ASGI application streaming LiveScore changes as server-sent events.
+
+    The resume position is read from the Last-Event-ID header, or from a
+    last_event_id query parameter for clients that cannot set headers.
+    """
+    headers = dict(scope.get('headers') or [])
+    last_event_id = headers.get(b'last-event-id', b'').decode() or None
+    if last_event_id is None:
+        query = parse_qs(scope.get('query_string', b'').decode())
+        last_event_id = query.get('last_event_id', [None])[0]
+
+    await send({
+        'type': 'http.response.start',
+        'status': 200,
+        'headers': [
+            (b'content-type', b'text/event-stream'),
+            (b'cache-control', b'no-cache'),
+            (b'x-accel-buffering', b'no'),
+        ],
+    })
+
+    queue = await broadcaster.subscribe(last_event_id)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        while True:
+            next_event = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({next_event, disconnected}, timeout=HEARTBEAT_INTERVAL,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                next_event.cancel()
+                break
+            if next_event in done:
+                body = next_event.result()
+            else:
+                next_event.cancel()
+                body = b': keep-alive\n\n'
+            await send({'type': 'http.response.body', 'body': body, 'more_body': True})
+    finally:
+        broadcaster.unsubscribe(queue)
+        disconnected.cancel()
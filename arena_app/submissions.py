@@ -0,0 +1,168 @@
+# submissions.py
+"""
+Write-behind queue for tip submissions.
+
+With TIP_SUBMISSIONS = "queue" in settings, submit_tips stores each
+validated tip as a pending TipSubmission (one INSERT) and answers at once.
+A worker (manage.py process_tip_queue) drains the queue in batches: each
+batch is one transaction that debits every stake (one conditional UPDATE
+per tipster, ledger.debit_batch), inserts the accepted tips and their
+ledger entries in bulk and updates the boards, rollups and timelines once
+per batch. Bursts then cost the database a few large transactions instead
+of one writer per request.
+
+Enqueueing is refused with QueueFull once MAX_PENDING submissions wait,
+so a stalled worker slows clients down instead of growing the queue
+without bound. Clients follow their submission through
+tip_submission_status. "inline" runs the worker in the request, for tests
+and development; "direct" (the default) places tips in the request.
+
+On PostgreSQL and MySQL several workers skip each other's locked rows;
+SQLite has no row locks, so run a single worker there.
+"""
+import time
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import caching, leaderboard, ledger, rollups, timeline
+from .models import Tip, TipsterStats, TipSubmission
+
+BATCH_SIZE = 500
+MAX_PENDING = 5000
+RETRY_AFTER = 5
+RETENTION_DAYS = 7
+
+
+class QueueFull(Exception):
+    """
+    Raised when MAX_PENDING submissions are already waiting.
+    """
+
+
+def unprocessed():
+    """
+    Returns the submissions the worker has yet to process.
+    """
+    return TipSubmission.objects.filter(processed_at__isnull=True)
+
+
+def enqueue(tip):
+    """
+    Queues a validated, unsaved tip.
+
+    Args:
+        tip (Tip): The tip, with its user set.
+
+    Returns:
+        TipSubmission: The pending submission.
+
+    Raises:
+        QueueFull: If the queue is full; retry after RETRY_AFTER seconds.
+        ledger.InsufficientPoints: If the stake is already larger than the
+        balance. The worker makes the binding check.
+    """
+    if unprocessed().order_by()[:MAX_PENDING].count() >= MAX_PENDING:
+        raise QueueFull('Tips are arriving faster than we can place them, please try again in a moment.')
+    balance = TipsterStats.objects.filter(user_id=tip.user_id).values_list('points_balance', flat=True).first()
+    if balance is not None and tip.points_bet > balance:
+        raise ledger.InsufficientPoints('You cannot bet more points than your current balance.')
+    return TipSubmission.objects.create(user_id=tip.user_id, sport_id=tip.sport_id, fixture_id=tip.fixture_id,
+                                        market=tip.market, bet_type=tip.bet_type, odds=tip.odds,
+                                        points_bet=tip.points_bet)
+
+
+def _create_tips(tips):
+    if connection.features.can_return_rows_from_bulk_insert:
+        Tip.objects.bulk_create(tips)
+        # bulk_create skips the post_save signals, so do their work per batch
+        leaderboard.record_tips(tips)
+        rollups.record_tips(tips)
+        timeline.fan_out_many(tips)
+        caching.invalidate('tips', 'leaderboard')
+    else:
+        # Without ids back from a bulk INSERT the tips are saved one by one
+        # and the signals keep the derived tables
+        for tip in tips:
+            tip.save()
+
+
+def process_batch(batch_size=BATCH_SIZE):
+    """
+    Places the oldest pending submissions in one transaction.
+
+    Args:
+        batch_size (int, optional): The number of submissions.
+
+    Returns:
+        tuple: The number of submissions accepted and rejected.
+    """
+    pending = unprocessed().order_by('pk')
+    if connection.features.has_select_for_update_skip_locked:
+        pending = pending.select_for_update(skip_locked=True)
+    with transaction.atomic():
+        batch = list(pending[:batch_size])
+        if not batch:
+            return 0, 0
+        accepted = ledger.debit_batch([(submission.user_id, submission.points_bet) for submission in batch])
+        tips = {
+            submission.pk: Tip(user_id=submission.user_id, sport_id=submission.sport_id,
+                               fixture_id=submission.fixture_id, market=submission.market,
+                               bet_type=submission.bet_type, odds=submission.odds,
+                               points_bet=submission.points_bet)
+            for submission, ok in zip(batch, accepted) if ok
+        }
+        _create_tips(list(tips.values()))
+        ledger.record_stakes((tip.user_id, tip.pk, tip.points_bet) for tip in tips.values())
+
+        now = timezone.now()
+        for submission in batch:
+            submission.processed_at = now
+            if submission.pk in tips:
+                submission.status = TipSubmission.ACCEPTED
+                submission.tip = tips[submission.pk]
+            else:
+                submission.status = TipSubmission.REJECTED
+                submission.error = 'You cannot bet more points than your current balance.'
+        TipSubmission.objects.bulk_update(batch, ['status', 'error', 'tip', 'processed_at'])
+    return len(tips), len(batch) - len(tips)
+
+
+def drain(batch_size=BATCH_SIZE, log=None):
+    """
+    Processes batches until no submission is pending.
+
+    Args:
+        batch_size (int, optional): Submissions per transaction.
+        log (callable, optional): Called with a line per batch.
+
+    Returns:
+        dict: The number of submissions "accepted" and "rejected", the
+        "batches" and the "seconds" it took.
+    """
+    log = log or (lambda message: None)
+    started = time.perf_counter()
+    report = {'accepted': 0, 'rejected': 0, 'batches': 0}
+    while True:
+        batch_started = time.perf_counter()
+        accepted, rejected = process_batch(batch_size)
+        if not accepted and not rejected:
+            break
+        report['accepted'] += accepted
+        report['rejected'] += rejected
+        report['batches'] += 1
+        log(f'{accepted} accepted, {rejected} rejected in {time.perf_counter() - batch_started:.3f}s.')
+    report['seconds'] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def purge(days=RETENTION_DAYS):
+    """
+    Deletes processed submissions older than ``days``.
+
+    Returns:
+        int: The number of submissions deleted.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    return TipSubmission.objects.filter(processed_at__lt=cutoff).delete()[0]
@@ -0,0 +1,175 @@
+# teamform.py
+"""
+Team form and head-to-head records.
+
+TeamRecord keeps each team's overall record with its latest results, and
+its head-to-head record against every opponent it has played, so a
+fixture page reads both teams' form and their head-to-head with one
+indexed query (for_fixture()) instead of joining Result to Fixture on both
+team columns.
+
+signals.py calls update_teams() when a Result is saved or deleted, which
+recomputes the four records of the fixture's teams (their overall records
+and both sides of their head-to-head) from their results. rebuild()
+recomputes every record from all results in one pass; run it after
+changing the teams of a fixture that already has a result.
+"""
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import Q
+
+from . import caching
+from .models import Result, TeamRecord
+
+RECENT_RESULTS = 10
+BATCH_SIZE = 1000
+RESULT_FIELDS = ('fixture_id', 'fixture__date_time', 'fixture__team_home_id', 'fixture__team_away_id',
+                 'team_home_score', 'team_away_score')
+
+FixtureForm = namedtuple('FixtureForm', ['home', 'away', 'head_to_head'])
+
+
+def _outcome(scored, conceded):
+    if scored > conceded:
+        return 'W'
+    return 'D' if scored == conceded else 'L'
+
+
+def _records(results, keys=None):
+    # Replays result rows (RESULT_FIELDS) in date order into TeamRecords,
+    # only those of ``keys`` ((team_id, opponent_id) pairs) if given
+    records = {}
+    for fixture_id, played_at, home_id, away_id, home_score, away_score in sorted(
+            results, key=lambda row: (row[1], row[0])):
+        sides = ((home_id, away_id, True, home_score, away_score), (away_id, home_id, False, away_score, home_score))
+        for team_id, opponent_id, at_home, scored, conceded in sides:
+            outcome = _outcome(scored, conceded)
+            entry = {'fixture': fixture_id, 'date': played_at.isoformat(), 'opponent': opponent_id,
+                     'home': at_home, 'for': scored, 'against': conceded, 'outcome': outcome}
+            for key in ((team_id, None), (team_id, opponent_id)):
+                if keys is not None and key not in keys:
+                    continue
+                record = records.get(key)
+                if record is None:
+                    record = records[key] = TeamRecord(team_id=team_id, opponent_id=key[1], recent=[])
+                record.played += 1
+                record.wins += outcome == 'W'
+                record.draws += outcome == 'D'
+                record.losses += outcome == 'L'
+                record.goals_for += scored
+                record.goals_against += conceded
+                record.recent.insert(0, entry)
+                del record.recent[RECENT_RESULTS:]
+                record.last_played = played_at
+    for record in records.values():
+        record.form = ''.join(entry['outcome'] for entry in record.recent)
+    return list(records.values())
+
+
+def _match(keys):
+    match = Q()
+    for team_id, opponent_id in keys:
+        if opponent_id is None:
+            match |= Q(team_id=team_id, opponent__isnull=True)
+        else:
+            match |= Q(team_id=team_id, opponent_id=opponent_id)
+    return match
+
+
+def update_teams(home_id, away_id):
+    """
+    Recomputes the overall records of two teams and their head-to-head
+    from their results.
+
+    Args:
+        home_id (int): The id of the home team of the fixture.
+        away_id (int): The id of the away team.
+
+    Returns:
+        int: The number of records written.
+    """
+    keys = {(home_id, None), (away_id, None), (home_id, away_id), (away_id, home_id)}
+    teams = [home_id, away_id]
+    results = (Result.objects.filter(Q(fixture__team_home_id__in=teams) | Q(fixture__team_away_id__in=teams))
+               .values_list(*RESULT_FIELDS))
+    records = _records(results, keys)
+    with transaction.atomic():
+        TeamRecord.objects.filter(_match(keys)).delete()
+        TeamRecord.objects.bulk_create(records)
+        caching.invalidate('form')
+    return len(records)
+
+
+def rebuild():
+    """
+    Recomputes every record from the Result table in one query.
+
+    Returns:
+        int: The number of records written.
+    """
+    records = _records(Result.objects.values_list(*RESULT_FIELDS).iterator())
+    with transaction.atomic():
+        TeamRecord.objects.all().delete()
+        TeamRecord.objects.bulk_create(records, batch_size=BATCH_SIZE)
+        caching.invalidate('form')
+    return len(records)
+
+
+def _fixture_keys(fixture):
+    home_id, away_id = fixture.team_home_id, fixture.team_away_id
+    return [(home_id, None), (away_id, None), (home_id, away_id)]
+
+
+def fixture_records(fixture):
+    """
+    Returns the query for_fixture() runs: the records of a fixture's
+    teams and their head-to-head.
+    """
+    return TeamRecord.objects.filter(_match(_fixture_keys(fixture)))
+
+
+def for_fixture(fixture):
+    """
+    Returns the form of a fixture's teams and their head-to-head.
+
+    Args:
+        fixture (Fixture): The fixture.
+
+    Returns:
+        FixtureForm: The overall records of the home and away teams and
+        the home team's head-to-head record against the away team, each
+        None when there is no result to count yet.
+    """
+    records = {(record.team_id, record.opponent_id): record for record in fixture_records(fixture)}
+    return FixtureForm(*(records.get(key) for key in _fixture_keys(fixture)))
+
+
+def summary(record, last=RECENT_RESULTS):
+    """
+    Describes a record and the team's form over its latest results.
+
+    Args:
+        record (TeamRecord): The record, or None.
+        last (int, optional): The number of latest results the form
+        covers, at most RECENT_RESULTS.
+
+    Returns:
+        dict: The totals, and the "form" string, goals and "results" of
+        the latest results. None without a record.
+    """
+    if record is None:
+        return None
+    recent = record.recent[:last]
+    return {
+        'played': record.played,
+        'wins': record.wins,
+        'draws': record.draws,
+        'losses': record.losses,
+        'goals_for': record.goals_for,
+        'goals_against': record.goals_against,
+        'form': record.form[:last],
+        'form_goals_for': sum(entry['for'] for entry in recent),
+        'form_goals_against': sum(entry['against'] for entry in recent),
+        'results': recent,
+    }
@@ -0,0 +1,44 @@
+from django import template
+
+from arena_app import caching
+
+register = template.Library()
+
+
+class CachedFragmentNode(template.Node):
+    def __init__(self, nodelist, name, namespaces, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.namespaces = namespaces
+        self.vary_on = vary_on
+
+    def render(self, context):
+        namespaces = [namespace for namespace in self.namespaces.resolve(context).split(',') if namespace]
+        vary_on = ':'.join(str(value.resolve(context)) for value in self.vary_on)
+        key = f'fragment:{self.name}:{vary_on}'
+        return caching.get_or_build(key, namespaces, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def cachedfragment(parser, token):
+    """
+    Caches a template fragment until one of its namespaces is invalidated.
+
+    Usage::
+
+        {% load arena_cache %}
+        {% cachedfragment league_overall "leaderboard" page %}
+            ...
+        {% endcachedfragment %}
+
+    The first argument names the fragment, the second lists the namespaces
+    it depends on (comma separated) and the rest are the values the
+    fragment varies on.
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name and namespaces.")
+    nodelist = parser.parse(('endcachedfragment',))
+    parser.delete_first_token()
+    return CachedFragmentNode(nodelist, bits[1], parser.compile_filter(bits[2]),
+                              [parser.compile_filter(bit) for bit in bits[3:]])
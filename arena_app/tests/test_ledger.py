@@ -0,0 +1,106 @@
+import threading
+from unittest import skipIf
+
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+
+from arena_app import ledger
+from arena_app.models import PointsLedgerEntry, TipsterStats
+
+from . import utils
+
+
+def _stats(user):
+    return TipsterStats.objects.values_list('points_balance', 'total_bets_placed').get(user=user)
+
+
+def _stakes(user):
+    return list(PointsLedgerEntry.objects.filter(user=user, kind=PointsLedgerEntry.STAKE)
+                .order_by('pk').values_list('amount', flat=True))
+
+
+class StakeTests(TestCase):
+    """
+    Stakes are debited by a conditional UPDATE that cannot overdraw.
+    """
+
+    def setUp(self):
+        self.user = utils.tipster('staker', balance=100)
+
+    def test_stake_is_debited_and_recorded(self):
+        entry = ledger.stake(self.user.pk, 30)
+        self.assertEqual(_stats(self.user), (70, 1))
+        self.assertEqual((entry.kind, entry.amount), (PointsLedgerEntry.STAKE, -30))
+
+    def test_stake_larger_than_the_balance_is_refused(self):
+        with self.assertRaises(ledger.InsufficientPoints):
+            ledger.stake(self.user.pk, 101)
+        self.assertEqual(_stats(self.user), (100, 0))
+        self.assertEqual(_stakes(self.user), [])
+
+    def test_second_stake_cannot_overdraw(self):
+        ledger.stake(self.user.pk, 60)
+        with self.assertRaises(ledger.InsufficientPoints):
+            ledger.stake(self.user.pk, 60)
+        self.assertEqual(_stats(self.user), (40, 1))
+        self.assertEqual(_stakes(self.user), [-60])
+
+    def test_stake_creates_missing_stats(self):
+        TipsterStats.objects.filter(user=self.user).delete()
+        ledger.stake(self.user.pk, 10)
+        self.assertEqual(_stats(self.user), (ledger.DEFAULT_BALANCE - 10, 1))
+
+    def test_batch_takes_stakes_in_order_while_the_balance_covers_them(self):
+        other = utils.tipster('other', balance=20)
+        accepted = ledger.debit_batch([(self.user.pk, 60), (other.pk, 30), (self.user.pk, 50), (self.user.pk, 40)])
+        self.assertEqual(accepted, [True, False, False, True])
+        self.assertEqual(_stats(self.user), (0, 2))
+        self.assertEqual(_stats(other), (20, 0))
+
+    def test_batch_rereads_a_balance_spent_since_it_was_read(self):
+        # Another request stakes 50 between the batch's balance read and
+        # its conditional UPDATE
+        raced = []
+
+        def race(execute, sql, params, many, context):
+            result = execute(sql, params, many, context)
+            if not raced and sql.startswith('SELECT') and 'arena_app_tipsterstats' in sql:
+                raced.append(True)
+                ledger.stake(self.user.pk, 50)
+            return result
+
+        with connection.execute_wrapper(race):
+            accepted = ledger.debit_batch([(self.user.pk, 60), (self.user.pk, 30)])
+        self.assertEqual(accepted, [False, True])
+        self.assertEqual(_stats(self.user), (20, 2))
+
+
+@skipIf(connection.vendor == 'sqlite', 'In-memory SQLite test databases do not wait for concurrent writers')
+class ConcurrentStakeTests(TransactionTestCase):
+    """
+    Concurrent stakes on separate connections never overdraw a balance.
+    """
+
+    def test_concurrent_stakes_cannot_double_spend(self):
+        user = utils.tipster('racer', balance=100)
+        start = threading.Barrier(8)
+        outcomes = []
+
+        def place():
+            try:
+                start.wait()
+                ledger.stake(user.pk, 30)
+                outcomes.append(True)
+            except ledger.InsufficientPoints:
+                outcomes.append(False)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=place) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(outcomes.count(True), 3)
+        self.assertEqual(_stats(user), (10, 3))
+        self.assertEqual(_stakes(user), [-30, -30, -30])
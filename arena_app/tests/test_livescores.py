@@ -0,0 +1,62 @@
+from pathlib import Path
+
+from django.test import TestCase
+
+from arena_app import livescores
+from arena_app.models import LiveScore
+
+FEEDS = Path(__file__).resolve().parent / 'feeds'
+
+
+def _read(name):
+    with open(FEEDS / name, encoding='utf-8') as feed:
+        return livescores.read_feed(feed)
+
+
+def _scores():
+    return {values[:3]: values[3:] for values in
+            LiveScore.objects.values_list(*livescores.KEY_FIELDS, *livescores.SCORE_FIELDS)}
+
+
+class IngestTests(TestCase):
+    """
+    Recorded feed snapshots are upserted, writing only what changed.
+    """
+
+    def test_first_snapshot_inserts_every_match(self):
+        report = livescores.ingest(_read('livescores_kickoff.json'))
+        self.assertEqual(report[:4], (3, 0, 0, 0))
+        self.assertEqual(_scores()[('La Liga', 'Sevilla', 'Getafe')], (1, 0, '1H', "14'"))
+
+    def test_next_snapshot_writes_new_and_changed_matches(self):
+        livescores.ingest(_read('livescores_kickoff.json'))
+        stamped = dict(LiveScore.objects.values_list('home_team', 'timestamp'))
+
+        report = livescores.ingest(_read('livescores_update.ndjson'))
+        self.assertEqual(report[:4], (1, 1, 1, 6))
+        scores = _scores()
+        self.assertEqual(scores[('Premier League', 'Arsenal', 'Chelsea')], (1, 0, '1H', "27'"))
+        self.assertEqual(scores[('Serie A', 'Torino', 'Genoa')], (0, 0, 'NS', "0'"))
+        # The malformed records left the stored score alone
+        self.assertEqual(scores[('La Liga', 'Sevilla', 'Getafe')], (1, 0, '1H', "14'"))
+
+        timestamps = dict(LiveScore.objects.values_list('home_team', 'timestamp'))
+        self.assertGreater(timestamps['Arsenal'], stamped['Arsenal'])
+        self.assertEqual(timestamps['Everton'], stamped['Everton'])
+        self.assertEqual(timestamps['Sevilla'], stamped['Sevilla'])
+
+    def test_unchanged_snapshot_writes_nothing(self):
+        records = _read('livescores_kickoff.json')
+        livescores.ingest(records)
+        # Only the read of the stored scores
+        with self.assertNumQueries(1):
+            report = livescores.ingest(records)
+        self.assertEqual(report[:4], (0, 0, 3, 0))
+
+    def test_malformed_records_are_rejected(self):
+        record = {'league': 'L', 'home_team': 'H', 'away_team': 'A', 'home_score': 1, 'away_score': 0}
+        for bad in ({'home_score': -1}, {'home_score': 1.0}, {'away_score': True}, {'home_score': 'one'},
+                    {'home_team': None}, {'league': ['L']}, {'away_team': 'A' * 256}):
+            with self.subTest(bad=bad), self.assertRaises((TypeError, ValueError)):
+                livescores._normalize({**record, **bad})
+        self.assertEqual(livescores._normalize({**record, 'home_score': '2'})['home_score'], 2)
@@ -0,0 +1,112 @@
+import base64
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.test import TestCase
+from django.urls import reverse
+
+from arena_app import pagination
+from arena_app.models import Tip
+
+from . import utils
+
+START = datetime(2024, 3, 1, 12, 0, tzinfo=dt_timezone.utc)
+
+
+def _cursor(raw):
+    # A hand-made cursor, the way a client could tamper with one
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+class KeysetPageTests(TestCase):
+    """
+    keyset_page walks (created_at, id) newest first without skipping or
+    repeating rows, whatever the page boundaries land on.
+    """
+
+    def setUp(self):
+        self.user = utils.tipster('pager')
+        self.sport = utils.upcoming_fixture().sport
+
+    def _tips(self, *created_ats):
+        tips = []
+        for created_at in created_ats:
+            tip = Tip.objects.create(user=self.user, sport=self.sport, market='home', points_bet=10)
+            # created_at is auto_now_add, so it is set after the insert
+            Tip.objects.filter(pk=tip.pk).update(created_at=created_at)
+            tips.append(tip.pk)
+        return tips
+
+    def _walk(self, limit):
+        pages, cursor = [], None
+        while True:
+            rows, cursor = pagination.keyset_page(Tip.objects.all(), cursor, limit=limit)
+            pages.append([tip.pk for tip in rows])
+            if cursor is None:
+                return pages
+
+    def _expected(self):
+        return list(Tip.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+
+    def test_empty_queryset(self):
+        self.assertEqual(pagination.keyset_page(Tip.objects.all(), limit=3), ([], None))
+
+    def test_exactly_one_page_has_no_next_cursor(self):
+        self._tips(*(START + timedelta(minutes=n) for n in range(3)))
+        rows, cursor = pagination.keyset_page(Tip.objects.all(), limit=3)
+        self.assertEqual([tip.pk for tip in rows], self._expected())
+        self.assertIsNone(cursor)
+
+    def test_one_row_past_the_page_has_a_next_cursor(self):
+        self._tips(*(START + timedelta(minutes=n) for n in range(4)))
+        self.assertEqual(self._walk(3), [self._expected()[:3], self._expected()[3:]])
+
+    def test_cursor_of_the_last_row_gives_an_empty_page(self):
+        self._tips(START, START + timedelta(minutes=1))
+        oldest = Tip.objects.order_by('created_at', 'id').first()
+        cursor = pagination.encode_cursor(oldest.created_at, oldest.pk)
+        self.assertEqual(pagination.keyset_page(Tip.objects.all(), cursor, limit=3), ([], None))
+
+    def test_ties_on_created_at_across_page_boundaries(self):
+        # Five rows share a timestamp, so every boundary falls inside the tie
+        self._tips(START + timedelta(minutes=1), *[START] * 5, START - timedelta(minutes=1))
+        for limit in (1, 2, 3, 4):
+            with self.subTest(limit=limit):
+                pages = self._walk(limit)
+                self.assertEqual([pk for page in pages for pk in page], self._expected())
+                self.assertTrue(all(0 < len(page) <= limit for page in pages))
+
+
+class CursorTests(TestCase):
+    """
+    Cursors come back from clients, so anything encode_cursor could not
+    have produced is refused with ValueError and a 400 from the API.
+    """
+
+    TAMPERED = {
+        'not base64': '%%%',
+        'no separator': _cursor(b'2024-03-01T12:00:00+00:00'),
+        'extra part': _cursor(b'2024-03-01T12:00:00+00:00|5|6'),
+        'bad date': _cursor(b'2024-13-45T12:00:00+00:00|5'),
+        'bad id': _cursor(b'2024-03-01T12:00:00+00:00|five'),
+        'not utf-8': _cursor(b'\xff\xfe|5'),
+        'zero id': _cursor(b'2024-03-01T12:00:00+00:00|0'),
+        'negative id': _cursor(b'2024-03-01T12:00:00+00:00|-5'),
+        'id past 64 bits': _cursor(f'2024-03-01T12:00:00+00:00|{2 ** 70}'.encode()),
+    }
+
+    def test_round_trip(self):
+        cursor = pagination.encode_cursor(START, pagination.MAX_ID)
+        self.assertEqual(pagination.decode_cursor(cursor), (START, pagination.MAX_ID))
+
+    def test_tampered_cursors_are_refused(self):
+        for name, cursor in self.TAMPERED.items():
+            with self.subTest(name):
+                with self.assertRaises(ValueError):
+                    pagination.decode_cursor(cursor)
+
+    def test_api_answers_tampered_cursors_with_400(self):
+        for name, cursor in self.TAMPERED.items():
+            with self.subTest(name):
+                response = self.client.get(reverse('latest_tips_api'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {'error': 'Invalid cursor'})
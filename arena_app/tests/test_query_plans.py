@@ -0,0 +1,25 @@
+from django.test import TestCase
+
+from arena_app import query_plans
+
+
+class QueryPlanTests(TestCase):
+    """
+    The hot queries keep reading through an index on seeded data.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        query_plans.seed()
+
+    def test_hot_queries_use_an_index(self):
+        reports = query_plans.check()
+        self.assertEqual(len(reports), len(query_plans.HOT_QUERIES))
+        scans = {report.name: report.full_scans for report in reports if report.full_scans}
+        self.assertEqual(scans, {})
+
+    def test_full_scans_are_detected(self):
+        self.assertEqual(query_plans.full_scans('SCAN arena_app_tip', 'sqlite'), ['arena_app_tip'])
+        self.assertEqual(query_plans.full_scans('SCAN arena_app_tip USING INDEX tip_created_idx', 'sqlite'), [])
+        self.assertEqual(query_plans.full_scans('Seq Scan on arena_app_tip  (cost=0.00..1.01)', 'postgresql'),
+                         ['arena_app_tip'])
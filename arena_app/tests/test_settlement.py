@@ -0,0 +1,87 @@
+from decimal import Decimal
+
+from django.db.models import Sum
+from django.test import TestCase
+
+from arena_app import ledger, settlement
+from arena_app.models import PointsLedgerEntry, Result, Tip, TipsterStats
+
+from . import utils
+
+
+class SettlementTests(TestCase):
+    """
+    Settling and regrading a result keeps the balances, the ledger, the
+    boards and the rollups in step with the tips.
+    """
+
+    def setUp(self):
+        self.fixture = utils.upcoming_fixture()
+        self.alice = utils.tipster('alice')
+        self.bob = utils.tipster('bob')
+        # 2-1 wins home and over 2.5; 0-0 wins draw and under 2.5
+        self.home = self._place(self.alice, 'home', 75, '3.28')
+        self.over = self._place(self.alice, 'over_2_5', 40, '1.90')
+        self.draw = self._place(self.bob, 'draw', 50, '3.40')
+        self.under = self._place(self.bob, 'under_2_5', 20, '2.05')
+
+    def _place(self, user, market, points_bet, odds):
+        with self.captureOnCommitCallbacks(execute=True):
+            tip = Tip.objects.create(user=user, sport=self.fixture.sport, fixture=self.fixture, market=market,
+                                     odds=Decimal(odds), points_bet=points_bet)
+            ledger.stake(user.pk, points_bet, tip=tip)
+        return tip
+
+    def _grades(self):
+        return dict(Tip.objects.values_list('market', 'is_win'))
+
+    def _balance(self, user):
+        return TipsterStats.objects.get(user=user).points_balance
+
+    def assertConsistent(self):
+        for user in (self.alice, self.bob):
+            entries = PointsLedgerEntry.objects.filter(user=user).aggregate(total=Sum('amount'))['total']
+            self.assertEqual(self._balance(user), 1000 + entries)
+        self.assertEqual(utils.boards(), utils.rebuilt_boards())
+        self.assertEqual(utils.buckets(), utils.rebuilt_buckets())
+
+    def test_result_settles_and_pays_the_winners(self):
+        Result.objects.create(fixture=self.fixture, team_home_score=2, team_away_score=1)
+        self.assertEqual(self._grades(), {'home': True, 'over_2_5': True, 'draw': False, 'under_2_5': False})
+        # floor(75 * 3.28) is 246, which a float product would floor to 245
+        self.assertEqual(self._balance(self.alice), 1000 - 75 - 40 + 246 + 76)
+        self.assertEqual(self._balance(self.bob), 1000 - 50 - 20)
+        self.assertEqual(TipsterStats.objects.get(user=self.alice).total_wins, 2)
+        self.assertConsistent()
+
+    def test_settling_again_changes_nothing(self):
+        Result.objects.create(fixture=self.fixture, team_home_score=2, team_away_score=1)
+        entries = PointsLedgerEntry.objects.count()
+        self.assertEqual(settlement.settle_fixtures([self.fixture.pk]), 0)
+        self.assertEqual(PointsLedgerEntry.objects.count(), entries)
+        self.assertEqual(self._balance(self.alice), 1000 - 75 - 40 + 246 + 76)
+        self.assertConsistent()
+
+    def test_corrected_result_regrades_the_settled_tips(self):
+        result = Result.objects.create(fixture=self.fixture, team_home_score=2, team_away_score=1)
+        result.team_home_score, result.team_away_score = 0, 0
+        result.save()
+
+        self.assertEqual(self._grades(), {'home': False, 'over_2_5': False, 'draw': True, 'under_2_5': True})
+        self.assertEqual(self._balance(self.alice), 1000 - 75 - 40)
+        self.assertEqual(self._balance(self.bob), 1000 - 50 - 20 + 170 + 41)
+        self.assertEqual(
+            sorted(PointsLedgerEntry.objects.filter(kind=PointsLedgerEntry.REVERSAL).values_list('tip_id', 'amount')),
+            sorted([(self.home.pk, -246), (self.over.pk, -76)]),
+        )
+        self.assertEqual([TipsterStats.objects.get(user=user).total_wins for user in (self.alice, self.bob)], [0, 2])
+        self.assertConsistent()
+
+    def test_correction_with_the_same_grades_changes_nothing(self):
+        result = Result.objects.create(fixture=self.fixture, team_home_score=2, team_away_score=1)
+        entries = PointsLedgerEntry.objects.count()
+        result.team_home_score = 3
+        result.save()
+        self.assertEqual(self._grades(), {'home': True, 'over_2_5': True, 'draw': False, 'under_2_5': False})
+        self.assertEqual(PointsLedgerEntry.objects.count(), entries)
+        self.assertConsistent()
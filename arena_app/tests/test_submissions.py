@@ -0,0 +1,143 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from arena_app import submissions
+from arena_app.models import DailyTipStats, LeaderboardEntry, PointsLedgerEntry, Result, Tip, TipsterStats, TipSubmission
+
+from . import utils
+
+
+@override_settings(TIP_SUBMISSIONS='direct')
+class DirectSubmissionTests(TestCase):
+    """
+    A direct submission is one short write; the boards, rollups and
+    timelines follow once it commits, without a worker.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = utils.tipster('direct')
+        self.fixture = utils.upcoming_fixture()
+        self.client.force_login(self.user)
+        self.data = {'sport': 'Football', 'fixture': self.fixture.pk, 'market': 'home',
+                     'bet_description': 'Home win', 'odds_given': '2.50', 'points_bet': '10'}
+
+    def _post(self):
+        # Returns the on-commit callbacks of the submission, not yet run
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.client.post(reverse('submit_tips'), self.data)
+        return callbacks
+
+    def test_post_queries(self):
+        # Warms the session, user and sport caches the page reads
+        self.client.get(reverse('submit_tips'))
+        # The fixture choice, then one transaction: the tip, the tipster's
+        # board entries, the stake (savepoint, debit, ledger entry)
+        with self.captureOnCommitCallbacks() as callbacks:
+            with self.assertNumQueries(10):
+                response = self.client.post(reverse('submit_tips'), self.data)
+        self.assertRedirects(response, reverse('submission_success'), fetch_redirect_response=False)
+        # Once committed, each in its own short write: the boards, the day's
+        # rollup bucket (created, as it is the tipster's first tip today),
+        # the fan-out's follower count and the balance on the boards
+        with self.assertNumQueries(15):
+            for callback in callbacks:
+                callback()
+
+    def test_upkeep_follows_the_commit(self):
+        for callback in self._post():
+            callback()
+        overall = LeaderboardEntry.objects.get(user=self.user, sport=None)
+        self.assertEqual((overall.bets, overall.points_balance), (1, 990))
+        self.assertEqual(DailyTipStats.objects.get(user=self.user).bets, 1)
+        self.assertFalse(TipSubmission.objects.exists())
+        self.assertEqual(utils.boards(), utils.rebuilt_boards())
+
+    def test_settled_before_the_upkeep_matches_a_rebuild(self):
+        callbacks = self._post()
+        Result.objects.create(fixture=self.fixture, team_home_score=2, team_away_score=0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.user, sport=self.fixture.sport).wins, 1)
+        self.assertEqual(utils.boards(), utils.rebuilt_boards())
+        self.assertEqual(utils.buckets(), utils.rebuilt_buckets())
+
+    def test_deleted_before_the_upkeep_matches_a_rebuild(self):
+        callbacks = self._post()
+        Tip.objects.get(user=self.user).delete()
+        for callback in callbacks:
+            callback()
+        self.assertEqual(utils.boards(), utils.rebuilt_boards())
+        self.assertEqual(utils.buckets(), utils.rebuilt_buckets())
+
+
+@override_settings(TIP_SUBMISSIONS='queue')
+class QueuedSubmissionTests(TestCase):
+    """
+    Queued submissions are checked on the way in and placed by the worker.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.user = utils.tipster('queued', balance=15)
+        self.fixture = utils.upcoming_fixture()
+        self.client.force_login(self.user)
+        self.data = {'sport': 'Football', 'fixture': self.fixture.pk, 'market': 'home',
+                     'bet_description': 'Home win', 'odds_given': '2.50', 'points_bet': '10'}
+
+    def _tip(self, user, points_bet):
+        return Tip(user=user, sport=self.fixture.sport, fixture=self.fixture, market='home',
+                   odds='2.50', points_bet=points_bet)
+
+    def test_full_queue_is_refused(self):
+        with mock.patch.object(submissions, 'MAX_PENDING', 1):
+            submissions.enqueue(self._tip(self.user, 5))
+            with self.assertRaises(submissions.QueueFull):
+                submissions.enqueue(self._tip(self.user, 5))
+            response = self.client.post(reverse('submit_tips'), self.data)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], str(submissions.RETRY_AFTER))
+        self.assertEqual(TipSubmission.objects.count(), 1)
+
+    def test_low_balance_is_refused(self):
+        response = self.client.post(reverse('submit_tips'), {**self.data, 'points_bet': '20'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('points_bet', response.context['form'].errors)
+        self.assertFalse(TipSubmission.objects.exists())
+
+    def test_batch_rejects_the_stakes_the_balance_does_not_cover(self):
+        other = utils.tipster('other', balance=100)
+        first = submissions.enqueue(self._tip(self.user, 10))
+        second = submissions.enqueue(self._tip(self.user, 10))
+        third = submissions.enqueue(self._tip(other, 10))
+
+        self.assertEqual(submissions.process_batch(), (2, 1))
+        first.refresh_from_db()
+        second.refresh_from_db()
+        third.refresh_from_db()
+        self.assertEqual([first.status, second.status, third.status],
+                         [TipSubmission.ACCEPTED, TipSubmission.REJECTED, TipSubmission.ACCEPTED])
+        self.assertIsNone(second.tip_id)
+        self.assertTrue(second.error)
+        self.assertEqual(set(Tip.objects.values_list('pk', flat=True)), {first.tip_id, third.tip_id})
+        self.assertEqual(TipsterStats.objects.get(user=self.user).points_balance, 5)
+        self.assertEqual(TipsterStats.objects.get(user=other).points_balance, 90)
+        self.assertEqual(PointsLedgerEntry.objects.filter(kind=PointsLedgerEntry.STAKE).count(), 2)
+        self.assertFalse(submissions.unprocessed().exists())
+
+    @override_settings(TIP_SUBMISSIONS='inline')
+    def test_inline_round_trip(self):
+        response = self.client.post(reverse('submit_tips'), self.data)
+        submission = TipSubmission.objects.get(user=self.user)
+        self.assertRedirects(response, f"{reverse('submission_success')}?submission={submission.pk}",
+                             fetch_redirect_response=False)
+
+        status = self.client.get(reverse('tip_submission_status', args=[submission.pk])).json()
+        self.assertEqual(status['status'], TipSubmission.ACCEPTED)
+        tip = Tip.objects.get(pk=status['tip'])
+        self.assertEqual((tip.user_id, tip.fixture_id, tip.points_bet), (self.user.pk, self.fixture.pk, 10))
+        self.assertEqual(TipsterStats.objects.get(user=self.user).points_balance, 5)
+        self.assertEqual(LeaderboardEntry.objects.get(user=self.user, sport=None).bets, 1)
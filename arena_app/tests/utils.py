@@ -0,0 +1,48 @@
+"""
+Shared data builders and checks for the arena_app tests.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+from arena_app import leaderboard, rollups
+from arena_app.models import DailyTipStats, Fixture, LeaderboardEntry, Sport, Team, TipsterStats, UserProfile
+
+
+def tipster(username, balance=1000):
+    user = UserProfile.objects.create_user(f'{username}@example.com', username, username.title(), 'secret-pass')
+    TipsterStats.objects.filter(user=user).update(points_balance=balance)
+    return user
+
+
+def boards():
+    # Board entries that count something; a rebuild drops empty sport entries
+    return {
+        (row[0], row[1]): row[2:]
+        for row in LeaderboardEntry.objects.values_list('user_id', 'sport_id', 'bets', 'wins', 'odds_total',
+                                                         'odds_count', 'points_balance')
+        if row[1] is None or row[2]
+    }
+
+
+def rebuilt_boards():
+    leaderboard.rebuild()
+    return boards()
+
+
+def buckets():
+    fields = ('user_id', 'sport_id', 'day') + rollups.TOTALS
+    return {row[:3]: row[3:] for row in DailyTipStats.objects.filter(bets__gt=0).values_list(*fields)}
+
+
+def rebuilt_buckets():
+    rollups.rebuild()
+    return buckets()
+
+
+def upcoming_fixture(sport_name='Football'):
+    sport = Sport.objects.get_or_create(name=sport_name)[0]
+    home = Team.objects.create(name=f'{sport_name} Home', sport=sport)
+    away = Team.objects.create(name=f'{sport_name} Away', sport=sport)
+    return Fixture.objects.create(sport=sport, team_home=home, team_away=away,
+                                  date_time=timezone.now() + timedelta(days=1))
@@ -0,0 +1,240 @@
+# timeline.py
+"""
+Follower timelines ("tips from people I follow").
+
+A Follower row means ``follower`` follows ``user``. When a tip is created
+its id is pushed into a bounded inbox (TimelineEntry rows) of every
+follower of its tipster, so reading a timeline is one indexed range read on
+(owner, created_at) however many people the reader follows. Each push
+trims a random TRIM_SAMPLE_RATE of the inboxes it wrote to back to
+TIMELINE_SIZE entries, so an inbox runs a few pushes over size at most
+while a tip to a thousand followers trims a few dozen inboxes, not all of
+them; the trim_timelines command bounds the rest periodically. Tip signals
+fan out once the tip's transaction commits, so a slow fan-out never holds
+the tip's locks or fails its save.
+
+Tipsters with more than FANOUT_LIMIT followers are not fanned out on
+write; their recent tips are merged in when a timeline is read instead.
+Follower and following counts are kept denormalized on UserProfile.
+"""
+import random
+
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
+
+from . import reference
+from .models import Follower, Tip, TimelineEntry, UserProfile
+from .pagination import decode_cursor, encode_cursor
+
+FANOUT_LIMIT = 1000
+TIMELINE_SIZE = 500
+BACKFILL_SIZE = 50
+BATCH_SIZE = 1000
+# Inboxes trimmed per query
+TRIM_BATCH_SIZE = 100
+# Share of the inboxes written to that a push trims
+TRIM_SAMPLE_RATE = 0.05
+
+
+def _trim_sample(owner_ids):
+    sample = [owner_id for owner_id in owner_ids if random.random() < TRIM_SAMPLE_RATE]
+    return trim(sample) if sample else 0
+
+
+def _push(tips, owner_ids):
+    entries = [TimelineEntry(owner_id=owner_id, tip_id=tip_id, created_at=created_at)
+               for owner_id in owner_ids for tip_id, created_at in tips]
+    TimelineEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    _trim_sample(owner_ids)
+    return len(entries)
+
+
+def fan_out(tip):
+    """
+    Pushes a new tip into the inboxes of its tipster's followers, unless the
+    tipster is popular enough to be read on demand.
+
+    Args:
+        tip (Tip): The tip that was created.
+
+    Returns:
+        int: The number of inboxes written to.
+    """
+    followers_count = UserProfile.objects.filter(pk=tip.user_id).values_list('followers_count', flat=True).first()
+    if not followers_count or followers_count > FANOUT_LIMIT:
+        return 0
+    follower_ids = list(Follower.objects.filter(user_id=tip.user_id).values_list('follower_id', flat=True))
+    return _push([(tip.pk, tip.created_at)], follower_ids)
+
+
+def fan_out_on_commit(tip):
+    """
+    Schedules fan_out() for when the current transaction commits. A failed
+    fan-out is logged rather than raised to the code that saved the tip.
+    """
+    transaction.on_commit(lambda: fan_out(tip), robust=True)
+
+
+def fan_out_many(tips):
+    """
+    Pushes a batch of new tips into their tipsters' followers' inboxes,
+    like fan_out() with one read of the counts and followers per batch.
+
+    Args:
+        tips (list): The tips that were created.
+
+    Returns:
+        int: The number of timeline entries written.
+    """
+    by_user = {}
+    for tip in tips:
+        by_user.setdefault(tip.user_id, []).append((tip.pk, tip.created_at))
+    counts = UserProfile.objects.filter(pk__in=by_user).values_list('pk', 'followers_count')
+    fanned = [user_id for user_id, followers_count in counts if 0 < followers_count <= FANOUT_LIMIT]
+    followers = {}
+    for user_id, follower_id in Follower.objects.filter(user_id__in=fanned).values_list('user_id', 'follower_id'):
+        followers.setdefault(user_id, []).append(follower_id)
+    entries = [TimelineEntry(owner_id=owner_id, tip_id=tip_id, created_at=created_at)
+               for user_id, owner_ids in followers.items() for owner_id in owner_ids
+               for tip_id, created_at in by_user[user_id]]
+    TimelineEntry.objects.bulk_create(entries, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    _trim_sample({entry.owner_id for entry in entries})
+    return len(entries)
+
+
+def followed(follower_id, user_id):
+    """
+    Updates the follow counts and backfills the new follower's inbox with
+    the tipster's recent tips.
+    """
+    with transaction.atomic():
+        UserProfile.objects.filter(pk=user_id).update(followers_count=F('followers_count') + 1)
+        UserProfile.objects.filter(pk=follower_id).update(following_count=F('following_count') + 1)
+        recent = Tip.objects.filter(user_id=user_id).order_by('-created_at', '-id')[:BACKFILL_SIZE]
+        _push(recent.values_list('id', 'created_at'), [follower_id])
+
+
+def unfollowed(follower_id, user_id):
+    """
+    Updates the follow counts and removes the tipster's tips from the former
+    follower's inbox.
+    """
+    with transaction.atomic():
+        UserProfile.objects.filter(pk=user_id).update(followers_count=F('followers_count') - 1)
+        UserProfile.objects.filter(pk=follower_id).update(following_count=F('following_count') - 1)
+        TimelineEntry.objects.filter(owner_id=follower_id, tip__user_id=user_id).delete()
+
+
+def follow(follower, user):
+    """
+    Makes ``follower`` follow ``user``.
+
+    Returns:
+        bool: True if a new follow was created.
+    """
+    if follower.pk == user.pk:
+        return False
+    _, created = Follower.objects.get_or_create(user=user, follower=follower)
+    return created
+
+
+def unfollow(follower, user):
+    """
+    Makes ``follower`` stop following ``user``.
+
+    Returns:
+        bool: True if a follow was removed.
+    """
+    removed = 0
+    for follow_row in Follower.objects.filter(user=user, follower=follower):
+        follow_row.delete()
+        removed += 1
+    return bool(removed)
+
+
+def _before(cursor, tip_field):
+    created_at, tip_id = decode_cursor(cursor)
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, **{f'{tip_field}__lt': tip_id})
+
+
+def timeline_page(user, cursor=None, limit=20):
+    """
+    Returns one page of a user's timeline, newest first.
+
+    Args:
+        user (UserProfile): The reader.
+        cursor (str, optional): The cursor of the previous page's last tip.
+        limit (int, optional): The number of tips per page.
+
+    Returns:
+        tuple: The tips of the page and the cursor of the next page, or None
+        when this is the last page.
+
+    Raises:
+        ValueError: If the cursor is malformed.
+    """
+    entries = TimelineEntry.objects.filter(owner=user).select_related('tip__user')
+    if cursor:
+        entries = entries.filter(_before(cursor, 'tip_id'))
+    tips = [entry.tip for entry in entries.order_by('-created_at', '-tip_id')[:limit + 1]]
+
+    popular = Follower.objects.filter(follower=user, user__followers_count__gt=FANOUT_LIMIT).values('user_id')
+    pulled = Tip.objects.filter(user_id__in=Subquery(popular)).select_related('user')
+    if cursor:
+        pulled = pulled.filter(_before(cursor, 'id'))
+    tips.extend(pulled.order_by('-created_at', '-id')[:limit + 1])
+
+    # A tipster who just became popular can appear in both sources
+    tips = sorted({tip.pk: tip for tip in tips}.values(), key=lambda tip: (tip.created_at, tip.pk), reverse=True)
+    next_cursor = None
+    if len(tips) > limit:
+        tips = tips[:limit]
+        next_cursor = encode_cursor(tips[-1].created_at, tips[-1].pk)
+    return reference.attach(tips, 'sport'), next_cursor
+
+
+def trim(owner_ids=None, size=TIMELINE_SIZE):
+    """
+    Bounds inboxes to their newest ``size`` entries, numbering the entries
+    of a batch of inboxes in one windowed read and deleting the surplus by
+    primary key.
+
+    Args:
+        owner_ids (iterable, optional): The inboxes to trim. Defaults to
+        every inbox holding more than ``size`` entries.
+        size (int, optional): The number of entries kept per inbox.
+
+    Returns:
+        int: The number of entries deleted.
+    """
+    if owner_ids is None:
+        owner_ids = (TimelineEntry.objects.values('owner_id').annotate(entries=Count('id'))
+                     .filter(entries__gt=size).values_list('owner_id', flat=True))
+    owner_ids = list(owner_ids)
+    deleted = 0
+    for start in range(0, len(owner_ids), TRIM_BATCH_SIZE):
+        stale = list(
+            TimelineEntry.objects.filter(owner_id__in=owner_ids[start:start + TRIM_BATCH_SIZE])
+            .annotate(position=Window(RowNumber(), partition_by=[F('owner_id')],
+                                      order_by=[F('created_at').desc(), F('tip_id').desc()]))
+            .filter(position__gt=size).values_list('pk', flat=True)
+        )
+        if stale:
+            deleted += TimelineEntry.objects.filter(pk__in=stale).delete()[0]
+    return deleted
+
+
+def rebuild_counts():
+    """
+    Recomputes every user's denormalized follower and following counts.
+
+    Returns:
+        int: The number of users updated.
+    """
+    followers = Follower.objects.filter(user_id=OuterRef('pk')).order_by().values('user_id')
+    following = Follower.objects.filter(follower_id=OuterRef('pk')).order_by().values('follower_id')
+    return UserProfile.objects.update(
+        followers_count=Coalesce(Subquery(followers.annotate(total=Count('id')).values('total')), 0),
+        following_count=Coalesce(Subquery(following.annotate(total=Count('id')).values('total')), 0),
+    )
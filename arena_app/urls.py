@@ -14,10 +14,21 @@ urlpatterns = [
     path('golf/', views.golf, name='golf'),
     path('tipster_league_table/', views.tipster_league_table, name='tipster_league_table'),
     path('latest_tips/', views.latest_tips, name='latest_tips'),
+    path('api/latest-tips/', views.latest_tips_api, name='latest_tips_api'),
+    path('api/best-tipsters/', views.best_tipsters_api, name='best_tipsters_api'),
+    path('api/tipsters/<str:username>/performance/', views.tipster_performance_api, name='tipster_performance_api'),
+    path('api/fixtures/calendar/', views.fixture_calendar_api, name='fixture_calendar_api'),
+    path('api/fixtures/<int:pk>/odds/', views.fixture_odds_api, name='fixture_odds_api'),
+    path('api/fixtures/<int:pk>/form/', views.fixture_form_api, name='fixture_form_api'),
+    path('api/odds/movers/', views.odds_movers_api, name='odds_movers_api'),
+    path('following-tips/', views.following_tips, name='following_tips'),
+    path('tipsters/<str:username>/', views.tipster_profile, name='tipster_profile'),
+    path('tipsters/<str:username>/follow/', views.follow_tipster, name='follow_tipster'),
     path('blog/', views.blog, name='blog'),
     path('create-blog/', views.create_blog, name='create_blog'),
     path('blogs/<int:pk>/', views.blog_post_detail, name='blog_post_detail'),
     path('latest-sports-blogs/', views.latest_sports_blogs, name='latest_sports_blogs'),
+    path('blog-posts/', views.blog_posts, name='blog_posts'),
     path('general_chat/', views.general_chat, name='general_chat'),
     path('in_play/', views.in_play, name='in_play'),
     path('about/', views.about, name='about'),
@@ -28,8 +39,11 @@ urlpatterns = [
     path('terms_of_service/', views.terms_of_service, name='terms_of_service'),
     path('contact/', views.contact, name='contact'),
     path('admin/', admin.site.urls),
+    path('admin-tools/sql-summary/', views.sql_summary, name='sql_summary'),
+    path('admin-tools/export/<str:name>/', views.export_data, name='export_data'),
     path('submit-tips/', views.submit_tips, name='submit_tips'),
     path('submission-success/', views.submission_success, name='submission_success'),
+    path('api/tip-submissions/<int:pk>/', views.tip_submission_status, name='tip_submission_status'),
     path('football-fixtures/', views.football_fixtures, name='football_fixtures'),
     path('racing-fixtures/', views.racing_fixtures, name='racing_fixtures'),
     path('tennis-fixtures/', views.tennis_fixtures, name='tennis_fixtures'),
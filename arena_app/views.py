@@ -1,11 +1,30 @@
+from datetime import date
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Count, Sum, Case, When, IntegerField
+from django.contrib.admin.views.decorators import staff_member_required
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.dateparse import parse_datetime
 from .forms import UserLoginForm, UserRegistrationForm
 from .forms import BettingTipForm, BlogPostForm
-from .models import UserProfile, TipsterStats, Sport, Tip, BlogPost, LiveScore
+from .models import UserProfile, TipsterStats, Sport, Tip, BlogPost, LiveScore, Follower, TipSubmission, Fixture
+from . import (caching, exports, fixture_calendar, instrumentation, leaderboard, ledger, odds, reference, rollups,
+               submissions, teamform, timeline)
+from .caching import cached_page
+from .pagination import keyset_page
+
+STATIC_PAGE_TIMEOUT = 60 * 60
+DATA_PAGE_TIMEOUT = 60
 
 
 # Create your views here.
@@ -20,83 +39,337 @@ def home(request):
     return render(request, 'home.html')
 
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def about(request):
     return render(request, 'about.html')
 
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def football(request):
     return render(request, 'football.html')
 
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def horse_racing(request):
     return render(request, 'horse_racing.html')
 
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def tennis(request):
     return render(request, 'tennis.html')
 
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def golf(request):
     return render(request, 'golf.html')
 
 
-def tipster_league_table(request):
-    # Query to get top tipsters for each category
-    overall_tipsters = UserProfile.objects.annotate(
-        total_bets=Count('tips'),
-        total_wins_count=Sum(Case(When(tips__is_win=True, then=1), default=0,
-                             output_field=IntegerField())),
-    ).order_by('-points_balance')[:100]
-
-    football_tipsters = UserProfile.objects.filter(
-        tips__sport__name="Football"
-    ).annotate(
-        total_bets=Count('tips'),
-        total_wins_count=Sum(Case(When(tips__is_win=True, then=1), default=0,
-                             output_field=IntegerField())),
-    ).order_by('-points_balance')[:100]
-
-    # Similar queries for other sports
-    racing_tipsters = UserProfile.objects.filter(
-        tips__sport__name="Horse Racing"
-    ).annotate(
-        total_bets=Count('tips'),
-        total_wins_count=Sum(Case(When(tips__is_win=True, then=1), default=0,
-                             output_field=IntegerField())),
-    ).order_by('-points_balance')[:100]
-
-    tennis_tipsters = UserProfile.objects.filter(
-        tips__sport__name="Tennis"
-    ).annotate(
-        total_bets=Count('tips'),
-        total_wins_count=Sum(Case(When(tips__is_win=True, then=1), default=0,
-                             output_field=IntegerField())),
-    ).order_by('-points_balance')[:100]
-
-    golf_tipsters = UserProfile.objects.filter(
-        tips__sport__name="Golf"
-    ).annotate(
-        total_bets=Count('tips'),
-        total_wins_count=Sum(Case(When(tips__is_win=True, then=1), default=0,
-                             output_field=IntegerField())),
-    ).order_by('-points_balance')[:100]
+# Tabs of the league table: (query parameter, sport name)
+LEAGUE_BOARDS = [('overall', None), ('football', 'Football'), ('racing', 'Horse Racing'), ('tennis', 'Tennis'),
+                 ('golf', 'Golf')]
 
+
+def tipster_league_table(request):
+    # Each tab pages its board by keyset, ?<board>=<cursor>&tab=<board>;
+    # a board is only read when its cached fragment is missing
+    boards = {}
+    for name, sport in LEAGUE_BOARDS:
+        cursor = request.GET.get(name) or None
+        if cursor:
+            try:
+                leaderboard.decode_cursor(cursor)
+            except ValueError:
+                cursor = None
+        boards[name] = {'name': name, 'cursor': cursor, 'load': partial(leaderboard.board_page, sport, cursor)}
+    tab = request.GET.get('tab')
     context = {
-        'overall_tipsters': overall_tipsters,
-        'football_tipsters': football_tipsters,
-        'racing_tipsters': racing_tipsters,
-        'tennis_tipsters': tennis_tipsters,
-        'golf_tipsters': golf_tipsters,
+        'boards': boards,
+        'tab': tab if tab in boards else 'overall',
     }
     return render(request, 'tipster-league-table.html', context)
 
 
+LATEST_TIPS_PAGE_SIZE = 20
+LATEST_TIPS_API_MAX_LIMIT = 100
+BEST_TIPSTERS_LIMIT = 20
+ODDS_MOVERS_MAX_LIMIT = 100
+CALENDAR_TIMEOUT = 60 * 60
+SETTLED_MAX_AGE = 60 * 60 * 24
+
+
+def _latest_tips_queryset(request):
+    # Tips with the users the feed renders, filtered by ?sport= and ?user=;
+    # sports come from the reference cache
+    tips = Tip.objects.select_related('user')
+    sport = request.GET.get('sport')
+    if sport:
+        sport = reference.sport_by_name(sport)
+        tips = tips.filter(sport=sport) if sport else tips.none()
+    username = request.GET.get('user')
+    if username:
+        tips = tips.filter(user__username=username)
+    return tips
+
+
+@cached_page(('tips',), timeout=DATA_PAGE_TIMEOUT)
 def latest_tips(request):
-    # Fetch the latest tips, you can adjust the number of tips and ordering as needed
-    latest_tips = Tip.objects.all().order_by('-created_at')[:100]  # Adjust as needed
-    return render(request, 'latest-tips.html', {'latest_tips': latest_tips})
+    # Newest tips first, paged by a (created_at, id) cursor
+    try:
+        tips, next_cursor = keyset_page(_latest_tips_queryset(request), request.GET.get('cursor'),
+                                        limit=LATEST_TIPS_PAGE_SIZE)
+    except ValueError:
+        tips, next_cursor = keyset_page(_latest_tips_queryset(request), limit=LATEST_TIPS_PAGE_SIZE)
+    reference.attach(tips, 'sport')
+
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
+    return render(request, 'latest-tips.html', {'latest_tips': tips, 'next_query': next_query})
+
+
+def latest_tips_api(request):
+    # Compact JSON version of the latest tips feed for the mobile clients
+    try:
+        limit = min(max(int(request.GET.get('limit', LATEST_TIPS_PAGE_SIZE)), 1), LATEST_TIPS_API_MAX_LIMIT)
+        tips, next_cursor = keyset_page(_latest_tips_queryset(request), request.GET.get('cursor'), limit=limit)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    reference.attach(tips, 'sport')
+
+    results = [
+        {
+            'id': tip.pk,
+            'user': tip.user.username,
+            'sport': tip.sport.name if tip.sport else None,
+            'bet_type': tip.bet_type,
+            'market': tip.market,
+            'odds': str(tip.odds) if tip.odds is not None else None,
+            'points_bet': tip.points_bet,
+            'is_win': tip.is_win,
+            'created_at': tip.created_at.isoformat(),
+        }
+        for tip in tips
+    ]
+    return JsonResponse({'results': results, 'next_cursor': next_cursor})
+
+
+def _rollup_window(request):
+    # ?window=week|month|season, or an explicit ?start=&end= in ISO dates
+    if 'start' in request.GET:
+        start = date.fromisoformat(request.GET['start'])
+        end = date.fromisoformat(request.GET.get('end') or timezone.localdate().isoformat())
+        rollups.check_range(start, end)
+        return start, end
+    return rollups.window_bounds(request.GET.get('window', 'week'))
+
+
+@cached_page(('tips',), timeout=DATA_PAGE_TIMEOUT)
+def best_tipsters_api(request):
+    # Tipsters ranked by profit over a window, summed from the daily rollups
+    try:
+        start, end = _rollup_window(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    results = rollups.window_totals(start, end, sport=request.GET.get('sport') or None, limit=BEST_TIPSTERS_LIMIT)
+    return JsonResponse({
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'results': [
+            {
+                'user': row['user__username'],
+                'bets': row['bets'],
+                'settled': row['settled'],
+                'wins': row['wins'],
+                'staked': row['staked'],
+                'profit': row['profit'],
+                'strike_rate': row['strike_rate'],
+            }
+            for row in results
+        ],
+    })
+
+
+@cached_page(('tips',), timeout=DATA_PAGE_TIMEOUT)
+def tipster_performance_api(request, username):
+    # Per-day profit curve of a tipster for charts, one rollup query
+    tipster = get_object_or_404(UserProfile, username=username)
+    try:
+        start, end = _rollup_window(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    series = rollups.daily_series(tipster, start, end, sport=request.GET.get('sport') or None)
+    return JsonResponse({'user': tipster.username, 'start': start.isoformat(), 'end': end.isoformat(),
+                         'days': series})
+
+
+def _odds_json(price):
+    if price is None:
+        return None
+    return {'recorded_at': price.recorded_at.isoformat(), 'home': price.home, 'away': price.away,
+            'draw': price.draw}
+
+
+@cached_page(('odds',), timeout=DATA_PAGE_TIMEOUT)
+def fixture_odds_api(request, pk):
+    # Opening and current price of a fixture, and its price at ?at= (ISO datetime)
+    opening, current = odds.opening_and_current(pk)
+    if opening is None:
+        raise Http404('No odds for this fixture')
+    data = {'fixture': pk, 'opening': _odds_json(opening), 'current': _odds_json(current)}
+    if request.GET.get('at'):
+        moment = parse_datetime(request.GET['at'])
+        if moment is None:
+            return JsonResponse({'error': 'at must be an ISO datetime.'}, status=400)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        data['at'] = _odds_json(odds.price_at(pk, moment))
+    return JsonResponse(data)
+
+
+@cached_page(('odds',), timeout=DATA_PAGE_TIMEOUT)
+def odds_movers_api(request):
+    # Biggest drifters (or ?direction=steamers) of today or ?day=
+    try:
+        day = date.fromisoformat(request.GET['day']) if request.GET.get('day') else None
+        limit = min(max(int(request.GET.get('limit', odds.MOVERS_LIMIT)), 1), ODDS_MOVERS_MAX_LIMIT)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    steamers = request.GET.get('direction') == 'steamers'
+    moves = odds.movers(day, limit=limit, steamers=steamers)
+    return JsonResponse({
+        'day': (day or timezone.localdate()).isoformat(),
+        'direction': 'steamers' if steamers else 'drifters',
+        'results': [move._asdict() for move in moves],
+    })
+
+
+@cached_page(('form',), timeout=DATA_PAGE_TIMEOUT)
+def fixture_form_api(request, pk):
+    # Form of both teams over their ?last= results and their head-to-head
+    fixture = get_object_or_404(Fixture, pk=pk)
+    try:
+        last = min(max(int(request.GET.get('last', teamform.RECENT_RESULTS)), 1), teamform.RECENT_RESULTS)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    form = teamform.for_fixture(fixture)
+    return JsonResponse({
+        'fixture': fixture.pk,
+        'home': teamform.summary(form.home, last),
+        'away': teamform.summary(form.away, last),
+        'head_to_head': teamform.summary(form.head_to_head, last),
+    })
+
+
+def _calendar_window(request):
+    # Sport ids and days of ?sport= (every sport by default), ?start= and ?window=day|week
+    name = request.GET.get('sport')
+    if name:
+        sport = reference.sport_by_name(name)
+        if sport is None:
+            raise ValueError(f'Unknown sport {name!r}.')
+        sport_ids = [sport.pk]
+    else:
+        sport_ids = [sport.pk for sport in reference.sports()]
+    start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else None
+    return (sport_ids, *fixture_calendar.bounds(start, request.GET.get('window', 'day')))
+
+
+def fixture_calendar_api(request):
+    # Fixtures with results and odds per day, revalidated with ETag/Last-Modified
+    try:
+        sport_ids, start, end = _calendar_window(request)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    etag, last_modified = fixture_calendar.watermark(sport_ids, start, end)
+    etag = quote_etag(etag)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        # The ETag names this version of the window, so it is built once
+        data = caching.get_or_build(f'calendar:{etag}', (), lambda: fixture_calendar.window(sport_ids, start, end),
+                                    timeout=CALENDAR_TIMEOUT)
+        response = JsonResponse(data)
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    if fixture_calendar.is_settled(end):
+        # Corrected results still change settled days, so caches keep the
+        # window for a day and then revalidate it with the ETag
+        patch_cache_control(response, public=True, max_age=SETTLED_MAX_AGE)
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+@staff_member_required
+def sql_summary(request):
+    # Rolling per-view query counts and DB time of this process
+    return JsonResponse({'views': instrumentation.summary()})
+
+
+@staff_member_required
+def export_data(request, name):
+    # Streams an export as CSV or NDJSON, filtered by ?start=&end=&sport=&user=
+    if name not in exports.EXPORTS:
+        raise Http404('Unknown export')
+    file_format = request.GET.get('format', 'csv')
+    try:
+        lines = exports.lines(name, file_format, start=request.GET.get('start'), end=request.GET.get('end'),
+                              sport=request.GET.get('sport'), user=request.GET.get('user'))
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    response = StreamingHttpResponse(lines, content_type=exports.CONTENT_TYPES[file_format])
+    response['Content-Disposition'] = f'attachment; filename="{name}-{timezone.localdate()}.{file_format}"'
+    return response
+
+
+@login_required
+def following_tips(request):
+    # Tips from the tipsters the user follows, read from their timeline
+    try:
+        tips, next_cursor = timeline.timeline_page(request.user, request.GET.get('cursor'),
+                                                   limit=LATEST_TIPS_PAGE_SIZE)
+    except ValueError:
+        tips, next_cursor = timeline.timeline_page(request.user, limit=LATEST_TIPS_PAGE_SIZE)
+
+    next_query = None
+    if next_cursor:
+        params = request.GET.copy()
+        params['cursor'] = next_cursor
+        next_query = params.urlencode()
+    return render(request, 'latest-tips.html', {
+        'latest_tips': tips,
+        'next_query': next_query,
+        'feed_title': 'Tips From People You Follow',
+    })
+
+
+def tipster_profile(request, username):
+    # Performance read from the analytics snapshot, overall row first
+    tipster = get_object_or_404(UserProfile, username=username)
+    analytics = list(tipster.analytics.select_related('sport').order_by(F('sport__name').asc(nulls_first=True)))
+    is_following = (request.user.is_authenticated
+                    and Follower.objects.filter(user=tipster, follower=request.user).exists())
+    return render(request, 'tipster_profile.html', {
+        'tipster': tipster,
+        'analytics': analytics,
+        'overall': next((row for row in analytics if row.sport_id is None), None),
+        'is_following': is_following,
+    })
+
 
+@login_required
+def follow_tipster(request, username):
+    tipster = get_object_or_404(UserProfile, username=username)
+    if request.method == 'POST':
+        if 'unfollow' in request.POST:
+            timeline.unfollow(request.user, tipster)
+        else:
+            timeline.follow(request.user, tipster)
+    return redirect('following_tips')
 
+
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def blog(request):
     # Your logic for the blog page
     return render(request, 'blog.html')
@@ -118,33 +391,40 @@ def create_blog_post(request):
         form = BlogPostForm()
     return render(request, 'create_blog.html', {'form': form})
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def latest_sports_blogs(request):
     # Logic for displaying the latest sports blogs
     return render(request, 'latest_sports_blogs.html')
 
 
+@cached_page(('blog',), timeout=DATA_PAGE_TIMEOUT)
 def blog_posts(request):
     posts = BlogPost.objects.all()
     return render(request, 'latest_sports_blogs.html', {'posts': posts})
 
 
+@cached_page(('blog',), timeout=DATA_PAGE_TIMEOUT)
 def blog_post_detail(request, pk):
     post = get_object_or_404(BlogPost, pk=pk)
     return render(request, 'blog_post_detail.html', {'post': post})
 
 
+@cached_page(('livescores',), timeout=DATA_PAGE_TIMEOUT)
 def football_fixtures(request):
     scores = LiveScore.objects.all()  # Fetch all live scores
     return render(request, 'football_fixtures.html', {'scores': scores})
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def racing_fixtures(request):
     return render(request, 'racing_fixtures.html')  
 
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def tennis_fixtures(request):
     return render(request, 'tennis_fixtures.html')
 
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def golf_fixtures(request):
     return render(request, 'golf_fixtures.html')
 
@@ -153,14 +433,17 @@ def general_chat(request):
     return render(request, 'general_chat.html')
 
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def fixtures_results(request):
     return render(request, 'fixtures_results.html')
 
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def in_play(request):
     return render(request, 'inplay.html')
 
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def terms_of_service(request):
     return render(request, 'termsofservice.html')
 
@@ -169,6 +452,7 @@ def contact(request):
     return render(request, 'contact.html')
 
 
+@cached_page(timeout=STATIC_PAGE_TIMEOUT)
 def privacy_policy(request):
     return render(request, 'privacypolicy.html')
 
@@ -177,14 +461,11 @@ def register(request):
     if request.method == 'POST':
         form = UserRegistrationForm(request.POST)
         if form.is_valid():
+            # Saving the user also creates their TipsterStats
             user = form.save()
 
-            # Create a TipsterStats instance for the registered user
-            tipster_stats = TipsterStats.objects.create(user=user)
- 
             # Debugging statements
             print("User registered:", user)
-            print("TipsterStats created:", tipster_stats)
             # Redirect to a success page.
             return redirect('signin')
         # Assuming 'signin' is the name of your login URL.
@@ -233,66 +514,73 @@ def signout(request):
 def submit_tips(request):
     # Check if the user is authenticated
     if not request.user.is_authenticated:
-        print("User is not authenticated")  # Add a print statement for debugging
         return redirect('signin')
-    # Retrieve the user's current points balance
-    user_profile = get_object_or_404(UserProfile, username=request.user.username)
-    # Check if the user has tipster stats, create if not exist
-    user_tipster_stats, _ = TipsterStats.objects.get_or_create(user=user_profile)
-
-    user_points_balance = user_tipster_stats.points_balance
-    # Replace with actual field name for points balance
 
     if request.method == 'POST':
         form = BettingTipForm(request.POST)
         if form.is_valid():
-            sport_name = form.cleaned_data.get('sport')
-            sport_instance = None
-            try:
-                sport_instance = Sport.objects.get(name=sport_name)
-            except Sport.DoesNotExist:
-                form.add_error('sport', 'Invalid sport selected')
-                return render(request, 'submit_tips.html', {'form': form})
-            points_bet = form.cleaned_data.get('points_bet') 
-
             new_tip = form.save(commit=False)
             new_tip.user = request.user
-            new_tip.sport = sport_instance
-            new_tip.bet_description = form.cleaned_data['bet_description']
-            new_tip.reasoning = form.cleaned_data['reasoning']
-            new_tip.odds_given = form.cleaned_data['odds_given']
-            new_tip.points_bet = points_bet
-        
-            # Calculate points won
-            points_won = user_tipster_stats.calculate_points_won(points_bet, new_tip.odds_given)
-
-            # Update user's tipster stats
-            user_tipster_stats.total_bets_placed += 1
-            if new_tip.is_win:
-                 user_tipster_stats.total_wins += 1
-            elif new_tip.is_win is None:
-                # Handle the case where the result of the tip is not yet determined
-                # For example, you might want to add some logic to mark the tip for later validation
-                pass
-
-            # Save the user's tipster stats
-            user_tipster_stats.save()
-
-             # Update user's points balance (this might be done in the
-             # calculate_points_won method)
-            user_points_balance = user_tipster_stats.points_balance
-
-            new_tip.save()  # Save the tip to the database
- 
-            # Display or use the points_won variable as needed
-            messages.success(request, f'You won {points_won} points!')
-
-            return redirect('submission_success')  # Redirect to a success page
-    else:
-        form = BettingTipForm(initial={'user_points_balance': user_points_balance})
+            new_tip.odds = form.cleaned_data['odds_given']
 
-    return render(request, 'submit_tips.html', {'form': form, 'points_balance': user_points_balance})
+            if settings.TIP_SUBMISSIONS != 'direct':
+                return _queue_tip(request, form, new_tip)
+
+            # Save the tip, debit the stake and count the bet in one
+            # transaction; the boards, rollups and timelines follow once it
+            # commits, and wins and payouts are credited on settlement
+            try:
+                with transaction.atomic():
+                    new_tip.save()
+                    ledger.stake(request.user.pk, new_tip.points_bet, tip=new_tip)
+            except ledger.InsufficientPoints as error:
+                form.add_error('points_bet', str(error))
+            else:
+                messages.success(request, 'Your tip has been submitted!')
+                return redirect('submission_success')  # Redirect to a success page
+    else:
+        form = BettingTipForm()
+
+    return render(request, 'submit_tips.html', {'form': form, 'points_balance': request.user.points_balance})
+
+
+def _queue_tip(request, form, new_tip):
+    # Write-behind mode: queue the tip for the worker and answer at once
+    try:
+        submission = submissions.enqueue(new_tip)
+    except ledger.InsufficientPoints as error:
+        form.add_error('points_bet', str(error))
+    except submissions.QueueFull as error:
+        form.add_error(None, str(error))
+        response = render(request, 'submit_tips.html', {'form': form, 'points_balance': request.user.points_balance},
+                          status=503)
+        response['Retry-After'] = str(submissions.RETRY_AFTER)
+        return response
+    else:
+        if settings.TIP_SUBMISSIONS == 'inline':
+            submissions.drain()
+        messages.success(request, 'Your tip has been received and will be placed in a moment.')
+        return redirect(f"{reverse('submission_success')}?submission={submission.pk}")
+    return render(request, 'submit_tips.html', {'form': form, 'points_balance': request.user.points_balance})
 
 
 def submission_success(request):
-    return render(request, 'submission_success.html')
+    submission = request.GET.get('submission')
+    status_url = None
+    if submission and submission.isdigit():
+        status_url = reverse('tip_submission_status', args=[submission])
+    return render(request, 'submission_success.html', {'status_url': status_url})
+
+
+@login_required
+def tip_submission_status(request, pk):
+    # Lets clients confirm a queued tip was placed (or why it was not)
+    submission = get_object_or_404(TipSubmission, pk=pk, user=request.user)
+    return JsonResponse({
+        'id': submission.pk,
+        'status': submission.status,
+        'tip': submission.tip_id,
+        'error': submission.error or None,
+        'created_at': submission.created_at.isoformat(),
+        'processed_at': submission.processed_at.isoformat() if submission.processed_at else None,
+    })
@@ -4,69 +4,86 @@ import 'https://unpkg.com/emoji-picker-element';
 
 
 function createChatSocket() {
-    console.log(`Attempting to connect to chat`);
-    var socket = io.connect('http://127.0.0.1:8000/general-chat');
     var errorMessageElement = document.getElementById('error-message');
+    var scheme = window.location.protocol === 'https:' ? 'wss://' : 'ws://';
+    var url = scheme + window.location.host + '/ws/general-chat/';
+    var socket = null;
+    var retryDelay = 1000;
 
-    socket.on('connect', function() {
-        console.log(`Connected to chat`);
-        socket.emit('join');
-    });
-
-    socket.on('connect_error', function(error) {
-        console.error('Connection Error:', error);
-    });
-
-    socket.on('join_error', function(error) {
-        console.error('Error joining chatroom:', error);
-        errorMessageElement.textContent = 'Error joining chat: ' + error;
-    });
-
-    socket.on('error', function(error) {
-        console.error('Socket error:', error);
-        errorMessageElement.textContent = 'An error occurred: ' + error;
-    });
-
-    socket.on('disconnect', function(reason) {
-        if (reason === 'io server disconnect') {
-            // The server forced a disconnect
-            errorMessageElement.textContent = 'Disconnected by the server';
-        }
-    });
-
-    socket.on('message', function(data) {
+    function appendMessage(data) {
         var li = document.createElement('li');
-        li.appendChild(document.createTextNode(data.msg)); // Updated this line to handle the data object
+        li.appendChild(document.createTextNode(data.user + ': ' + data.msg));
         document.getElementById('messages').appendChild(li);
 
         // Auto-scroll to the bottom
         var messages = document.getElementById('messages');
         messages.scrollTop = messages.scrollHeight;
+    }
+
+    function showUsers(users) {
+        var list = document.getElementById('user-list');
+        list.innerHTML = '';
+        users.forEach(function(user) {
+            var li = document.createElement('li');
+            li.appendChild(document.createTextNode(user));
+            list.appendChild(li);
+        });
+    }
+
+    function connect() {
+        console.log(`Attempting to connect to chat`);
+        socket = new WebSocket(url);
+
+        socket.onopen = function() {
+            console.log(`Connected to chat`);
+            errorMessageElement.textContent = '';
+            retryDelay = 1000;
+        };
+
+        socket.onmessage = function(event) {
+            var data = JSON.parse(event.data);
+            if (data.type === 'history') {
+                document.getElementById('messages').innerHTML = '';
+                data.messages.forEach(appendMessage);
+            } else if (data.type === 'message') {
+                appendMessage(data);
+            } else if (data.type === 'users') {
+                showUsers(data.users);
+            } else if (data.type === 'error') {
+                errorMessageElement.textContent = data.error;
+                console.error('Chat error:', data.error);
+            }
+        };
 
-    });
+        socket.onclose = function() {
+            // Reconnect with a growing delay, the server resends the history
+            errorMessageElement.textContent = 'Disconnected, reconnecting...';
+            setTimeout(connect, retryDelay);
+            retryDelay = Math.min(retryDelay * 2, 30000);
+        };
+    }
+
+    connect();
 
     return {
         sendMessage: function() {
             var messageInput = document.getElementById('message');
-            var message = messageInput.value.trim();  
-            
+            var message = messageInput.value.trim();
+
 
             if (message === '') {
-                errorMessageElement.textContent = 'Message cannot be empty';  
+                errorMessageElement.textContent = 'Message cannot be empty';
+                return;
+            }
+            if (socket.readyState !== WebSocket.OPEN) {
+                errorMessageElement.textContent = 'Not connected to chat';
                 return;
             }
 
-            errorMessageElement.textContent = '';  
-            socket.emit('message', {msg: message}, function(response) {
-                if (response.error) {
-                    errorMessageElement.textContent = response.error;
-                    console.error('Error sending message:', response.error);
-                } else {
-                    console.log('Message sent:', message);
-                }
-            
-            });
-        }   
+            errorMessageElement.textContent = '';
+            socket.send(JSON.stringify({msg: message}));
+            messageInput.value = '';
+        }
     };
 }
 
@@ -84,4 +101,3 @@ const input = document.getElementById('message');
 picker.addEventListener('emoji-click', event => {
     input.value += event.detail.unicode;
 });
-
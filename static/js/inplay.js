@@ -1,23 +1,46 @@
 document.addEventListener('DOMContentLoaded', function() {
-    // Fetch live in-play events from the API
-    fetch('/api/inplay-events')
-    .then(response => response.json())
-    .then(data => {
-        const tableBody = document.getElementById('inplay-events');
-        data.forEach(event => {
-            const row = document.createElement('tr');
-            row.innerHTML = `
-                <td>${event.sport}</td>
-                <td>${event.eventName}</td>
-                <td>${event.homeTeam}</td>
-                <td>${event.awayTeam}</td>
-                <td>${event.currentScore}</td>
-                <td>${event.timeElapsed}</td>
-            `;
+    // Live scores are pushed by the server as they change. EventSource
+    // reconnects on its own and resumes from the last event it received.
+    const tableBody = document.getElementById('inplay-events');
+    const source = new EventSource('/streams/live-scores/');
+
+    function renderRow(score) {
+        let row = document.getElementById('score-' + score.id);
+        if (!row) {
+            row = document.createElement('tr');
+            row.id = 'score-' + score.id;
             tableBody.appendChild(row);
+        }
+        // Feed values are text, never markup
+        const cells = ['Football', score.league, score.home_team, score.away_team,
+                       score.home_score + ' - ' + score.away_score, score.match_time];
+        row.replaceChildren(...cells.map(function(value) {
+            const cell = document.createElement('td');
+            cell.textContent = value;
+            return cell;
+        }));
+    }
+
+    source.addEventListener('snapshot', function(event) {
+        tableBody.replaceChildren();
+        JSON.parse(event.data).forEach(renderRow);
+    });
+
+    source.addEventListener('scores', function(event) {
+        JSON.parse(event.data).forEach(renderRow);
+    });
+
+    // Ids of matches deleted from the feed
+    source.addEventListener('removed', function(event) {
+        JSON.parse(event.data).forEach(function(id) {
+            const row = document.getElementById('score-' + id);
+            if (row) {
+                row.remove();
+            }
         });
-    })
-    .catch(error => {
-        console.error('Error fetching in-play events:', error);
     });
+
+    source.onerror = function(error) {
+        console.error('Live score stream interrupted, reconnecting:', error);
+    };
 });
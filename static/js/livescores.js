@@ -0,0 +1,42 @@
+document.addEventListener('DOMContentLoaded', function() {
+    // Update the rendered score rows in place as the server pushes changes
+    const source = new EventSource('/streams/live-scores/');
+
+    function updateRow(score) {
+        const row = document.querySelector('[data-score-id="' + score.id + '"]');
+        if (!row) {
+            return;
+        }
+        row.querySelector('.score').textContent = score.home_score + ' - ' + score.away_score;
+        row.querySelector('.status').textContent = '(' + score.match_status + ')';
+    }
+
+    function removeRow(id) {
+        const row = document.querySelector('[data-score-id="' + id + '"]');
+        if (row) {
+            row.remove();
+        }
+    }
+
+    function onScores(event) {
+        JSON.parse(event.data).forEach(updateRow);
+    }
+
+    function onSnapshot(event) {
+        // A snapshot holds every match, so rows missing from it were deleted
+        const scores = JSON.parse(event.data);
+        const ids = new Set(scores.map(function(score) { return String(score.id); }));
+        document.querySelectorAll('[data-score-id]').forEach(function(row) {
+            if (!ids.has(row.dataset.scoreId)) {
+                row.remove();
+            }
+        });
+        scores.forEach(updateRow);
+    }
+
+    source.addEventListener('snapshot', onSnapshot);
+    source.addEventListener('scores', onScores);
+    source.addEventListener('removed', function(event) {
+        JSON.parse(event.data).forEach(removeRow);
+    });
+});
@@ -3,6 +3,10 @@ ASGI config for tipsterarena project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Long-lived streaming endpoints (server-sent events and WebSockets) are
+served by small ASGI applications mounted in ``routes``; every other
+request goes to Django.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -13,4 +17,20 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tipsterarena.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from arena_app.chat import chat_socket  # noqa: E402  (needs the app registry)
+from arena_app.streams import live_scores_stream  # noqa: E402
+
+routes = {
+    '/streams/live-scores/': live_scores_stream,
+    '/ws/general-chat/': chat_socket,
+}
+
+
+async def application(scope, receive, send):
+    route = routes.get(scope.get('path')) if scope['type'] in ('http', 'websocket') else None
+    if route is not None:
+        await route(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
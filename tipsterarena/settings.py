@@ -58,6 +58,10 @@ MIDDLEWARE = [
     'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 
+# Per-request query counts, DB time and N+1 detection (arena_app.instrumentation)
+if config('SQL_INSTRUMENTATION', default=False, cast=bool):
+    MIDDLEWARE.insert(0, 'arena_app.instrumentation.SQLInstrumentationMiddleware')
+
 
 
 ROOT_URLCONF = 'tipsterarena.urls'
@@ -130,6 +134,64 @@ print(f"Database Password: {config('MYSQL_DB_PASSWORD')}")
 
 AUTH_USER_MODEL = 'arena_app.UserProfile'
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# The local-memory cache is per process; use the file cache when running
+# several workers so page invalidations reach all of them.
+
+cache_choice = config('CACHE_CHOICE', default='locmem')
+
+if cache_choice == "file":
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': config('CACHE_LOCATION', default=os.path.join(BASE_DIR, 'cache')),
+            'TIMEOUT': 300,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'tipsterarena',
+            'TIMEOUT': 300,
+            'OPTIONS': {
+                'MAX_ENTRIES': 5000,
+            },
+        }
+    }
+
+# Sessions and authentication
+# https://docs.djangoproject.com/en/4.2/topics/http/sessions/#configuring-the-session-engine
+# "cached_db" reads sessions from the cache and only falls back to the
+# database on a miss. "cache" and "signed_cookies" never touch the database;
+# "cache" needs the file cache with several workers and loses sessions when
+# the cache is cleared. "db" is Django's default.
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+SESSION_ENGINE = SESSION_ENGINES[config('SESSION_CHOICE', default='cached_db')]
+
+# Serves request.user from the cache (arena_app.authentication). Logins use
+# the first backend; ModelBackend stays listed so sessions started under it
+# still load their user.
+AUTHENTICATION_BACKENDS = [
+    'arena_app.authentication.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# Tip submissions (arena_app.submissions)
+# "direct" places each tip in its request, "queue" queues it for the
+# process_tip_queue worker, "inline" queues it and runs the worker in the
+# request (tests and development). Only "queue" needs the worker running.
+
+TIP_SUBMISSIONS = config('TIP_SUBMISSIONS', default='direct')
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -194,9 +256,14 @@ LOGGING = {
         },
     },
     'loggers': {
+        # Every statement is logged at DEBUG; set SQL_LOG_LEVEL=DEBUG to see them
         'django.db.backends': {
             'handlers': ['console'],
-            'level': 'DEBUG',
+            'level': config('SQL_LOG_LEVEL', default='INFO'),
+        },
+        'arena_app.sql': {
+            'handlers': ['console'],
+            'level': 'INFO',
         },
     },
 }